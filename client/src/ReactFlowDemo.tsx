@@ -53,7 +53,7 @@ function ReactFlowCanvas({
     const [type, setType] = useDnD();
     const reactFlowWrapper = useRef<HTMLDivElement>(null);
 
-    const { isSaving } = useWorkflowPersistence({
+    const { isSaving, hasConflict } = useWorkflowPersistence({
         workflowId: workflowId || 0,
         nodes,
         edges,
@@ -144,6 +144,14 @@ function ReactFlowCanvas({
                         </div>
                     </Panel>
                 )}
+                {workflowId && hasConflict && (
+                    <Panel position="top-right" className="m-2">
+                        <div className="bg-red-100 text-red-800 px-3 py-2 rounded-lg shadow-md border text-sm">
+                            This workflow was changed elsewhere. Reload to see
+                            the latest version; autosave is paused.
+                        </div>
+                    </Panel>
+                )}
             </ReactFlow>
         </div>
     );
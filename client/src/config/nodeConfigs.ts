@@ -78,6 +78,44 @@ export const knowledgeBaseConfig: WorkflowNodeConfig = {
             ],
             defaultValue: 'text-embedding-3-large',
         },
+        {
+            id: 'retrieval-mode',
+            label: 'Retrieval Mode',
+            type: 'select',
+            options: [
+                { label: 'Semantic (dense)', value: 'dense' },
+                { label: 'Keyword (BM25)', value: 'sparse' },
+                { label: 'Hybrid', value: 'hybrid' },
+            ],
+            defaultValue: 'dense',
+        },
+        {
+            id: 'top-k',
+            label: 'Chunks to Retrieve',
+            type: 'number',
+            placeholder: '3',
+            defaultValue: 3,
+            min: 1,
+            max: 20,
+            step: 1,
+        },
+        {
+            id: 'mmr',
+            label: 'Diverse Results (MMR)',
+            type: 'toggle',
+            defaultValue: false,
+        },
+        {
+            id: 'reranker',
+            label: 'Reranker',
+            type: 'select',
+            options: [
+                { label: 'None', value: 'none' },
+                { label: 'Lexical', value: 'lexical' },
+                { label: 'Cross-encoder (local)', value: 'cross-encoder' },
+            ],
+            defaultValue: 'none',
+        },
         {
             id: 'api-key',
             label: 'API Key',
@@ -155,6 +193,28 @@ export const llmEngineConfig: WorkflowNodeConfig = {
             max: 2,
             step: 0.1,
         },
+        {
+            id: 'cache-responses',
+            label: 'Cache Responses',
+            type: 'toggle',
+            defaultValue: false,
+        },
+        {
+            id: 'cache-similarity-threshold',
+            label: 'Cache Similarity Threshold',
+            type: 'number',
+            placeholder: '0.95',
+            defaultValue: 0.95,
+            min: 0.5,
+            max: 1,
+            step: 0.01,
+        },
+        {
+            id: 'coalesce-requests',
+            label: 'Share identical in-flight requests',
+            type: 'toggle',
+            defaultValue: true,
+        },
         {
             id: 'web-search',
             label: 'WebSearch Tool',
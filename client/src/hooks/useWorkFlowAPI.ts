@@ -1,4 +1,9 @@
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import {
+    useInfiniteQuery,
+    useMutation,
+    useQuery,
+    useQueryClient,
+} from '@tanstack/react-query';
 
 export interface Workflow {
     id: number;
@@ -11,6 +16,22 @@ export interface Workflow {
     updated_at: string;
 }
 
+export interface WorkflowSummary {
+    id: number;
+    name: string;
+    description: string | null;
+    is_active: boolean;
+    created_at: string;
+    updated_at: string;
+    node_count: number;
+    edge_count: number;
+}
+
+export interface WorkflowSummaryPage {
+    items: WorkflowSummary[];
+    next_cursor: string | null;
+}
+
 export interface CreateWorkflowData {
     name: string;
     description?: string;
@@ -23,8 +44,30 @@ export interface UpdateWorkflowData {
     edges?: any[];
 }
 
+export interface CanvasChanges {
+    upsert?: any[];
+    remove?: string[];
+}
+
+export interface CanvasPatch {
+    base_version: string;
+    nodes?: CanvasChanges;
+    edges?: CanvasChanges;
+}
+
+export interface CanvasPatchResult {
+    id: number;
+    version: string;
+    node_count: number;
+    edge_count: number;
+}
+
+// Raised when the canvas was saved elsewhere since base_version
+export class CanvasVersionConflict extends Error {}
+
 const BASE_URL = import.meta.env.VITE_API_BASE_URL;
 const API_BASE_URL = `${BASE_URL}/api/workflows`;
+const WORKFLOWS_PAGE_SIZE = 50;
 
 const workflowAPI = {
     //get all workflows
@@ -38,6 +81,23 @@ const workflowAPI = {
         return response.json();
     },
 
+    //get one page of workflow summaries (no canvas data)
+    getWorkflowSummaries: async (
+        cursor: string | null
+    ): Promise<WorkflowSummaryPage> => {
+        const params = new URLSearchParams({
+            limit: String(WORKFLOWS_PAGE_SIZE),
+        });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const response = await fetch(`${API_BASE_URL}/summary?${params}`);
+        if (!response.ok) {
+            throw new Error('Error fetching workflows');
+        }
+        return response.json();
+    },
+
     //get workflow by id
     getWorkflowById: async (id: number): Promise<Workflow> => {
         const response = await fetch(`${API_BASE_URL}/${id}`);
@@ -107,12 +167,36 @@ const workflowAPI = {
         }
         return response.json();
     },
+
+    patchCanvas: async ({
+        id,
+        patch,
+    }: {
+        id: number;
+        patch: CanvasPatch;
+    }): Promise<CanvasPatchResult> => {
+        const response = await fetch(`${API_BASE_URL}/${id}/canvas`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(patch),
+        });
+        if (response.status === 409) {
+            throw new CanvasVersionConflict('Workflow canvas changed');
+        }
+        if (!response.ok) {
+            throw new Error('Failed to save workflow canvas');
+        }
+        return response.json();
+    },
 };
 
 export const useWorkflows = () => {
-    return useQuery({
+    return useInfiniteQuery({
         queryKey: ['workflows'],
-        queryFn: () => workflowAPI.getWorkflows(),
+        queryFn: ({ pageParam }) =>
+            workflowAPI.getWorkflowSummaries(pageParam),
+        initialPageParam: null as string | null,
+        getNextPageParam: (lastPage) => lastPage.next_cursor,
         staleTime: 5 * 60 * 1000,
         gcTime: 10 * 60 * 1000,
     });
@@ -127,6 +211,11 @@ export const useWorkflow = (id: number) => {
     });
 };
 
+// Latest saved workflow, read past the query cache so the editor's canvas
+// is not reset to it
+export const fetchWorkflow = (id: number): Promise<Workflow> =>
+    workflowAPI.getWorkflowById(id);
+
 // Create Workflow Mutation Hook
 export const useCreateWorkflow = () => {
     const queryClient = useQueryClient();
@@ -185,6 +274,51 @@ export const useSaveCanvas = () => {
     });
 };
 
+// Apply one side of a canvas patch to a cached node or edge list
+const applyCanvasChanges = (items: any[], changes?: CanvasChanges): any[] => {
+    if (!changes) {
+        return items;
+    }
+    const removed = new Set(changes.remove ?? []);
+    const upserts = new Map(
+        (changes.upsert ?? []).map((item: any) => [item.id, item])
+    );
+    const merged = items
+        .filter((item) => !removed.has(item.id))
+        .map((item) => upserts.get(item.id) ?? item);
+    const existing = new Set(merged.map((item) => item.id));
+    for (const [id, item] of upserts) {
+        if (!existing.has(id)) {
+            merged.push(item);
+        }
+    }
+    return merged;
+};
+
+// Patch Canvas Mutation Hook (incremental autosave)
+export const usePatchCanvas = () => {
+    const queryClient = useQueryClient();
+    return useMutation({
+        mutationFn: workflowAPI.patchCanvas,
+        onSuccess: (result, { id, patch }) => {
+            // Keep the cached canvas and version in step with the server so
+            // reopening the editor never starts from the pre-patch state
+            queryClient.setQueryData(
+                ['workflow', id],
+                (old: Workflow | undefined) =>
+                    old
+                        ? {
+                              ...old,
+                              nodes: applyCanvasChanges(old.nodes, patch.nodes),
+                              edges: applyCanvasChanges(old.edges, patch.edges),
+                              updated_at: result.version,
+                          }
+                        : undefined
+            );
+        },
+    });
+};
+
 export const useOptimisticSaveCanvas = () => {
     const queryClient = useQueryClient();
 
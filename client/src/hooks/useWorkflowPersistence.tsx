@@ -1,6 +1,13 @@
-import { useCallback, useEffect, useRef } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import type { Node, Edge } from '@xyflow/react';
-import { useSaveCanvas } from './useWorkFlowAPI';
+import {
+    CanvasVersionConflict,
+    fetchWorkflow,
+    useSaveCanvas,
+    usePatchCanvas,
+    type CanvasChanges,
+    type CanvasPatchResult,
+} from './useWorkFlowAPI';
 
 interface UseWorkflowPersistenceProps {
     workflowId: number;
@@ -9,14 +16,149 @@ interface UseWorkflowPersistenceProps {
     enabled?: boolean;
 }
 
+// Last saved state: server version plus each item serialized by id
+interface SavedCanvas {
+    version: string;
+    nodes: Map<string, string>;
+    edges: Map<string, string>;
+}
+
+const snapshot = (items: { id: string }[]) =>
+    new Map(items.map((item) => [item.id, JSON.stringify(item)]));
+
+const diffItems = (
+    saved: Map<string, string>,
+    current: Map<string, string>,
+    items: { id: string }[]
+): CanvasChanges => {
+    const upsert = items.filter(
+        (item) => saved.get(item.id) !== current.get(item.id)
+    );
+    const remove = [...saved.keys()].filter((id) => !current.has(id));
+    return { upsert, remove };
+};
+
+// Ids in a local diff that the server copy also changed since our last save
+const overlapping = (
+    saved: Map<string, string>,
+    server: Map<string, string>,
+    changes: CanvasChanges
+): string[] =>
+    [
+        ...(changes.upsert ?? []).map((item) => item.id as string),
+        ...(changes.remove ?? []),
+    ].filter((id) => saved.get(id) !== server.get(id));
+
 export const useWorkflowPersistence = ({
     workflowId,
     nodes,
     edges,
     enabled = true,
 }: UseWorkflowPersistenceProps) => {
-    const { mutate: saveCanvas, isPending: isSaving } = useSaveCanvas();
+    const { mutateAsync: saveCanvas, isPending: isSaving } = useSaveCanvas();
+    const { mutateAsync: patchCanvas, isPending: isPatching } =
+        usePatchCanvas();
     const timeoutRef = useRef<NodeJS.Timeout | null>(null);
+    const savedRef = useRef<SavedCanvas | null>(null);
+    // Set when another writer changed the same nodes or edges; autosave stops
+    // until the editor is reloaded so their work is never overwritten
+    const [hasConflict, setHasConflict] = useState(false);
+
+    useEffect(() => {
+        savedRef.current = null;
+        setHasConflict(false);
+    }, [workflowId]);
+
+    // Send only changed nodes and edges. A full save is used only when there
+    // is no known version yet; when another save got there first the diff is
+    // rebased onto the latest canvas, unless both touched the same items.
+    const persist = useCallback(async () => {
+        if (hasConflict) return;
+        const currentNodes = snapshot(nodes);
+        const currentEdges = snapshot(edges);
+        const saved = savedRef.current;
+
+        try {
+            if (!saved) {
+                const workflow = await saveCanvas({
+                    id: workflowId,
+                    nodes,
+                    edges,
+                });
+                savedRef.current = {
+                    version: workflow.updated_at,
+                    nodes: currentNodes,
+                    edges: currentEdges,
+                };
+                return;
+            }
+
+            const nodeChanges = diffItems(saved.nodes, currentNodes, nodes);
+            const edgeChanges = diffItems(saved.edges, currentEdges, edges);
+            const unchanged = [nodeChanges, edgeChanges].every(
+                (c) => !c.upsert?.length && !c.remove?.length
+            );
+            if (unchanged) return;
+
+            const patch = (baseVersion: string) =>
+                patchCanvas({
+                    id: workflowId,
+                    patch: {
+                        base_version: baseVersion,
+                        nodes: nodeChanges,
+                        edges: edgeChanges,
+                    },
+                });
+
+            let result: CanvasPatchResult;
+            try {
+                result = await patch(saved.version);
+            } catch (error) {
+                if (!(error instanceof CanvasVersionConflict)) throw error;
+
+                const latest = await fetchWorkflow(workflowId);
+                const clashes = [
+                    ...overlapping(
+                        saved.nodes,
+                        snapshot(latest.nodes),
+                        nodeChanges
+                    ),
+                    ...overlapping(
+                        saved.edges,
+                        snapshot(latest.edges),
+                        edgeChanges
+                    ),
+                ];
+                if (clashes.length) {
+                    console.warn(
+                        'Canvas changed elsewhere; not saving over:',
+                        clashes
+                    );
+                    setHasConflict(true);
+                    return;
+                }
+                try {
+                    result = await patch(latest.updated_at);
+                } catch (retryError) {
+                    if (!(retryError instanceof CanvasVersionConflict)) {
+                        throw retryError;
+                    }
+                    setHasConflict(true);
+                    return;
+                }
+            }
+
+            // Items only the other writer touched are left out of the saved
+            // state, so later diffs never remove or revert them
+            savedRef.current = {
+                version: result.version,
+                nodes: currentNodes,
+                edges: currentEdges,
+            };
+        } catch (error) {
+            console.error('Auto-save failed:', error);
+        }
+    }, [workflowId, nodes, edges, hasConflict, saveCanvas, patchCanvas]);
 
     // Debounced auto-save function
     const debouncedSave = useCallback(() => {
@@ -33,9 +175,9 @@ export const useWorkflowPersistence = ({
                 return;
             }
 
-            saveCanvas({ id: workflowId, nodes, edges });
+            persist();
         }, 1000); // 1 second delay
-    }, [workflowId, nodes, edges, enabled, saveCanvas]);
+    }, [nodes, edges, enabled, persist]);
 
     // Auto-save when nodes or edges change
     useEffect(() => {
@@ -54,11 +196,12 @@ export const useWorkflowPersistence = ({
         if (timeoutRef.current) {
             clearTimeout(timeoutRef.current);
         }
-        saveCanvas({ id: workflowId, nodes, edges });
-    }, [workflowId, nodes, edges, enabled, saveCanvas]);
+        persist();
+    }, [enabled, persist]);
 
     return {
         saveNow,
-        isSaving: enabled ? isSaving : false,
+        isSaving: enabled ? isSaving || isPatching : false,
+        hasConflict: enabled && hasConflict,
     };
 };
@@ -35,6 +35,8 @@ const WorkflowEditor: React.FC = () => {
     const [isExecuting, setIsExecuting] = useState(false);
     const [isChatOpen, setIsChatOpen] = useState(false);
     const [chatInput, setChatInput] = useState('');
+    // Server-side conversation the chat history belongs to
+    const [conversationId, setConversationId] = useState<string | null>(null);
     const [chatHistory, setChatHistory] = useState<
         {
             type: 'user' | 'ai' | 'error';
@@ -130,11 +132,17 @@ const WorkflowEditor: React.FC = () => {
                 {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ query: userMessage }),
+                    body: JSON.stringify({
+                        query: userMessage,
+                        conversation_id: conversationId,
+                    }),
                 }
             );
 
             const result = await response.json();
+            if (result.conversation_id) {
+                setConversationId(result.conversation_id);
+            }
 
             // Add AI response to chat
             const aiMessage = {
@@ -4,7 +4,7 @@ import { Plus, Edit, Activity } from 'lucide-react';
 import {
     useWorkflows,
     useCreateWorkflow,
-    type Workflow,
+    type WorkflowSummary,
 } from '../hooks/useWorkFlowAPI';
 import {
     Dialog,
@@ -24,7 +24,15 @@ const WorkflowManagement: React.FC = () => {
     const [newWorkflowName, setNewWorkflowName] = useState('');
     const [newWorkflowDescription, setNewWorkflowDescription] = useState('');
 
-    const { data: workflows = [], isLoading, error } = useWorkflows();
+    const {
+        data,
+        isLoading,
+        error,
+        hasNextPage,
+        fetchNextPage,
+        isFetchingNextPage,
+    } = useWorkflows();
+    const workflows = data?.pages.flatMap((page) => page.items) ?? [];
     const { mutate: createWorkflow, isPending: isCreating } =
         useCreateWorkflow();
 
@@ -64,12 +72,12 @@ const WorkflowManagement: React.FC = () => {
     //     });
     // };
 
-    const getNodeCount = (workflow: Workflow) => {
-        return workflow.nodes?.length || 0;
+    const getNodeCount = (workflow: WorkflowSummary) => {
+        return workflow.node_count || 0;
     };
 
-    const getEdgeCount = (workflow: Workflow) => {
-        return workflow.edges?.length || 0;
+    const getEdgeCount = (workflow: WorkflowSummary) => {
+        return workflow.edge_count || 0;
     };
 
     if (isLoading) {
@@ -222,6 +230,17 @@ const WorkflowManagement: React.FC = () => {
                         ))}
                     </div>
                 )}
+                {hasNextPage && (
+                    <div className="flex justify-center mt-8">
+                        <Button
+                            variant="outline"
+                            onClick={() => fetchNextPage()}
+                            disabled={isFetchingNextPage}
+                        >
+                            {isFetchingNextPage ? 'Loading...' : 'Load more'}
+                        </Button>
+                    </div>
+                )}
             </div>
 
             {/* Create Workflow Dialog using Shadcn */}
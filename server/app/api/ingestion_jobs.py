@@ -0,0 +1,51 @@
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile, status
+
+from app.models.ingestion import IngestionJob
+from ..services.execution_pool import run_blocking
+from ..services.ingestion_jobs import get_job, submit_ingestion_job
+from .upload_file import save_upload
+
+router = APIRouter(prefix="/api/ingestion-jobs", tags=["ingestion-jobs"])
+
+
+@router.post("/", response_model=IngestionJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    file: UploadFile = File(...),
+    api_key: str = Form(...),
+    embedding_model: str = Form("text-embedding-3-small"),
+    workflow_id: int = Form(None),
+    node_id: str = Form(None),
+):
+    """
+    Upload a document and index it in the background; the saved upload is
+    deleted once the job finishes, as with /api/uploadfile/
+    Poll GET /api/ingestion-jobs/{id} for status and page/chunk progress
+    """
+    try:
+        file_path = await run_blocking(save_upload, file)
+        return await run_blocking(
+            submit_ingestion_job,
+            file_path,
+            api_key,
+            embedding_model,
+            file_name=file.filename,
+            workflow_id=workflow_id,
+            node_id=node_id,
+            remove_file=True,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error submitting ingestion job: {str(e)}",
+        )
+
+
+@router.get("/{job_id}", response_model=IngestionJob)
+async def get_job_status(job_id: int):
+    job = await run_blocking(get_job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ingestion job with id {job_id} not found",
+        )
+    return job
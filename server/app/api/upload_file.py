@@ -1,22 +1,61 @@
 import os
-from fastapi import APIRouter, File, UploadFile
+import shutil
+import uuid
+from fastapi import APIRouter, File, Form, UploadFile
 from fastapi.responses import JSONResponse
-from ..services.document_service import process_docs
-
+from app.config import UPLOAD_CHUNK_BYTES, UPLOAD_DIR
+from ..services.execution_pool import run_blocking
+from ..services.ingestion_jobs import submit_ingestion_job
 
 router = APIRouter(prefix="/api", tags=["files"])
 
 
 @router.post("/uploadfile/")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...),
+    api_key: str = Form(None),
+    embedding_model: str = Form("text-embedding-3-small"),
+    workflow_id: int = Form(None),
+    node_id: str = Form(None),
+):
+    """
+    Save an upload and queue it for background ingestion; chunking and
+    embedding no longer run on the request. Poll /api/ingestion-jobs/{job_id}.
+    """
+    if not api_key:
+        return JSONResponse(
+            content={"error": "API key is required for document processing"},
+            status_code=400,
+        )
     try:
-        temp_file_path = f"temp_{file.filename}"
-        with open(temp_file_path, "wb") as temp_file:
-            temp_file.write(file.file.read())
-        process_docs(temp_file_path)
-        os.remove(temp_file_path)
+        file_path = await run_blocking(save_upload, file)
+        job = await run_blocking(
+            submit_ingestion_job,
+            file_path,
+            api_key,
+            embedding_model,
+            file_name=file.filename,
+            workflow_id=workflow_id,
+            node_id=node_id,
+            remove_file=True,
+        )
         return JSONResponse(
-            content={"message": "File processed successfully"}, status_code=200
+            content={
+                "message": "File queued for processing",
+                "job_id": job.id,
+                "status": job.status,
+            },
+            status_code=202,
         )
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+def save_upload(file: UploadFile) -> str:
+    """Stream an upload to a unique path in chunks so large files never sit in memory"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    suffix = os.path.splitext(os.path.basename(file.filename or ""))[1]
+    temp_file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+    with open(temp_file_path, "wb") as temp_file:
+        shutil.copyfileobj(file.file, temp_file, UPLOAD_CHUNK_BYTES)
+    return temp_file_path
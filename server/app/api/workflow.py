@@ -1,20 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Dict, Any, Optional
 
-from app.models.workflow import Workflow
-from app.database import get_session
-from app.services.workflow_manage_service import WorkflowManageService
+from app.models.workflow import Workflow, WorkflowSummaryPage
+from app.services.workflow_manage_service import (
+    WorkflowService,
+    WorkflowVersionConflict,
+    get_workflow_service,
+)
 
 router = APIRouter(prefix="/api/workflows", tags=["workflows"])
 
 
 @router.post("/", response_model=Workflow)
 async def create_workflow(
-    workflow_data: Dict[str, Any], session: Session = Depends(get_session)
+    workflow_data: Dict[str, Any],
+    service: WorkflowService = Depends(get_workflow_service),
 ):
     try:
-        service = WorkflowManageService(session)
         name = workflow_data.get("name")
         description = workflow_data.get("description")
 
@@ -24,7 +26,7 @@ async def create_workflow(
                 detail="Workflow name is required",
             )
 
-        workflow = service.create_workflow(name=name, description=description)
+        workflow = await service.create_workflow(name=name, description=description)
         return workflow
     except Exception as e:
         raise HTTPException(
@@ -34,11 +36,11 @@ async def create_workflow(
 
 
 @router.get("/", response_model=List[Workflow])
-async def get_all_workflows(session: Session = Depends(get_session)):
+async def get_all_workflows(
+    service: WorkflowService = Depends(get_workflow_service),
+):
     try:
-        service = WorkflowManageService(session)
-        workflows = service.get_all_workflows()
-        print(workflows)
+        workflows = await service.get_all_workflows()
         return workflows
     except Exception as e:
         raise HTTPException(
@@ -47,11 +49,31 @@ async def get_all_workflows(session: Session = Depends(get_session)):
         )
 
 
+@router.get("/summary", response_model=WorkflowSummaryPage)
+async def get_workflow_summaries(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    service: WorkflowService = Depends(get_workflow_service),
+):
+    """Paginated workflow list without canvas nodes and edges"""
+    try:
+        return await service.get_workflow_summaries(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving workflows: {str(e)}",
+        )
+
+
 @router.get("/{workflow_id}", response_model=Workflow)
-async def get_workflow(workflow_id: int, session: Session = Depends(get_session)):
+async def get_workflow(
+    workflow_id: int,
+    service: WorkflowService = Depends(get_workflow_service),
+):
     try:
-        service = WorkflowManageService(session)
-        workflow = service.get_workflow_by_id(workflow_id)
+        workflow = await service.get_workflow_by_id(workflow_id)
 
         if not workflow:
             raise HTTPException(
@@ -73,17 +95,15 @@ async def get_workflow(workflow_id: int, session: Session = Depends(get_session)
 async def update_workflow(
     workflow_id: int,
     workflow_data: Dict[str, Any],
-    session: Session = Depends(get_session),
+    service: WorkflowService = Depends(get_workflow_service),
 ):
     try:
-        service = WorkflowManageService(session)
-
         name = workflow_data.get("name")
         description = workflow_data.get("description")
         nodes = workflow_data.get("nodes")
         edges = workflow_data.get("edges")
 
-        workflow = service.update_workflow(
+        workflow = await service.update_workflow(
             workflow_id=workflow_id,
             name=name,
             description=description,
@@ -111,15 +131,13 @@ async def update_workflow(
 async def save_workflow(
     workflow_id: int,
     canvas_data: Dict[str, Any],
-    session: Session = Depends(get_session),
+    service: WorkflowService = Depends(get_workflow_service),
 ):
     try:
-        service = WorkflowManageService(session)
-
         nodes = canvas_data.get("nodes")
         edges = canvas_data.get("edges")
 
-        workflow = service.save_workflow_data(
+        workflow = await service.save_workflow_data(
             workflow_id=workflow_id, nodes=nodes, edges=edges
         )
 
@@ -137,3 +155,66 @@ async def save_workflow(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving workflow: {str(e)}",
         )
+
+
+@router.patch("/{workflow_id}/canvas")
+async def patch_canvas(
+    workflow_id: int,
+    patch: Dict[str, Any],
+    service: WorkflowService = Depends(get_workflow_service),
+):
+    """
+    Apply node and edge diffs to the saved canvas. The body carries the
+    base_version the client last saw; a stale version is rejected with 409.
+    """
+    try:
+        base_version = patch.get("base_version")
+        if not base_version:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="base_version is required",
+            )
+
+        result = await service.patch_canvas(workflow_id, base_version, patch)
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow with id {workflow_id} not found",
+            )
+        return result
+
+    except HTTPException:
+        raise
+    except WorkflowVersionConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": str(e), "current_version": e.current_version},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error saving workflow: {str(e)}",
+        )
+
+
+@router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_workflow(
+    workflow_id: int,
+    service: WorkflowService = Depends(get_workflow_service),
+):
+    try:
+        if not await service.delete_workflow(workflow_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow with id {workflow_id} not found",
+            )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deleting workflow: {str(e)}",
+        )
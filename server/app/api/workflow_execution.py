@@ -1,11 +1,28 @@
 # app/api/workflow_execution.py
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any
-from ..services.workflow_execution_service import execute_workflow
+import json
+import uuid
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Dict, Any, List, Literal, Optional, Union
+from ..services.workflow_execution_service import (
+    execute_workflow_async,
+    stream_workflow_events,
+)
+from ..services.execution_pool import run_blocking
+from ..services.batch_execution import parse_batch_items, parse_jsonl, stream_batch
+from ..services.workflow_plan import get_workflow_plan
+from app.config import BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS
+from ..services.conversation_memory import conversation_memory
+from ..services.workflow_validation import (
+    validate_workflow as validate_workflow_definition,
+)
 
 router = APIRouter(prefix="/api/workflow-execution", tags=["workflow-execution"])
 
+# ?log= verbosity; execution logs are left out of responses unless requested
+LogLevel = Literal["none", "summary", "debug"]
+
 
 class ExecuteWorkflowRequest(BaseModel):
     user_input: str
@@ -13,17 +30,31 @@ class ExecuteWorkflowRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     query: str
+    # Omit to start a new conversation; the response returns the id to reuse.
+    # Bounded by the conversation_id column so bad ids fail with a 422
+    conversation_id: Optional[str] = Field(default=None, min_length=1, max_length=64)
+
+    def resolved_conversation_id(self) -> str:
+        return self.conversation_id or uuid.uuid4().hex
+
+
+class BatchRequest(BaseModel):
+    # Strings, or objects with query/user_input/input and an optional id
+    inputs: List[Union[str, Dict[str, Any]]]
+    concurrency: int = BATCH_MAX_CONCURRENCY
 
 
 @router.post("/{workflow_id}/execute")
 async def execute_workflow_endpoint(
-    workflow_id: int, request: ExecuteWorkflowRequest
+    workflow_id: int, request: ExecuteWorkflowRequest, log: LogLevel = Query("none")
 ) -> Dict[str, Any]:
     """
     Execute a ReactFlow workflow with user input
     This handles flexible patterns: UserQuery → LLM or UserQuery → KnowledgeBase → LLM → Output
     """
-    result = execute_workflow(workflow_id, request.user_input)
+    result = await execute_workflow_async(
+        workflow_id, request.user_input, log_level=log
+    )
 
     if not result.get("success", False):
         raise HTTPException(
@@ -34,29 +65,36 @@ async def execute_workflow_endpoint(
 
 
 @router.post("/{workflow_id}/validate")
-async def validate_workflow(workflow_id: int) -> Dict[str, Any]:
+async def validate_workflow(
+    workflow_id: int, check_credentials: bool = False
+) -> Dict[str, Any]:
     """
     Validate a workflow structure (Build Stack functionality)
-    Checks if workflow has proper node connections and required components
+    Statically checks node connections, cycles and required configuration
+    without calling any model. Pass check_credentials=true to also verify
+    the configured API keys against each provider.
     """
     try:
-        # Test execution with a simple query to validate workflow
-        result = execute_workflow(workflow_id, "Test validation query")
+        result = await run_blocking(
+            validate_workflow_definition, workflow_id, check_credentials
+        )
 
-        return {
-            "valid": result.get("success", False),
+        response = {
+            "valid": result["valid"],
             "workflow_id": workflow_id,
-            "pattern": result.get("workflow_pattern", "Unknown"),
-            "nodes_count": result.get("nodes_executed", 0),
-            "errors": (
-                [] if result.get("success") else [result.get("error", "Unknown error")]
-            ),
+            "pattern": result.get("pattern", "Unknown"),
+            "nodes_count": result.get("nodes_count", 0),
+            "errors": result["errors"],
+            "warnings": result.get("warnings", []),
             "message": (
                 "Workflow is valid and ready to execute"
-                if result.get("success")
+                if result["valid"]
                 else "Workflow has validation errors"
             ),
         }
+        if "credentials" in result:
+            response["credentials"] = result["credentials"]
+        return response
 
     except Exception as e:
         return {
@@ -68,12 +106,17 @@ async def validate_workflow(workflow_id: int) -> Dict[str, Any]:
 
 
 @router.post("/{workflow_id}/chat")
-async def chat_with_workflow(workflow_id: int, request: ChatRequest) -> Dict[str, Any]:
+async def chat_with_workflow(
+    workflow_id: int, request: ChatRequest, log: LogLevel = Query("none")
+) -> Dict[str, Any]:
     """
     Chat with an executed workflow (Chat with Stack functionality)
     This allows ongoing conversation with the workflow context
     """
-    result = execute_workflow(workflow_id, request.query)
+    conversation_id = request.resolved_conversation_id()
+    result = await execute_workflow_async(
+        workflow_id, request.query, conversation_id=conversation_id, log_level=log
+    )
 
     if not result.get("success", False):
         raise HTTPException(
@@ -81,19 +124,124 @@ async def chat_with_workflow(workflow_id: int, request: ChatRequest) -> Dict[str
         )
 
     # Format response for chat interface
-    return {
+    response = {
         "message": result.get("final_response", "No response generated"),
         "workflow_id": workflow_id,
+        "conversation_id": conversation_id,
         "query": request.query,
         "context_used": result.get("context_used", False),
         "timestamp": result.get("timestamp"),
-        "execution_log": result.get("execution_log", []),
     }
+    if "execution_log" in result:
+        response["execution_log"] = result["execution_log"]
+    return response
+
+
+@router.post("/{workflow_id}/chat/stream")
+async def chat_with_workflow_stream(
+    workflow_id: int, request: ChatRequest, log: LogLevel = Query("none")
+) -> StreamingResponse:
+    """
+    Streaming variant of chat as Server-Sent Events
+    Emits node_started / node_completed progress, LLM token frames, and a
+    final result frame with the same shape as the execute endpoint
+    """
+    return StreamingResponse(
+        _sse_frames(
+            workflow_id, request.query, request.resolved_conversation_id(), log
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sse_frames(
+    workflow_id: int, query: str, conversation_id: str, log_level: str
+) -> AsyncIterator[str]:
+    async for event, data in stream_workflow_events(
+        workflow_id, query, conversation_id=conversation_id, log_level=log_level
+    ):
+        yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/{workflow_id}/batch")
+async def execute_batch(
+    workflow_id: int, request: BatchRequest, log: LogLevel = Query("none")
+) -> StreamingResponse:
+    """
+    Run many queries through one workflow, streaming one NDJSON line per
+    item as it finishes (completion order, with index, id and status)
+    """
+    return await _batch_response(workflow_id, request.inputs, request.concurrency, log)
+
+
+@router.post("/{workflow_id}/batch/upload")
+async def execute_batch_upload(
+    workflow_id: int,
+    file: UploadFile = File(...),
+    concurrency: int = Form(BATCH_MAX_CONCURRENCY),
+    log: LogLevel = Query("none"),
+) -> StreamingResponse:
+    """Batch variant taking a JSONL file with one query string or object per line"""
+    try:
+        raw_items = parse_jsonl(await file.read())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _batch_response(workflow_id, raw_items, concurrency, log)
+
+
+async def _batch_response(
+    workflow_id: int,
+    raw_items: List[Union[str, Dict[str, Any]]],
+    concurrency: int,
+    log_level: str,
+) -> StreamingResponse:
+    try:
+        items = parse_batch_items(raw_items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch has no inputs")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {len(items)} inputs; the limit is {BATCH_MAX_ITEMS}",
+        )
+
+    # The plan is compiled once and shared by every item
+    plan = await run_blocking(get_workflow_plan, workflow_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    return StreamingResponse(
+        _ndjson_lines(stream_batch(plan, items, concurrency, log_level)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _ndjson_lines(results: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for line in results:
+        yield json.dumps(line, default=str) + "\n"
+
+
+@router.get("/{workflow_id}/conversations/{conversation_id}")
+async def get_conversation(
+    workflow_id: int, conversation_id: str
+) -> List[Dict[str, Any]]:
+    """Stored turns of a chat conversation, oldest first"""
+    return await run_blocking(
+        conversation_memory.transcript, workflow_id, conversation_id
+    )
 
 
 @router.get("/{workflow_id}/debug")
 async def debug_workflow(workflow_id: int) -> Dict[str, Any]:
     """Debug endpoint to see workflow data structure"""
+    return await run_blocking(_load_debug_workflow, workflow_id)
+
+
+def _load_debug_workflow(workflow_id: int) -> Dict[str, Any]:
     session = None
     try:
         from app.database import get_session
@@ -17,3 +17,89 @@ if not GOOGLE_API_KEY:
     print(
         "⚠️  GOOGLE_API_KEY environment variable is not set. Users must provide API keys in components."
     )
+
+# Worker threads for blocking LLM, embedding and DB work run off the event loop
+EXECUTION_MAX_WORKERS = int(os.getenv("EXECUTION_MAX_WORKERS", "16"))
+
+# Process-wide cache of LLM, embedding and Chroma clients
+CLIENT_CACHE_MAX_SIZE = int(os.getenv("CLIENT_CACHE_MAX_SIZE", "64"))
+CLIENT_CACHE_TTL_SECONDS = float(os.getenv("CLIENT_CACHE_TTL_SECONDS", "1800"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# Compiled workflow plans are invalidated on save; the TTL bounds staleness
+# when another worker process saved the workflow
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "300"))
+
+# Independent workflow branches run in parallel on a shared node pool;
+# WORKFLOW_MAX_PARALLEL_NODES caps how many nodes one run dispatches at once
+NODE_POOL_MAX_WORKERS = int(os.getenv("NODE_POOL_MAX_WORKERS", "32"))
+WORKFLOW_MAX_PARALLEL_NODES = int(os.getenv("WORKFLOW_MAX_PARALLEL_NODES", "4"))
+
+# Opt-in LLM response cache (enabled per LLM Engine node with "cache-responses")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+# Query embedding cache; set QUERY_EMBEDDING_CACHE_PATH to persist it to disk
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+
+# Uploads are streamed to unique files here before ingestion
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# Chunks sent to the embedding API per add_documents call
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+# Entries kept in each in-process ingestion ledger memo (file hashes, known keys)
+LEDGER_MEMO_SIZE = int(os.getenv("LEDGER_MEMO_SIZE", "10000"))
+
+# Background ingestion workers
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+# Embedding pipeline: concurrent batches with a per-key token budget
+EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+
+# How long a resolved (collection, embedding model) -> index mapping is reused
+INDEX_ALIAS_TTL_SECONDS = float(os.getenv("INDEX_ALIAS_TTL_SECONDS", "60"))
+
+# Local BM25 keyword index used by sparse and hybrid Knowledge Base retrieval;
+# a relative path is taken from the server directory, not the working directory
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYWORD_INDEX_PATH = os.path.join(
+    SERVER_DIR, os.getenv("KEYWORD_INDEX_PATH", "keyword_index.sqlite3")
+)
+
+# Upper bound on retrieved-context tokens sent to the LLM; smaller model
+# windows lower it further
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Local cross-encoder used by the "cross-encoder" reranker (needs sentence-transformers)
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Postgres connection pool; checkouts wait DB_POOL_TIMEOUT seconds before failing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+# Serve workflow CRUD endpoints through an asyncpg engine (requires asyncpg)
+DB_ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "false").lower() == "true"
+
+# Chat with Stack memory: history tokens sent to the LLM, and when older
+# turns are folded into a summary (keeping the newest turns verbatim)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_COMPACT_TOKENS = int(os.getenv("HISTORY_COMPACT_TOKENS", "3000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "512"))
+
+# Server console verbosity for workflow execution logs: none, summary or debug.
+# Responses carry logs only when the request asks for them with ?log=
+EXECUTION_LOG_LEVEL = os.getenv("EXECUTION_LOG_LEVEL", "summary").lower()
+
+# Batch execution: items run concurrently per request, and items accepted per batch
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# Share one in-flight computation between identical concurrent requests
+# (LLM nodes can still opt out with their "coalesce-requests" setting)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
@@ -1,7 +1,23 @@
 from sqlmodel import create_engine, SQLModel, Session, text
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from dotenv import load_dotenv
+from typing import Any, AsyncIterator, Dict, Iterator
 import os
+import threading
+import time
+from app.config import (
+    DB_ASYNC_ENABLED,
+    DB_CONNECT_TIMEOUT,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+)
 from app.models.workflow import Workflow
+from app.models.ingestion import IngestedDocument, IngestionJob
+from app.models.vector_index import VectorIndex
+from app.models.conversation import ConversationSummary, ConversationTurn
 
 # Load environment variables from .env
 load_dotenv()
@@ -15,17 +31,101 @@ DBNAME = os.getenv("dbname")
 DATABASE_URL = f"postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
 
 
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?ssl=require"
+)
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "false").lower() == "true"
+
+POOL_OPTIONS = dict(
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+)
+
 engine = create_engine(
     DATABASE_URL,
-    echo=os.getenv("DATABASE_ECHO", "false").lower() == "true",
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    echo=DATABASE_ECHO,
+    connect_args={"connect_timeout": DB_CONNECT_TIMEOUT},
+    **POOL_OPTIONS,
 )
 
 
+class PoolMetrics:
+    """Checkout counts and wait times for a connection pool"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.timeouts = 0
+        # Waits are measured only in get_db, so they get their own count
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+        event.listen(engine.pool, "checkout", self._on_checkout)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        with self._lock:
+            waits = self.waits or 1
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / waits * 1000, 2),
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+            }
+
+
+pool_metrics = PoolMetrics(engine)
+
+
+def _create_async_engine():
+    if not DB_ASYNC_ENABLED:
+        return None
+    try:
+        import asyncpg  # noqa: F401
+        from sqlalchemy.ext.asyncio import create_async_engine
+    except ImportError:
+        print("⚠️  DB_ASYNC_ENABLED is set but asyncpg is not installed")
+        return None
+    return create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=DATABASE_ECHO,
+        connect_args={"timeout": DB_CONNECT_TIMEOUT},
+        **POOL_OPTIONS,
+    )
+
+
+async_engine = _create_async_engine()
+async_pool_metrics = PoolMetrics(async_engine.sync_engine) if async_engine else None
+
+
 def create_db_and_tables():
     try:
         SQLModel.metadata.create_all(engine)
+        # create_all skips existing tables, so add indexes introduced later
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
         print("✅ Database tables created successfully!")
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
@@ -33,9 +133,48 @@ def create_db_and_tables():
 
 
 def get_session():
+    """Bare session for service code; callers must close it"""
     return Session(engine)
 
 
+def get_db() -> Iterator[Session]:
+    """
+    Request-scoped session dependency. The connection is checked out up front
+    so pool wait is measured, and always returned when the request ends.
+    """
+    with Session(engine) as session:
+        started = time.perf_counter()
+        try:
+            session.connection()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        yield session
+
+
+async def get_async_db() -> AsyncIterator[Any]:
+    """Request-scoped AsyncSession on the asyncpg engine"""
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        started = time.perf_counter()
+        try:
+            await session.connection()
+        except PoolTimeoutError:
+            async_pool_metrics.record_timeout()
+            raise
+        async_pool_metrics.record_wait(time.perf_counter() - started)
+        yield session
+
+
+def pool_status() -> Dict[str, Any]:
+    status = {"sync": pool_metrics.snapshot()}
+    if async_pool_metrics:
+        status["async"] = async_pool_metrics.snapshot()
+    return status
+
+
 def test_connection():
     try:
         with Session(engine) as session:
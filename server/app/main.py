@@ -1,9 +1,12 @@
 import os
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .api import upload_file, workflow_execution, workflow
-from app.database import create_db_and_tables
-
+from .api import upload_file, workflow_execution, workflow, ingestion_jobs
+from app.database import async_engine, create_db_and_tables, engine, pool_status
+from app.services.execution_pool import shutdown_pool
+from app.services.ingestion_jobs import fail_interrupted_jobs, shutdown_workers
+from app.services.tracing import metrics
 
 app = FastAPI()
 
@@ -24,15 +27,38 @@ app.add_middleware(
 app.include_router(upload_file.router)
 app.include_router(workflow_execution.router)
 app.include_router(workflow.router)
+app.include_router(ingestion_jobs.router)
 
 
 @app.on_event("startup")
 async def startup_event():
     print("🚀 Starting AI Workflow Builder...")
     create_db_and_tables()
+    fail_interrupted_jobs()
     print("✅ Application started successfully!")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_pool()
+    shutdown_workers()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello from FastAPI on Render!"}
+
+
+@app.get("/health/db")
+async def database_health():
+    """Connection pool usage and checkout wait times"""
+    return pool_status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Workflow and node latency histograms in Prometheus text format"""
+    return metrics.render()
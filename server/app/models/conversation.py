@@ -0,0 +1,35 @@
+from sqlmodel import Field, Index
+from typing import Optional
+from .base import BaseModel
+
+
+class ConversationTurn(BaseModel, table=True):
+    """One message of a Chat with Stack conversation; rows are never updated"""
+
+    __tablename__ = "conversation_turns"
+    __table_args__ = (
+        Index("ix_conversation_turns_key", "workflow_id", "conversation_id", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    workflow_id: int = Field(description="Workflow the conversation runs against")
+    conversation_id: str = Field(max_length=64, description="Client conversation id")
+    role: str = Field(max_length=16, description="user or assistant")
+    content: str = Field(description="Message text")
+    token_count: int = Field(default=0, description="Estimated tokens in content")
+
+
+class ConversationSummary(BaseModel, table=True):
+    """Rolling summary of older turns; the newest row supersedes earlier ones"""
+
+    __tablename__ = "conversation_summaries"
+    __table_args__ = (
+        Index("ix_conversation_summaries_key", "workflow_id", "conversation_id", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    workflow_id: int = Field(description="Workflow the conversation runs against")
+    conversation_id: str = Field(max_length=64, description="Client conversation id")
+    summary: str = Field(description="Summary of every turn up to through_turn_id")
+    through_turn_id: int = Field(description="Last turn folded into the summary")
+    token_count: int = Field(default=0, description="Estimated tokens in summary")
@@ -0,0 +1,64 @@
+from sqlmodel import Field, UniqueConstraint
+from typing import Optional
+from .base import BaseModel
+
+
+class IngestedDocument(BaseModel, table=True):
+    __tablename__ = "ingested_documents"
+    __table_args__ = (
+        UniqueConstraint(
+            "content_hash",
+            "embedding_model",
+            "chunk_size",
+            "chunk_overlap",
+            "collection_name",
+            name="uq_ingested_documents_key",
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content_hash: str = Field(
+        max_length=64, index=True, description="SHA-256 of the file contents"
+    )
+    embedding_model: str = Field(
+        max_length=255, description="Embedding model used for the chunks"
+    )
+    chunk_size: int = Field(description="Splitter chunk size")
+    chunk_overlap: int = Field(description="Splitter chunk overlap")
+    collection_name: str = Field(
+        max_length=255, description="Vector store collection holding the chunks"
+    )
+    file_name: Optional[str] = Field(
+        default=None, max_length=1024, description="Original file name"
+    )
+    chunk_count: int = Field(default=0, description="Number of chunks stored")
+
+
+class IngestionJob(BaseModel, table=True):
+    __tablename__ = "ingestion_jobs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    status: str = Field(
+        default="queued",
+        max_length=32,
+        index=True,
+        description="queued, parsing, embedding, done or failed",
+    )
+    file_name: Optional[str] = Field(
+        default=None, max_length=1024, description="Original file name"
+    )
+    file_path: str = Field(max_length=2048, description="Where the upload is stored")
+    embedding_model: str = Field(
+        max_length=255, description="Embedding model used for the chunks"
+    )
+    workflow_id: Optional[int] = Field(
+        default=None, index=True, description="Workflow the file belongs to"
+    )
+    node_id: Optional[str] = Field(
+        default=None, max_length=255, description="Knowledge Base node id"
+    )
+    pages_processed: int = Field(default=0, description="Pages parsed so far")
+    chunks_embedded: int = Field(default=0, description="Chunks embedded so far")
+    error: Optional[str] = Field(
+        default=None, max_length=2048, description="Failure reason"
+    )
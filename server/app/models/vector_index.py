@@ -0,0 +1,38 @@
+from sqlalchemy import text
+from sqlmodel import Field, Index
+from typing import Optional
+from .base import BaseModel
+
+
+class VectorIndex(BaseModel, table=True):
+    __tablename__ = "vector_indexes"
+    __table_args__ = (
+        # At most one active index per (logical name, model); older versions
+        # stay as inactive rows
+        Index(
+            "uq_vector_indexes_active",
+            "logical_name",
+            "embedding_model",
+            unique=True,
+            postgresql_where=text("is_active"),
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    logical_name: str = Field(
+        max_length=255,
+        index=True,
+        description="Collection name used by the application, e.g. wf1_kb_<hash>",
+    )
+    embedding_model: str = Field(
+        max_length=255, description="Embedding model of every vector in the index"
+    )
+    dimension: Optional[int] = Field(
+        default=None, description="Vector dimension, recorded after the first write"
+    )
+    collection_name: str = Field(
+        max_length=255, unique=True, description="Physical Chroma collection"
+    )
+    is_active: bool = Field(
+        default=True, description="Whether reads and writes for this model use it"
+    )
@@ -1,4 +1,4 @@
-from sqlmodel import SQLModel, Field, JSON, Column
+from sqlmodel import SQLModel, Field, JSON, Column, Index
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 from .base import BaseModel
@@ -6,6 +6,10 @@ from .base import BaseModel
 
 class Workflow(BaseModel, table=True):
     __tablename__ = "workflows"
+    __table_args__ = (
+        # Serves the active-workflow listing ordered by last update
+        Index("ix_workflows_active_updated", "is_active", "updated_at", "id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(max_length=255, index=True, description="Name of the workflow")
     description: Optional[str] = Field(
@@ -20,5 +24,23 @@ class Workflow(BaseModel, table=True):
     )
 
     is_active: bool = Field(default=True,description="Is the workflow active?")
-    
 
+
+class WorkflowSummary(SQLModel):
+    """Listing projection of a workflow, without the canvas JSON"""
+
+    id: int
+    name: str
+    description: Optional[str] = None
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+    node_count: int = 0
+    edge_count: int = 0
+
+
+class WorkflowSummaryPage(SQLModel):
+    items: List[WorkflowSummary]
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pass as ?cursor= to fetch the next page"
+    )
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple, Union
+
+from app.config import BATCH_MAX_CONCURRENCY
+from .embedding_cache import embed_queries_cached
+from .execution_pool import run_blocking
+from .workflow_execution_service import execute_plan
+from .workflow_plan import WorkflowPlan
+
+# Keys accepted for the query text when a batch item is an object
+QUERY_KEYS = ("query", "user_input", "input")
+
+BatchItem = Tuple[Any, str]
+
+
+def parse_batch_items(raw_items: List[Union[str, Dict[str, Any]]]) -> List[BatchItem]:
+    """
+    Normalize batch inputs to (item id, query) pairs. Items are plain strings
+    or objects with a query/user_input/input field and an optional id;
+    the id defaults to the item's position.
+    """
+    items = []
+    for index, raw in enumerate(raw_items):
+        if isinstance(raw, str):
+            items.append((index, raw))
+            continue
+        if isinstance(raw, dict):
+            query = next((raw[k] for k in QUERY_KEYS if k in raw), None)
+            if isinstance(query, str):
+                items.append((raw.get("id", index), query))
+                continue
+        raise ValueError(
+            f"Item {index} must be a string or an object with one of {QUERY_KEYS}"
+        )
+    return items
+
+
+def parse_jsonl(data: bytes) -> List[Union[str, Dict[str, Any]]]:
+    """Parse an uploaded JSONL file, one batch item per non-blank line"""
+    raw_items = []
+    for line_number, line in enumerate(data.decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            raw_items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number} is not valid JSON: {e.msg}")
+    return raw_items
+
+
+def prime_query_embeddings(plan: WorkflowPlan, queries: List[str]) -> int:
+    """
+    Embed every query once per Knowledge Base embedding model up front, so
+    the per-item retrievals hit the query embedding cache
+    """
+    # The User Query node may rewrite the text the Knowledge Base searches with
+    if any(
+        plan.configs.get(node_id, {}).get("preprocess", False)
+        for node_id, node in plan.nodes.items()
+        if node.get("type") == "userQuery"
+    ):
+        queries = [query.strip().lower() for query in queries]
+
+    embedded = 0
+    seen = set()
+    for node_id, node in plan.nodes.items():
+        if node.get("type") != "knowledgeBase":
+            continue
+        config = plan.configs.get(node_id, {})
+        api_key = (config.get("api-key") or "").strip()
+        model = config.get("embedding-model", "text-embedding-3-small")
+        if not api_key or config.get("retrieval-mode", "dense") == "sparse":
+            continue
+        if (api_key, model) in seen:
+            continue
+        seen.add((api_key, model))
+        try:
+            embedded += embed_queries_cached(queries, api_key, model)
+        except Exception as e:
+            # Items still embed their own queries if the batch call fails
+            print(f"Batch query embedding failed for {model}: {str(e)}")
+    return embedded
+
+
+async def stream_batch(
+    plan: WorkflowPlan,
+    items: List[BatchItem],
+    concurrency: int = BATCH_MAX_CONCURRENCY,
+    log_level: str = "none",
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run every item through one compiled plan with bounded concurrency and
+    yield per-item results in completion order
+    """
+    await run_blocking(prime_query_embeddings, plan, [query for _, query in items])
+
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+
+    async def run_item(index: int, item_id: Any, query: str) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await run_blocking(
+                    execute_plan, plan, query, log_level=log_level
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            line = {
+                "index": index,
+                "id": item_id,
+                "query": query,
+                "status": "ok" if result.get("success") else "error",
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+            if result.get("success"):
+                line["response"] = result.get("final_response")
+                line["context_used"] = result.get("context_used", False)
+            else:
+                line["error"] = result.get("error", "Workflow execution failed")
+            if "execution_log" in result:
+                line["execution_log"] = result["execution_log"]
+            return line
+
+    tasks = [
+        asyncio.ensure_future(run_item(index, item_id, query))
+        for index, (item_id, query) in enumerate(items)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # A disconnected client should not keep queued items running
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import chromadb
+import httpx
+
+from app.config import (
+    CHROMA_PERSIST_DIR,
+    CLIENT_CACHE_MAX_SIZE,
+    CLIENT_CACHE_TTL_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+
+def fingerprint_api_key(api_key: Optional[str]) -> str:
+    """Short one-way fingerprint so raw API keys never end up in cache keys"""
+    if not api_key:
+        return "none"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class ClientCache:
+    """Thread-safe LRU cache with TTL expiry for expensive client objects"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries.pop(key, None)
+
+        # Build outside the lock; a concurrent duplicate build is harmless
+        client = factory()
+
+        with self._lock:
+            self._entries[key] = (client, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return client
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+client_cache = ClientCache(CLIENT_CACHE_MAX_SIZE, CLIENT_CACHE_TTL_SECONDS)
+
+_http_client: Optional[httpx.Client] = None
+_chroma_client = None
+_singleton_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Shared keep-alive connection pool for OpenAI LLM and embedding clients"""
+    global _http_client
+    with _singleton_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            )
+        return _http_client
+
+
+def get_chroma_client():
+    """Single persistent Chroma client so the SQLite store is opened once"""
+    global _chroma_client
+    with _singleton_lock:
+        if _chroma_client is None:
+            _chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+        return _chroma_client
@@ -0,0 +1,192 @@
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from app.config import CONTEXT_TOKEN_BUDGET, RERANKER_MODEL
+from .embedding_pipeline import estimate_tokens
+from .keyword_index import tokenize
+
+RERANKERS = ("none", "lexical", "cross-encoder")
+# Chunks sharing this fraction of their terms are treated as duplicates
+DUPLICATE_JACCARD = 0.9
+
+# Keys are model families; dated or suffixed names match their longest prefix
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "gemini-2.5-flash": 1048576,
+    "gemini-2.5-pro": 1048576,
+    "gemini-2.0-flash": 1048576,
+    "gemini-1.5-flash": 1000000,
+    "gemini-1.5-pro": 2000000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def merge_overlapping(documents: List[Document]) -> List[Document]:
+    """
+    Stitch chunks cut from the same page whose character ranges overlap
+    (the splitter repeats CHUNK_OVERLAP characters between neighbours).
+    The merged chunk keeps the rank of its best-ranked part.
+    """
+    merged: List[Document] = []
+    for document in documents:
+        metadata = document.metadata or {}
+        start = metadata.get("start_index")
+        target = None
+        if start is not None and metadata.get("content_hash"):
+            for candidate in merged:
+                if _same_page(candidate, document) and _overlaps(candidate, document):
+                    target = candidate
+                    break
+        if target is None:
+            merged.append(
+                Document(page_content=document.page_content, metadata=dict(metadata))
+            )
+            continue
+
+        first, second = sorted(
+            [target, document], key=lambda doc: doc.metadata["start_index"]
+        )
+        first_end = first.metadata["start_index"] + len(first.page_content)
+        second_end = second.metadata["start_index"] + len(second.page_content)
+        overlap = first_end - second.metadata["start_index"]
+        if second_end > first_end:
+            text = first.page_content + second.page_content[overlap:]
+        else:
+            text = first.page_content
+        target.page_content = text
+        target.metadata["start_index"] = first.metadata["start_index"]
+    return merged
+
+
+def _same_page(a: Document, b: Document) -> bool:
+    return a.metadata.get("content_hash") == b.metadata.get(
+        "content_hash"
+    ) and a.metadata.get("page") == b.metadata.get("page")
+
+
+def _overlaps(a: Document, b: Document) -> bool:
+    a_start, b_start = a.metadata["start_index"], b.metadata["start_index"]
+    return a_start <= b_start + len(b.page_content) and b_start <= a_start + len(
+        a.page_content
+    )
+
+
+def drop_near_duplicates(
+    documents: List[Document], threshold: float = DUPLICATE_JACCARD
+) -> List[Document]:
+    kept, kept_terms = [], []
+    for document in documents:
+        terms = set(tokenize(document.page_content))
+        if any(_jaccard(terms, other) >= threshold for other in kept_terms):
+            continue
+        kept.append(document)
+        kept_terms.append(terms)
+    return kept
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / len(a | b)
+
+
+def lexical_rerank(query: str, documents: List[Document]) -> List[Document]:
+    """Order candidates by query-term coverage, weighted by rarity among them"""
+    query_terms = set(tokenize(query))
+    if not query_terms or not documents:
+        return documents
+
+    doc_terms = [Counter(tokenize(doc.page_content)) for doc in documents]
+    count = len(documents)
+    idf: Dict[str, float] = {}
+    for term in query_terms:
+        df = sum(1 for terms in doc_terms if term in terms)
+        idf[term] = math.log(1 + (count - df + 0.5) / (df + 0.5))
+
+    def score(index: int) -> float:
+        terms = doc_terms[index]
+        length = sum(terms.values()) or 1
+        return sum(
+            idf[t] * (1 + math.log(terms[t])) for t in query_terms if terms[t]
+        ) / math.sqrt(length)
+
+    # Ties keep the retriever's order
+    order = sorted(range(count), key=lambda i: (-score(i), i))
+    return [documents[i] for i in order]
+
+
+def _get_cross_encoder():
+    global _cross_encoder
+    with _cross_encoder_lock:
+        if _cross_encoder is None:
+            from sentence_transformers import CrossEncoder
+
+            _cross_encoder = CrossEncoder(RERANKER_MODEL)
+        return _cross_encoder
+
+
+def rerank(query: str, documents: List[Document], method: str) -> List[Document]:
+    if method == "lexical":
+        return lexical_rerank(query, documents)
+    if method == "cross-encoder":
+        try:
+            model = _get_cross_encoder()
+        except ImportError:
+            print("sentence-transformers is not installed; using lexical reranking")
+            return lexical_rerank(query, documents)
+        scores = model.predict([(query, doc.page_content) for doc in documents])
+        order = sorted(range(len(documents)), key=lambda i: (-scores[i], i))
+        return [documents[i] for i in order]
+    return documents
+
+
+def refine_chunks(
+    query: str, documents: List[Document], k: int, reranker: str = "none"
+) -> List[Document]:
+    """Rerank retrieved candidates, keep the top k, then merge and dedupe them"""
+    documents = rerank(query, documents, reranker)[:k]
+    return drop_near_duplicates(merge_overlapping(documents))
+
+
+def context_token_budget(model: str, override: Optional[int] = None) -> int:
+    """Context tokens for an LLM: a quarter of its window, capped by config"""
+    if override:
+        return override
+    return min(CONTEXT_TOKEN_BUDGET, context_window(model) // 4)
+
+
+def context_window(model: str) -> int:
+    """Context window of a model, e.g. gpt-4o-2024-08-06 resolves via gpt-4o"""
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    families = [family for family in MODEL_CONTEXT_WINDOWS if model.startswith(family)]
+    if not families:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(families, key=len)]
+
+
+def pack_context(chunks: List[str], budget: int) -> str:
+    """Fill the token budget with chunks in rank order"""
+    packed, used = [], 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk)
+        if used + tokens <= budget:
+            packed.append(chunk)
+            used += tokens
+        elif not packed:
+            # The best chunk alone is too large; keep as much of it as fits
+            packed.append(chunk[: budget * 4])
+            break
+    return "\n".join(packed)
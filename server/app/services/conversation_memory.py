@@ -0,0 +1,338 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from app.config import (
+    CONVERSATION_CACHE_SIZE,
+    HISTORY_COMPACT_TOKENS,
+    HISTORY_KEEP_TURNS,
+)
+from app.database import get_session
+from app.models.conversation import ConversationSummary, ConversationTurn
+from .embedding_pipeline import estimate_tokens
+from .response_cache import normalize_query
+
+ConversationKey = Tuple[int, str]
+# Retrieved queries remembered per Knowledge Base node of a conversation
+RETRIEVALS_PER_NODE = 4
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+@dataclass
+class ConversationWindow:
+    """Latest summary plus the turns not yet folded into it"""
+
+    summary: Optional[str] = None
+    summary_tokens: int = 0
+    # Last turn folded into the summary
+    through_turn_id: int = 0
+    # (turn id, role, content, tokens), oldest first
+    turns: List[Tuple[int, str, str, int]] = field(default_factory=list)
+
+    @property
+    def pending_tokens(self) -> int:
+        return sum(turn[3] for turn in self.turns)
+
+    @property
+    def last_turn_id(self) -> int:
+        return self.turns[-1][0] if self.turns else self.through_turn_id
+
+
+class ConversationMemory:
+    """
+    Chat history per (workflow, conversation). Turns are appended and never
+    rewritten; once they outgrow HISTORY_COMPACT_TOKENS the older ones are
+    folded into a new summary row, so the prompt stays roughly flat.
+    """
+
+    def __init__(self, max_conversations: int):
+        self.max_conversations = max_conversations
+        self._windows: "OrderedDict[ConversationKey, ConversationWindow]" = (
+            OrderedDict()
+        )
+        self._compacting = set()
+        self._lock = threading.Lock()
+
+    def window(self, workflow_id: int, conversation_id: str) -> ConversationWindow:
+        """
+        Cached window, caught up with turns and summaries other processes
+        wrote since it was last read
+        """
+        key = (workflow_id, conversation_id)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None:
+                self._windows.move_to_end(key)
+
+        if window is None:
+            window = self._load(workflow_id, conversation_id)
+            with self._lock:
+                self._remember(key, window)
+            return window
+
+        self._refresh(workflow_id, conversation_id, window)
+        return window
+
+    def history_text(
+        self, workflow_id: int, conversation_id: str, budget: int
+    ) -> Optional[str]:
+        """Summary and newest turns that fit the token budget, oldest first"""
+        window = self.window(workflow_id, conversation_id)
+        remaining = budget - window.summary_tokens
+        lines = []
+        for _, role, content, tokens in reversed(window.turns):
+            if tokens > remaining:
+                break
+            lines.append(f"{ROLE_LABELS.get(role, role)}: {content}")
+            remaining -= tokens
+        lines.reverse()
+
+        if window.summary and remaining >= 0:
+            lines.insert(0, f"Summary of earlier conversation: {window.summary}")
+        return "\n".join(lines) if lines else None
+
+    def append(
+        self, workflow_id: int, conversation_id: str, messages: List[Tuple[str, str]]
+    ) -> ConversationWindow:
+        """Persist (role, content) messages in one commit"""
+        window = self.window(workflow_id, conversation_id)
+        session = None
+        try:
+            session = get_session()
+            rows = [
+                ConversationTurn(
+                    workflow_id=workflow_id,
+                    conversation_id=conversation_id,
+                    role=role,
+                    content=content,
+                    token_count=estimate_tokens(content),
+                )
+                for role, content in messages
+            ]
+            session.add_all(rows)
+            session.commit()
+            new_turns = [
+                (row.id, row.role, row.content, row.token_count) for row in rows
+            ]
+        finally:
+            if session:
+                session.close()
+
+        with self._lock:
+            self._extend(window, new_turns)
+        return window
+
+    def needs_compaction(self, window: ConversationWindow) -> bool:
+        return (
+            window.pending_tokens > HISTORY_COMPACT_TOKENS
+            and len(window.turns) > HISTORY_KEEP_TURNS
+        )
+
+    def compact(
+        self,
+        workflow_id: int,
+        conversation_id: str,
+        summarize: Callable[[str], str],
+    ):
+        """Fold all but the newest HISTORY_KEEP_TURNS turns into a new summary"""
+        key = (workflow_id, conversation_id)
+        with self._lock:
+            if key in self._compacting:
+                return
+            self._compacting.add(key)
+
+        try:
+            window = self.window(workflow_id, conversation_id)
+            folded = window.turns[:-HISTORY_KEEP_TURNS]
+            if not folded:
+                return
+
+            transcript = "\n".join(
+                f"{ROLE_LABELS.get(role, role)}: {content}"
+                for _, role, content, _ in folded
+            )
+            if window.summary:
+                transcript = f"Earlier summary: {window.summary}\n{transcript}"
+            summary = summarize(transcript)
+            through_turn_id = folded[-1][0]
+
+            session = None
+            try:
+                session = get_session()
+                session.add(
+                    ConversationSummary(
+                        workflow_id=workflow_id,
+                        conversation_id=conversation_id,
+                        summary=summary,
+                        through_turn_id=through_turn_id,
+                        token_count=estimate_tokens(summary),
+                    )
+                )
+                session.commit()
+            finally:
+                if session:
+                    session.close()
+
+            with self._lock:
+                self._fold(window, summary, estimate_tokens(summary), through_turn_id)
+        except Exception as e:
+            print(f"Conversation compaction failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._compacting.discard(key)
+
+    def transcript(self, workflow_id: int, conversation_id: str) -> List[Dict]:
+        """Every stored turn of a conversation, oldest first"""
+        session = None
+        try:
+            session = get_session()
+            statement = (
+                select(ConversationTurn)
+                .where(
+                    ConversationTurn.workflow_id == workflow_id,
+                    ConversationTurn.conversation_id == conversation_id,
+                )
+                .order_by(ConversationTurn.id)
+            )
+            return [
+                {
+                    "role": turn.role,
+                    "content": turn.content,
+                    "created_at": turn.created_at,
+                }
+                for turn in session.exec(statement).all()
+            ]
+        finally:
+            if session:
+                session.close()
+
+    def _load(self, workflow_id: int, conversation_id: str) -> ConversationWindow:
+        window = ConversationWindow()
+        self._refresh(workflow_id, conversation_id, window)
+        return window
+
+    def _refresh(
+        self, workflow_id: int, conversation_id: str, window: ConversationWindow
+    ):
+        """Apply summaries and turns stored after the window was last read"""
+        with self._lock:
+            through_turn_id = window.through_turn_id
+        session = None
+        try:
+            session = get_session()
+            latest = session.exec(
+                select(ConversationSummary)
+                .where(
+                    ConversationSummary.workflow_id == workflow_id,
+                    ConversationSummary.conversation_id == conversation_id,
+                    ConversationSummary.through_turn_id > through_turn_id,
+                )
+                .order_by(ConversationSummary.id.desc())
+                .limit(1)
+            ).first()
+            if latest:
+                with self._lock:
+                    self._fold(
+                        window,
+                        latest.summary,
+                        latest.token_count,
+                        latest.through_turn_id,
+                    )
+
+            with self._lock:
+                last_turn_id = window.last_turn_id
+            turns = session.exec(
+                select(ConversationTurn)
+                .where(
+                    ConversationTurn.workflow_id == workflow_id,
+                    ConversationTurn.conversation_id == conversation_id,
+                    ConversationTurn.id > last_turn_id,
+                )
+                .order_by(ConversationTurn.id)
+            ).all()
+            if turns:
+                with self._lock:
+                    self._extend(
+                        window,
+                        [(t.id, t.role, t.content, t.token_count) for t in turns],
+                    )
+        finally:
+            if session:
+                session.close()
+
+    @staticmethod
+    def _fold(
+        window: ConversationWindow, summary: str, tokens: int, through_turn_id: int
+    ):
+        if through_turn_id <= window.through_turn_id:
+            return
+        window.summary = summary
+        window.summary_tokens = tokens
+        window.through_turn_id = through_turn_id
+        window.turns = [t for t in window.turns if t[0] > through_turn_id]
+
+    @staticmethod
+    def _extend(window: ConversationWindow, turns: List[Tuple[int, str, str, int]]):
+        # Another caller may already have read some of these rows back
+        known = {turn[0] for turn in window.turns}
+        fresh = [
+            t for t in turns if t[0] not in known and t[0] > window.through_turn_id
+        ]
+        if fresh:
+            window.turns = sorted(window.turns + fresh, key=lambda turn: turn[0])
+
+    def _remember(self, key: ConversationKey, window: ConversationWindow):
+        self._windows[key] = window
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_conversations:
+            self._windows.popitem(last=False)
+
+
+class RetrievalMemory:
+    """
+    Chunks retrieved earlier in a conversation, per Knowledge Base node.
+    Repeated questions skip retrieval, and follow-ups can carry the previous
+    turn's chunks forward.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # (workflow, conversation, node) -> [(normalized query, chunks)], newest last
+        self._entries: "OrderedDict[Tuple[int, str, str], list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, str, str], query: str) -> Optional[List[str]]:
+        normalized = normalize_query(query)
+        with self._lock:
+            for cached_query, chunks in self._entries.get(key, []):
+                if cached_query == normalized:
+                    return chunks
+        return None
+
+    def previous(self, key: Tuple[int, str, str]) -> List[str]:
+        with self._lock:
+            entries = self._entries.get(key)
+            return list(entries[-1][1]) if entries else []
+
+    def put(self, key: Tuple[int, str, str], query: str, chunks: List[str]):
+        normalized = normalize_query(query)
+        with self._lock:
+            entries = [e for e in self._entries.get(key, []) if e[0] != normalized]
+            entries.append((normalized, list(chunks)))
+            self._entries[key] = entries[-RETRIEVALS_PER_NODE:]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget_workflow(self, workflow_id: int):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == workflow_id]:
+                del self._entries[key]
+
+
+conversation_memory = ConversationMemory(CONVERSATION_CACHE_SIZE)
+retrieval_memory = RetrievalMemory(CONVERSATION_CACHE_SIZE)
@@ -1,10 +1,152 @@
+import os
+from typing import Callable, Optional
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from .vector_store import get_vector_store
+from app.config import INGEST_BATCH_SIZE
+from .vector_store import DEFAULT_COLLECTION, get_vector_store, record_store_dimension
+from .keyword_index import keyword_index
+from .embedding_pipeline import EmbeddingPipeline, get_rate_limiter
+from .ingestion_ledger import (
+    compute_file_hash,
+    is_ingested,
+    make_chunk_id,
+    record_ingestion,
+)
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Called as progress(stage, pages_processed, chunks_embedded)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def is_file_ingested(
+    file_path: str,
+    embedding_model: str = "text-embedding-3-small",
+    collection_name: str = DEFAULT_COLLECTION,
+) -> bool:
+    """Whether this file's contents are already indexed with these settings"""
+    return is_ingested(
+        compute_file_hash(file_path),
+        embedding_model,
+        CHUNK_SIZE,
+        CHUNK_OVERLAP,
+        collection_name,
+    )
+
+
+def ingest_file(
+    file_path: str,
+    api_key: str,
+    embedding_model: str = "text-embedding-3-small",
+    file_name: str = None,
+    progress: Optional[ProgressCallback] = None,
+    collection_name: str = DEFAULT_COLLECTION,
+) -> int:
+    """
+    Parse, split and embed one PDF, returning the number of chunks stored.
+    Raises on failure; skips files already recorded in the ingestion ledger.
+    """
+    if not api_key:
+        raise ValueError("API key is required for document processing")
+
+    # Skip files whose contents were already embedded with these settings
+    content_hash = compute_file_hash(file_path)
+    if is_ingested(
+        content_hash, embedding_model, CHUNK_SIZE, CHUNK_OVERLAP, collection_name
+    ):
+        print(f"Skipping {file_path}: already ingested with {embedding_model}")
+        return 0
+
+    # Pages are loaded lazily and split one at a time; embeddings go out in
+    # fixed-size batches so memory stays flat regardless of PDF size
+    loader = PyMuPDFLoader(file_path)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True
+    )
+    custom_vector_store = get_vector_store(api_key, embedding_model, collection_name)
+
+    page_count = 0
+    chunk_count = 0
+    embedded_count = 0
+
+    def on_batch_done(size: int):
+        nonlocal embedded_count
+        embedded_count += size
+        if progress:
+            progress("embedding", page_count, embedded_count)
+
+    # Batches are embedded concurrently under the API key's token budget
+    pipeline = EmbeddingPipeline(
+        custom_vector_store, get_rate_limiter(api_key), on_batch_done=on_batch_done
+    )
+    batch, batch_ids = [], []
+
+    if progress:
+        progress("parsing", 0, 0)
+
+    # Keyword postings are written alongside the batches; if embedding fails
+    # they are dropped again so sparse search never serves a half-ingested
+    # file. Postings from an earlier complete ingest are identical and kept.
+    had_keywords = keyword_index.has_content(collection_name, content_hash)
+    try:
+        try:
+            for page in loader.lazy_load():
+                page_count += 1
+                for chunk in text_splitter.split_documents([page]):
+                    chunk.metadata["content_hash"] = content_hash
+                    chunk.metadata["chunk_index"] = chunk_count
+                    batch.append(chunk)
+                    batch_ids.append(
+                        make_chunk_id(
+                            content_hash,
+                            embedding_model,
+                            CHUNK_SIZE,
+                            CHUNK_OVERLAP,
+                            chunk_count,
+                        )
+                    )
+                    chunk_count += 1
+
+                    if len(batch) >= INGEST_BATCH_SIZE:
+                        # Deterministic ids make this an upsert rather than an append
+                        keyword_index.add(collection_name, batch)
+                        pipeline.submit(batch, batch_ids)
+                        batch, batch_ids = [], []
+
+            if batch:
+                keyword_index.add(collection_name, batch)
+                pipeline.submit(batch, batch_ids)
+        finally:
+            pipeline.close()
+    except Exception:
+        if not had_keywords:
+            keyword_index.forget_content(collection_name, content_hash)
+        raise
+
+    # The index remembers its vector size so mismatched queries fail clearly
+    record_store_dimension(custom_vector_store)
+    record_ingestion(
+        content_hash,
+        embedding_model,
+        CHUNK_SIZE,
+        CHUNK_OVERLAP,
+        collection_name,
+        chunk_count=chunk_count,
+        file_name=file_name or os.path.basename(file_path),
+    )
+    if progress:
+        progress("done", page_count, embedded_count)
+
+    return chunk_count
 
 
 def process_docs(
-    file_path: str, api_key: str = None, embedding_model: str = "text-embedding-3-small"
+    file_path: str,
+    api_key: str = None,
+    embedding_model: str = "text-embedding-3-small",
+    file_name: str = None,
+    collection_name: str = DEFAULT_COLLECTION,
 ):
     """Process documents with custom API key and embedding model - API key required"""
     try:
@@ -12,17 +154,13 @@ def process_docs(
             print("Error: API key is required for document processing")
             return False
 
-        loader = PyMuPDFLoader(file_path)
-        docs = loader.load()
-
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200, add_start_index=True
+        ingest_file(
+            file_path,
+            api_key,
+            embedding_model,
+            file_name=file_name,
+            collection_name=collection_name,
         )
-        docs = text_splitter.split_documents(docs)
-
-        # Use custom vector store with provided API key
-        custom_vector_store = get_vector_store(api_key, embedding_model)
-        custom_vector_store.add_documents(documents=docs)
         print(f"Documents successfully added to vector store using {embedding_model}")
 
         return True
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.config import QUERY_EMBEDDING_CACHE_PATH, QUERY_EMBEDDING_CACHE_SIZE
+from .vector_store import get_embeddings
+from .embedding_pipeline import estimate_tokens, get_rate_limiter
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of query -> embedding vector keyed by embedding model,
+    optionally backed by a SQLite file so vectors survive restarts
+    """
+
+    def __init__(self, max_size: int, path: Optional[str] = None):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "model TEXT NOT NULL, query TEXT NOT NULL, vector TEXT NOT NULL, "
+                "PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        key = (model, query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                return vector
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            vector = json.loads(row[0])
+            self._remember(key, vector)
+            return vector
+
+    def put(self, model: str, query: str, vector: List[float]):
+        key = (model, query)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (model, query, vector) "
+                    "VALUES (?, ?, ?)",
+                    (model, query, json.dumps(vector)),
+                )
+                self._db.commit()
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_PATH
+)
+
+
+def embed_query_cached(
+    query: str, api_key: str, model: str = "text-embedding-3-small"
+) -> List[float]:
+    """Embed a query, reusing the cached vector for repeats of the same text"""
+    vector = query_embedding_cache.get(model, query)
+    if vector is None:
+        vector = get_embeddings(api_key, model).embed_query(query)
+        query_embedding_cache.put(model, query, vector)
+    return vector
+
+
+def embed_queries_cached(
+    queries: List[str], api_key: str, model: str = "text-embedding-3-small"
+) -> int:
+    """
+    Warm the cache for many queries with a single batched embedding request,
+    returning how many were embedded. OpenAI embeds queries and documents
+    identically, so embed_documents vectors serve later embed_query lookups.
+    """
+    missing = [
+        query
+        for query in dict.fromkeys(queries)
+        if query_embedding_cache.get(model, query) is None
+    ]
+    if not missing:
+        return 0
+
+    # Batches draw from the same per-key token budget as document ingestion
+    get_rate_limiter(api_key).acquire(sum(estimate_tokens(q) for q in missing))
+    vectors = get_embeddings(api_key, model).embed_documents(missing)
+    for query, vector in zip(missing, vectors):
+        query_embedding_cache.put(model, query, vector)
+    return len(missing)
@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+from langchain_chroma import Chroma
+
+from app.config import (
+    EMBEDDING_MAX_IN_FLIGHT,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_TOKENS_PER_MINUTE,
+)
+from .client_cache import fingerprint_api_key
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting requests"""
+    return len(text) // 4 + 1
+
+
+# Transient failures by exception class name, so provider SDKs stay optional
+# (openai, httpx, requests and google-api-core)
+RATE_LIMIT_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+TRANSIENT_ERRORS = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "TransportError",
+    "TimeoutException",
+    "Timeout",
+    "ConnectionError",
+    "ServerError",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+}
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status_code = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    return status_code if isinstance(status_code, int) else None
+
+
+def _error_names(error: Exception) -> Set[str]:
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return _status_code(error) == 429 or bool(_error_names(error) & RATE_LIMIT_ERRORS)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, 5xx, timeouts and dropped connections; not 4xx or bugs"""
+    if _is_rate_limit(error):
+        return True
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or bool(
+        _error_names(error) & TRANSIENT_ERRORS
+    )
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenRateLimiter:
+    """
+    Token bucket on embedding tokens per minute. The effective rate halves on
+    every 429 and creeps back towards the configured budget on success.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.max_rate = float(tokens_per_minute)
+        self.rate = self.max_rate
+        self.tokens = self.max_rate
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.rate, self.tokens + (now - self.updated_at) * self.rate / 60.0
+        )
+        self.updated_at = now
+
+    def acquire(self, tokens: int):
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(tokens, self.rate)
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    return
+                wait_seconds = (needed - self.tokens) * 60.0 / self.rate
+            time.sleep(wait_seconds)
+
+    def penalize(self):
+        with self._lock:
+            self.rate = max(self.max_rate * 0.1, self.rate * 0.5)
+            self.tokens = min(self.tokens, self.rate)
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+
+_limiters: Dict[str, TokenRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: str) -> TokenRateLimiter:
+    """One limiter per API key, shared by every job using that key's quota"""
+    key = fingerprint_api_key(api_key)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = TokenRateLimiter(EMBEDDING_TOKENS_PER_MINUTE)
+        return _limiters[key]
+
+
+class EmbeddingPipeline:
+    """
+    Embeds and stores document batches concurrently with backpressure.
+    submit() blocks while max_in_flight batches are pending, so memory stays
+    bounded; batches whose ids are already stored are skipped, which lets a
+    retried job resume without re-embedding completed work.
+    """
+
+    def __init__(
+        self,
+        vector_store: Chroma,
+        limiter: TokenRateLimiter,
+        max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        on_batch_done: Optional[Callable[[int], None]] = None,
+    ):
+        self.vector_store = vector_store
+        self.limiter = limiter
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.on_batch_done = on_batch_done
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="embed-batch"
+        )
+        self._pending: Set[Future] = set()
+        self.stored = 0
+        self.skipped = 0
+
+    def submit(self, documents: List[Document], ids: List[str]):
+        while len(self._pending) >= self.max_in_flight:
+            self._drain(FIRST_COMPLETED)
+        self._pending.add(self._executor.submit(self._store_batch, documents, ids))
+
+    def close(self):
+        """
+        Wait for all batches; re-raises the first batch that failed for good,
+        either out of retries or with an error that retrying cannot fix
+        """
+        try:
+            while self._pending:
+                self._drain(FIRST_COMPLETED)
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _drain(self, return_when):
+        done, self._pending = wait(self._pending, return_when=return_when)
+        for future in done:
+            stored, skipped = future.result()
+            self.stored += stored
+            self.skipped += skipped
+            if self.on_batch_done:
+                self.on_batch_done(stored + skipped)
+
+    def _store_batch(self, documents: List[Document], ids: List[str]):
+        existing = set(self.vector_store.get(ids=ids, include=[])["ids"])
+        todo = [(doc, i) for doc, i in zip(documents, ids) if i not in existing]
+        if not todo:
+            return 0, len(documents)
+
+        docs, todo_ids = [d for d, _ in todo], [i for _, i in todo]
+        tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                self.vector_store.add_documents(documents=docs, ids=todo_ids)
+                self.limiter.reward()
+                return len(docs), len(existing)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                if _is_rate_limit(e):
+                    self.limiter.penalize()
+                delay = _retry_after(e) or min(60.0, 2**attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
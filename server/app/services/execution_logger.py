@@ -0,0 +1,70 @@
+import atexit
+import logging
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Tuple
+
+from app.config import EXECUTION_LOG_LEVEL
+
+# Verbosity accepted by ?log= and EXECUTION_LOG_LEVEL; "none" is above any record
+LOG_LEVELS = {
+    "none": logging.CRITICAL + 10,
+    "summary": logging.INFO,
+    "debug": logging.DEBUG,
+}
+
+# Worker threads only enqueue records; a single listener thread does the writes
+_sink_queue: queue.SimpleQueue = queue.SimpleQueue()
+_console = logging.StreamHandler(sys.stdout)
+_console.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+_listener = QueueListener(_sink_queue, _console)
+_listener.start()
+atexit.register(_listener.stop)
+
+console_logger = logging.getLogger("app.execution")
+console_logger.setLevel(LOG_LEVELS.get(EXECUTION_LOG_LEVEL, logging.INFO))
+console_logger.addHandler(QueueHandler(_sink_queue))
+console_logger.propagate = False
+
+
+class ExecutionLogger:
+    """
+    Per-run execution log. Messages use %-style arguments and are only
+    formatted if the request's level or the console level wants them.
+    """
+
+    def __init__(self, level: str = "none"):
+        self.level = LOG_LEVELS[level]
+        self._records: List[Tuple[float, str, tuple]] = []
+
+    def enabled_for(self, level: int) -> bool:
+        return level >= self.level or console_logger.isEnabledFor(level)
+
+    def _log(self, level: int, message: str, args: tuple):
+        if level >= self.level:
+            # Unformatted; entries() renders them only when returned
+            self._records.append((time.time(), message, args))
+        if console_logger.isEnabledFor(level):
+            console_logger.log(level, message, *args)
+
+    def summary(self, message: str, *args):
+        self._log(logging.INFO, message, args)
+
+    def debug(self, message: str, *args):
+        self._log(logging.DEBUG, message, args)
+
+    def warning(self, message: str, *args):
+        self._log(logging.WARNING, message, args)
+
+    def error(self, message: str, *args):
+        self._log(logging.ERROR, message, args)
+
+    def entries(self) -> List[str]:
+        return [
+            f"[{datetime.fromtimestamp(ts, timezone.utc):%H:%M:%S}] "
+            + (message % args if args else message)
+            for ts, message, args in list(self._records)
+        ]
@@ -0,0 +1,30 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.config import EXECUTION_MAX_WORKERS, NODE_POOL_MAX_WORKERS
+
+# Bounded pool shared by every endpoint that calls into sync LLM/Chroma/DB code
+_executor = ThreadPoolExecutor(
+    max_workers=EXECUTION_MAX_WORKERS, thread_name_prefix="workflow-exec"
+)
+
+# Separate pool for node tasks: runs on _executor block waiting on these,
+# so sharing one pool could deadlock once every worker is a waiting run
+node_executor = ThreadPoolExecutor(
+    max_workers=NODE_POOL_MAX_WORKERS, thread_name_prefix="workflow-node"
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the execution pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_pool():
+    _executor.shutdown(wait=False, cancel_futures=True)
+    node_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,206 @@
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from app.config import INDEX_ALIAS_TTL_SECONDS
+from app.database import get_session
+from app.models.vector_index import VectorIndex
+
+# (logical name, embedding model) -> (physical collection, dimension, resolved_at)
+_aliases: Dict[Tuple[str, str], Tuple[str, Optional[int], float]] = {}
+_lock = threading.Lock()
+
+
+def model_slug(model: str) -> str:
+    """Collection-name-safe short form of an embedding model name"""
+    slug = re.sub(r"[^a-z0-9]+", "-", model.lower()).strip("-")
+    return slug[:28].strip("-") or "model"
+
+
+def _physical_name(logical_name: str, model: str, version: int) -> str:
+    return f"{logical_name}_{model_slug(model)}_v{version}"
+
+
+def _active_row(session, logical_name: str, model: str) -> Optional[VectorIndex]:
+    statement = select(VectorIndex).where(
+        VectorIndex.logical_name == logical_name,
+        VectorIndex.embedding_model == model,
+        VectorIndex.is_active == True,
+    )
+    return session.exec(statement).first()
+
+
+def _next_version(session, logical_name: str, model: str) -> int:
+    """One past the highest version so far, so removed rows never cause reuse"""
+    statement = select(VectorIndex.collection_name).where(
+        VectorIndex.logical_name == logical_name,
+        VectorIndex.embedding_model == model,
+    )
+    versions = [
+        int(match.group(1))
+        for name in session.exec(statement).all()
+        if (match := re.search(r"_v(\d+)$", name))
+    ]
+    return max(versions, default=0) + 1
+
+
+def resolve_index(
+    logical_name: str, model: str, create: bool = True
+) -> Optional[Tuple[str, Optional[int]]]:
+    """
+    Map a logical collection and embedding model to the active physical
+    collection and its recorded dimension, so vector spaces never mix
+    """
+    key = (logical_name, model)
+    with _lock:
+        cached = _aliases.get(key)
+        if cached and time.monotonic() - cached[2] < INDEX_ALIAS_TTL_SECONDS:
+            return cached[0], cached[1]
+
+    session = None
+    try:
+        session = get_session()
+        row = _active_row(session, logical_name, model)
+        if row is None:
+            if not create:
+                return None
+            row = VectorIndex(
+                logical_name=logical_name,
+                embedding_model=model,
+                collection_name=_physical_name(
+                    logical_name, model, _next_version(session, logical_name, model)
+                ),
+            )
+            session.add(row)
+            try:
+                session.commit()
+                session.refresh(row)
+            except IntegrityError:
+                # A concurrent resolve created the index first; use its row
+                session.rollback()
+                row = _active_row(session, logical_name, model)
+                if row is None:
+                    raise
+        resolved = (row.collection_name, row.dimension)
+    finally:
+        if session:
+            session.close()
+
+    with _lock:
+        _aliases[key] = (resolved[0], resolved[1], time.monotonic())
+    return resolved
+
+
+def record_dimension(collection_name: str, dimension: int):
+    session = None
+    try:
+        session = get_session()
+        statement = select(VectorIndex).where(
+            VectorIndex.collection_name == collection_name
+        )
+        row = session.exec(statement).first()
+        if row is None or row.dimension == dimension:
+            return
+        row.dimension = dimension
+        row.updated_at = datetime.now(timezone.utc)
+        session.add(row)
+        session.commit()
+    finally:
+        if session:
+            session.close()
+
+    _invalidate(lambda key, value: value[0] == collection_name)
+
+
+def new_index_version(logical_name: str, model: str) -> str:
+    """Reserve a fresh, inactive physical collection for a re-index"""
+    session = None
+    try:
+        session = get_session()
+        row = VectorIndex(
+            logical_name=logical_name,
+            embedding_model=model,
+            collection_name=_physical_name(
+                logical_name, model, _next_version(session, logical_name, model)
+            ),
+            is_active=False,
+        )
+        session.add(row)
+        session.commit()
+        return row.collection_name
+    finally:
+        if session:
+            session.close()
+
+
+def activate_index(collection_name: str, dimension: Optional[int]) -> List[str]:
+    """
+    Atomically make an index the active one for its (logical name, model),
+    returning the physical collections it replaced
+    """
+    session = None
+    try:
+        session = get_session()
+        statement = select(VectorIndex).where(
+            VectorIndex.collection_name == collection_name
+        )
+        target = session.exec(statement).one()
+        now = datetime.now(timezone.utc)
+
+        replaced = []
+        previous = select(VectorIndex).where(
+            VectorIndex.logical_name == target.logical_name,
+            VectorIndex.embedding_model == target.embedding_model,
+            VectorIndex.is_active == True,
+        )
+        for row in session.exec(previous).all():
+            row.is_active = False
+            row.updated_at = now
+            session.add(row)
+            replaced.append(row.collection_name)
+        # Deactivate first so the one-active-index constraint never sees two
+        session.flush()
+
+        target.is_active = True
+        target.dimension = dimension
+        target.updated_at = now
+        session.add(target)
+        # One commit flips every reader over at once
+        session.commit()
+        logical_name, model = target.logical_name, target.embedding_model
+    finally:
+        if session:
+            session.close()
+
+    _invalidate(lambda key, value: key == (logical_name, model))
+    return replaced
+
+
+def forget_indexes(logical_prefix: str):
+    """Remove registry rows for every index under a logical name prefix"""
+    session = None
+    try:
+        session = get_session()
+        statement = select(VectorIndex).where(
+            # Escaped so "_" in "wf1_" cannot also match wf10_, wf100_...
+            VectorIndex.logical_name.startswith(logical_prefix, autoescape=True)
+        )
+        for row in session.exec(statement).all():
+            session.delete(row)
+        session.commit()
+    finally:
+        if session:
+            session.close()
+
+    _invalidate(lambda key, value: key[0].startswith(logical_prefix))
+
+
+def _invalidate(predicate):
+    with _lock:
+        for key in [k for k, v in _aliases.items() if predicate(k, v)]:
+            del _aliases[key]
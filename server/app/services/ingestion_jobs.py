@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from app.config import INGEST_WORKERS
+from app.database import get_session
+from app.models.ingestion import IngestionJob
+from .document_service import ingest_file, is_file_ingested
+from .vector_store import collection_name_for
+
+ACTIVE_STATUSES = ("queued", "parsing", "embedding")
+# Failure that says nothing about the file, so the file may be queued again
+INTERRUPTED_ERROR = "Interrupted by server restart; please resubmit"
+
+_worker_pool = ThreadPoolExecutor(
+    max_workers=INGEST_WORKERS, thread_name_prefix="ingest-worker"
+)
+# (file path, embedding model, collection) -> job id, so a file is never queued
+# twice at once for the same index
+_active_jobs: Dict[Tuple[str, str, str], int] = {}
+_lock = threading.Lock()
+
+
+def _update_job(job_id: int, **fields):
+    session = None
+    try:
+        session = get_session()
+        job = session.get(IngestionJob, job_id)
+        if not job:
+            return
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+    finally:
+        if session:
+            session.close()
+
+
+def _run_job(
+    job_id: int,
+    file_path: str,
+    api_key: str,
+    embedding_model: str,
+    collection_name: str,
+    remove_file: bool = False,
+):
+    def progress(stage: str, pages: int, chunks: int):
+        _update_job(job_id, status=stage, pages_processed=pages, chunks_embedded=chunks)
+
+    try:
+        job = get_job(job_id)
+        ingest_file(
+            file_path,
+            api_key,
+            embedding_model,
+            file_name=job.file_name if job else None,
+            progress=progress,
+            collection_name=collection_name,
+        )
+        _update_job(job_id, status="done")
+    except Exception as e:
+        print(f"Ingestion job {job_id} failed: {str(e)}")
+        _update_job(job_id, status="failed", error=str(e)[:2048])
+    finally:
+        with _lock:
+            _active_jobs.pop(
+                (os.path.abspath(file_path), embedding_model, collection_name), None
+            )
+        if remove_file and os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def submit_ingestion_job(
+    file_path: str,
+    api_key: str,
+    embedding_model: str = "text-embedding-3-small",
+    file_name: Optional[str] = None,
+    workflow_id: Optional[int] = None,
+    node_id: Optional[str] = None,
+    remove_file: bool = False,
+) -> Optional[IngestionJob]:
+    """
+    Queue a file for background ingestion. The API key is handed to the worker
+    in memory only and is never written to the jobs table. remove_file deletes
+    a temporary upload once the job has finished with it.
+    """
+    collection_name = collection_name_for(workflow_id, node_id)
+    key = (os.path.abspath(file_path), embedding_model, collection_name)
+    # Check and reserve in one step so concurrent callers queue a file once;
+    # the 0 placeholder is replaced by the job id after the insert
+    with _lock:
+        existing_id = _active_jobs.get(key)
+        if existing_id is None:
+            _active_jobs[key] = 0
+    if existing_id is not None:
+        return _wait_for_job(key, existing_id)
+
+    session = None
+    try:
+        session = get_session()
+        job = IngestionJob(
+            file_path=file_path,
+            file_name=file_name or os.path.basename(file_path),
+            embedding_model=embedding_model,
+            workflow_id=workflow_id,
+            node_id=node_id,
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    except Exception:
+        with _lock:
+            _active_jobs.pop(key, None)
+        raise
+    finally:
+        if session:
+            session.close()
+
+    with _lock:
+        _active_jobs[key] = job.id
+    _worker_pool.submit(
+        _run_job,
+        job.id,
+        file_path,
+        api_key,
+        embedding_model,
+        collection_name,
+        remove_file,
+    )
+    return job
+
+
+def _wait_for_job(key: Tuple[str, str, str], job_id: int) -> Optional[IngestionJob]:
+    """Job already queued under key; waits briefly if its row is still being added"""
+    for _ in range(50):
+        if job_id:
+            return get_job(job_id)
+        time.sleep(0.02)
+        with _lock:
+            job_id = _active_jobs.get(key)
+        if job_id is None:
+            # The reserving caller failed to add its row
+            return None
+    return None
+
+
+def get_job(job_id: int) -> Optional[IngestionJob]:
+    session = None
+    try:
+        session = get_session()
+        return session.get(IngestionJob, job_id)
+    finally:
+        if session:
+            session.close()
+
+
+def ensure_files_queued(
+    uploaded_files: List[Dict[str, Any]],
+    api_key: str,
+    embedding_model: str,
+    workflow_id: Optional[int] = None,
+    node_id: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Make sure every file of a Knowledge Base node is indexed or on its way,
+    without ingesting anything on the caller's thread
+    """
+    counts = {"indexed": 0, "pending": 0, "missing": 0, "failed": 0}
+    collection_name = collection_name_for(workflow_id, node_id)
+    for file_info in uploaded_files:
+        file_path = file_info.get("path")
+        if not file_path or not os.path.exists(file_path):
+            counts["missing"] += 1
+            continue
+
+        if is_file_ingested(file_path, embedding_model, collection_name):
+            counts["indexed"] += 1
+            continue
+
+        # A file whose last job failed would fail again on every turn;
+        # it has to be uploaded again instead
+        latest = _latest_job(file_path, embedding_model, workflow_id, node_id)
+        if latest and latest.status == "failed" and latest.error != INTERRUPTED_ERROR:
+            counts["failed"] += 1
+            continue
+
+        submit_ingestion_job(
+            file_path,
+            api_key,
+            embedding_model,
+            file_name=file_info.get("name"),
+            workflow_id=workflow_id,
+            node_id=node_id,
+        )
+        counts["pending"] += 1
+    return counts
+
+
+def _latest_job(
+    file_path: str,
+    embedding_model: str,
+    workflow_id: Optional[int],
+    node_id: Optional[str],
+) -> Optional[IngestionJob]:
+    session = None
+    try:
+        session = get_session()
+        return session.exec(
+            select(IngestionJob)
+            .where(
+                IngestionJob.file_path == file_path,
+                IngestionJob.embedding_model == embedding_model,
+                IngestionJob.workflow_id == workflow_id,
+                IngestionJob.node_id == node_id,
+            )
+            .order_by(IngestionJob.id.desc())
+            .limit(1)
+        ).first()
+    finally:
+        if session:
+            session.close()
+
+
+def fail_interrupted_jobs():
+    """Jobs left active by a previous process cannot resume without their API key"""
+    session = None
+    try:
+        session = get_session()
+        statement = select(IngestionJob).where(IngestionJob.status.in_(ACTIVE_STATUSES))
+        for job in session.exec(statement).all():
+            job.status = "failed"
+            job.error = INTERRUPTED_ERROR
+            job.updated_at = datetime.now(timezone.utc)
+            session.add(job)
+        session.commit()
+    finally:
+        if session:
+            session.close()
+
+
+def shutdown_workers():
+    _worker_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, select
+
+from app.config import LEDGER_MEMO_SIZE
+from app.database import get_session
+from app.models.ingestion import IngestedDocument
+
+LedgerKey = Tuple[str, str, int, int, str]
+
+# Keys already confirmed in the database, so hot paths skip the lookup.
+# Both memos are LRU-bounded; a miss only costs a DB lookup or a re-hash
+_known_keys: "OrderedDict[LedgerKey, None]" = OrderedDict()
+# (path, size, mtime) -> content hash, so unchanged files are not re-read
+_hash_memo: "OrderedDict[Tuple[str, int, float], str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _remember(memo: OrderedDict, key, value=None):
+    """Insert as most recently used, evicting the oldest entries; hold _lock"""
+    memo[key] = value
+    memo.move_to_end(key)
+    while len(memo) > LEDGER_MEMO_SIZE:
+        memo.popitem(last=False)
+
+
+def compute_file_hash(file_path: str) -> str:
+    """SHA-256 of a file's contents, memoized on path, size and mtime"""
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime)
+
+    with _lock:
+        cached = _hash_memo.get(memo_key)
+        if cached:
+            _hash_memo.move_to_end(memo_key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+
+    with _lock:
+        _remember(_hash_memo, memo_key, content_hash)
+    return content_hash
+
+
+def make_chunk_id(
+    content_hash: str,
+    embedding_model: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    chunk_index: int,
+) -> str:
+    """Deterministic chunk id so re-ingestion overwrites instead of duplicating"""
+    raw = f"{content_hash}:{embedding_model}:{chunk_size}:{chunk_overlap}:{chunk_index}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_ingested(
+    content_hash: str,
+    embedding_model: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    collection_name: str,
+) -> bool:
+    key = (content_hash, embedding_model, chunk_size, chunk_overlap, collection_name)
+    with _lock:
+        if key in _known_keys:
+            _known_keys.move_to_end(key)
+            return True
+
+    session = None
+    try:
+        session = get_session()
+        statement = select(IngestedDocument.id).where(
+            IngestedDocument.content_hash == content_hash,
+            IngestedDocument.embedding_model == embedding_model,
+            IngestedDocument.chunk_size == chunk_size,
+            IngestedDocument.chunk_overlap == chunk_overlap,
+            IngestedDocument.collection_name == collection_name,
+        )
+        found = session.exec(statement).first() is not None
+    finally:
+        if session:
+            session.close()
+
+    if found:
+        with _lock:
+            _remember(_known_keys, key)
+    return found
+
+
+def record_ingestion(
+    content_hash: str,
+    embedding_model: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    collection_name: str,
+    chunk_count: int,
+    file_name: Optional[str] = None,
+) -> None:
+    key = (content_hash, embedding_model, chunk_size, chunk_overlap, collection_name)
+    session = None
+    try:
+        session = get_session()
+        statement = select(IngestedDocument).where(
+            IngestedDocument.content_hash == content_hash,
+            IngestedDocument.embedding_model == embedding_model,
+            IngestedDocument.chunk_size == chunk_size,
+            IngestedDocument.chunk_overlap == chunk_overlap,
+            IngestedDocument.collection_name == collection_name,
+        )
+        record = session.exec(statement).first()
+        if record is None:
+            record = IngestedDocument(
+                content_hash=content_hash,
+                embedding_model=embedding_model,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                collection_name=collection_name,
+            )
+        record.chunk_count = chunk_count
+        record.file_name = file_name
+
+        session.add(record)
+        try:
+            session.commit()
+        except IntegrityError:
+            # A concurrent ingestion of the same contents recorded it first;
+            # the chunks are already stored, so this is still a success
+            session.rollback()
+    finally:
+        if session:
+            session.close()
+
+    with _lock:
+        _remember(_known_keys, key)
+
+
+def copy_ingestions(collection_name: str, source_model: str, target_model: str) -> int:
+    """Carry a collection's ledger over to a model it was re-indexed with"""
+    session = None
+    try:
+        session = get_session()
+        statement = select(IngestedDocument).where(
+            IngestedDocument.collection_name == collection_name,
+            IngestedDocument.embedding_model == source_model,
+        )
+        rows = session.exec(statement).all()
+        copied = 0
+        for row in rows:
+            existing = session.exec(
+                select(IngestedDocument.id).where(
+                    IngestedDocument.content_hash == row.content_hash,
+                    IngestedDocument.embedding_model == target_model,
+                    IngestedDocument.chunk_size == row.chunk_size,
+                    IngestedDocument.chunk_overlap == row.chunk_overlap,
+                    IngestedDocument.collection_name == collection_name,
+                )
+            ).first()
+            if existing is not None:
+                continue
+            session.add(
+                IngestedDocument(
+                    content_hash=row.content_hash,
+                    embedding_model=target_model,
+                    chunk_size=row.chunk_size,
+                    chunk_overlap=row.chunk_overlap,
+                    collection_name=collection_name,
+                    file_name=row.file_name,
+                    chunk_count=row.chunk_count,
+                )
+            )
+            copied += 1
+        session.commit()
+        return copied
+    finally:
+        if session:
+            session.close()
+
+
+def forget_collections(collection_prefix: str) -> None:
+    """Drop ledger rows for collections that were deleted from the vector store"""
+    session = None
+    try:
+        session = get_session()
+        session.exec(
+            delete(IngestedDocument).where(
+                # Escaped so "_" in "wf1_" cannot also match wf10_, wf100_...
+                IngestedDocument.collection_name.startswith(
+                    collection_prefix, autoescape=True
+                )
+            )
+        )
+        session.commit()
+    finally:
+        if session:
+            session.close()
+
+    with _lock:
+        for key in [k for k in _known_keys if k[4].startswith(collection_prefix)]:
+            del _known_keys[key]
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from app.config import KEYWORD_INDEX_PATH
+
+# Identifiers such as "AB-1234" or "v2.1" are kept whole as well as split
+_COMPOUND = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    text = (text or "").lower()
+    return _WORD.findall(text) + _COMPOUND.findall(text)
+
+
+def chunk_key(document: Document) -> str:
+    """Model-independent identity of a chunk, shared by dense and sparse results"""
+    metadata = document.metadata or {}
+    if metadata.get("content_hash") and metadata.get("chunk_index") is not None:
+        return f"{metadata['content_hash']}:{metadata['chunk_index']}"
+    digest = hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+    return f"text:{digest}"
+
+
+def _content_range(content_hash: str) -> Tuple[str, str]:
+    # chunk_key ids of one content hash sort between "<hash>:" and "<hash>;"
+    return f"{content_hash}:", f"{content_hash};"
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index per collection in a local SQLite file. Lookups need
+    no network call, so keyword-only retrieval never touches the embedding API.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Opened on first use, so importing the module creates no file
+        self._db = None
+        self._lock = threading.Lock()
+        # collection -> (chunk count, average chunk length)
+        self._stats: Dict[str, Tuple[int, float]] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold self._lock
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS kw_chunks ("
+                "collection TEXT NOT NULL, chunk_id TEXT NOT NULL, "
+                "content TEXT NOT NULL, metadata TEXT NOT NULL, "
+                "length INTEGER NOT NULL, PRIMARY KEY (collection, chunk_id));"
+                "CREATE TABLE IF NOT EXISTS kw_postings ("
+                "collection TEXT NOT NULL, term TEXT NOT NULL, "
+                "chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (collection, term, chunk_id));"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def add(self, collection: str, documents: List[Document]):
+        """Index chunks; re-adding a chunk replaces its previous postings"""
+        rows, postings = [], []
+        for document in documents:
+            chunk_id = chunk_key(document)
+            terms = Counter(tokenize(document.page_content))
+            rows.append(
+                (
+                    collection,
+                    chunk_id,
+                    document.page_content,
+                    json.dumps(document.metadata or {}),
+                    sum(terms.values()),
+                )
+            )
+            postings.extend((collection, t, chunk_id, tf) for t, tf in terms.items())
+
+        with self._lock:
+            db = self._connection()
+            db.executemany(
+                "DELETE FROM kw_postings WHERE collection = ? AND chunk_id = ?",
+                [(collection, row[1]) for row in rows],
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO kw_chunks "
+                "(collection, chunk_id, content, metadata, length) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.executemany(
+                "INSERT INTO kw_postings (collection, term, chunk_id, tf) "
+                "VALUES (?, ?, ?, ?)",
+                postings,
+            )
+            db.commit()
+            self._stats.pop(collection, None)
+
+    def search(
+        self, collection: str, query: str, k: int = 3
+    ) -> List[Tuple[Document, float]]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            db = self._connection()
+            count, avg_length = self._collection_stats(db, collection)
+            if count == 0:
+                return []
+
+            placeholders = ",".join("?" for _ in terms)
+            postings = db.execute(
+                "SELECT p.term, p.chunk_id, p.tf, c.length FROM kw_postings p "
+                "JOIN kw_chunks c ON c.collection = p.collection "
+                "AND c.chunk_id = p.chunk_id "
+                f"WHERE p.collection = ? AND p.term IN ({placeholders})",
+                (collection, *terms),
+            ).fetchall()
+
+            doc_freq = Counter(term for term, _, _, _ in postings)
+            scores: Dict[str, float] = {}
+            for term, chunk_id, tf, length in postings:
+                df = doc_freq[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[chunk_id] = (
+                    scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                )
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            results = []
+            for chunk_id, score in top:
+                content, metadata = db.execute(
+                    "SELECT content, metadata FROM kw_chunks "
+                    "WHERE collection = ? AND chunk_id = ?",
+                    (collection, chunk_id),
+                ).fetchone()
+                document = Document(page_content=content, metadata=json.loads(metadata))
+                results.append((document, score))
+            return results
+
+    def has_content(self, collection: str, content_hash: str) -> bool:
+        """Whether any chunk of this file content is indexed in the collection"""
+        with self._lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT 1 FROM kw_chunks WHERE collection = ? "
+                "AND chunk_id >= ? AND chunk_id < ? LIMIT 1",
+                (collection, *_content_range(content_hash)),
+            ).fetchone()
+        return row is not None
+
+    def forget_content(self, collection: str, content_hash: str):
+        """Drop the chunks of one file's content from a collection"""
+        with self._lock:
+            db = self._connection()
+            for table in ("kw_postings", "kw_chunks"):
+                db.execute(
+                    f"DELETE FROM {table} WHERE collection = ? "
+                    "AND chunk_id >= ? AND chunk_id < ?",
+                    (collection, *_content_range(content_hash)),
+                )
+            db.commit()
+            self._stats.pop(collection, None)
+
+    def forget(self, collection_prefix: str):
+        """Drop every collection whose name starts with the prefix"""
+        pattern = collection_prefix.replace("_", r"\_") + "%"
+        with self._lock:
+            db = self._connection()
+            for table in ("kw_postings", "kw_chunks"):
+                db.execute(
+                    f"DELETE FROM {table} WHERE collection LIKE ? ESCAPE '\\'",
+                    (pattern,),
+                )
+            db.commit()
+            for name in [n for n in self._stats if n.startswith(collection_prefix)]:
+                del self._stats[name]
+
+    def _collection_stats(
+        self, db: sqlite3.Connection, collection: str
+    ) -> Tuple[int, float]:
+        stats = self._stats.get(collection)
+        if stats is None:
+            count, total = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM kw_chunks "
+                "WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+            stats = (count, max(total / count, 1.0) if count else 0.0)
+            self._stats[collection] = stats
+        return stats
+
+
+keyword_index = KeywordIndex(KEYWORD_INDEX_PATH)
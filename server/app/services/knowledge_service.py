@@ -1,4 +1,137 @@
-from .vector_store import get_vector_store
+from typing import Dict, List
+from langchain_core.documents import Document
+from .vector_store import DEFAULT_COLLECTION, get_index_store, index_dimension
+from .embedding_cache import embed_query_cached
+from .keyword_index import chunk_key, keyword_index
+from .context_assembly import refine_chunks
+from .tracing import phase
+
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+# Standard RRF damping constant; higher values flatten the rank contribution
+RRF_K = 60
+# Candidates pulled from each retriever before fusion or reranking
+HYBRID_CANDIDATES = 20
+RERANK_CANDIDATES = 20
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]], k: int, rrf_k: int = RRF_K
+) -> List[Document]:
+    """Merge ranked lists by summing 1 / (rrf_k + rank) per chunk"""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = chunk_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, document)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ordered[:k]]
+
+
+def _dense_search(
+    query: str,
+    k: int,
+    api_key: str,
+    embedding_model: str,
+    collection_name: str,
+    mmr: bool = False,
+    lambda_mult: float = 0.5,
+) -> List[Document]:
+    if not api_key:
+        raise ValueError("API key is required for context retrieval.")
+
+    # Nothing has been indexed with this embedding model yet
+    physical_name, dimension = index_dimension(collection_name, embedding_model)
+    if physical_name is None:
+        return []
+
+    # Repeat queries reuse their cached vector and skip the embedding call
+    with phase("embed_query"):
+        query_vector = embed_query_cached(query, api_key, embedding_model)
+    if dimension and len(query_vector) != dimension:
+        raise ValueError(
+            f"index expects {dimension}-dimensional vectors but "
+            f"{embedding_model} returned {len(query_vector)}. "
+            "Re-index the collection for this model."
+        )
+
+    custom_vector_store = get_index_store(api_key, embedding_model, physical_name)
+    with phase("vector_search"):
+        if mmr:
+            # Maximal marginal relevance trades some similarity for diversity
+            return custom_vector_store.max_marginal_relevance_search_by_vector(
+                query_vector, k=k, fetch_k=max(k * 4, 20), lambda_mult=lambda_mult
+            )
+        return custom_vector_store.similarity_search_by_vector(query_vector, k=k)
+
+
+def _sparse_search(query: str, k: int, collection_name: str) -> List[Document]:
+    with phase("keyword_search"):
+        return [doc for doc, _ in keyword_index.search(collection_name, query, k=k)]
+
+
+def retrieve_documents(
+    query: str,
+    k: int = 3,
+    api_key: str = None,
+    embedding_model: str = "text-embedding-3-small",
+    collection_name: str = DEFAULT_COLLECTION,
+    mode: str = "dense",
+    mmr: bool = False,
+    lambda_mult: float = 0.5,
+) -> List[Document]:
+    """
+    Retrieve chunks by embedding similarity (dense), BM25 keywords (sparse)
+    or both merged with reciprocal rank fusion (hybrid). Raises on failure.
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}'")
+
+    if mode == "sparse":
+        # Keyword lookups are local; the embedding API is never called
+        return _sparse_search(query, k, collection_name)
+    if mode == "dense":
+        return _dense_search(
+            query, k, api_key, embedding_model, collection_name, mmr, lambda_mult
+        )
+
+    candidates = max(k, HYBRID_CANDIDATES)
+    sparse = _sparse_search(query, candidates, collection_name)
+    dense = _dense_search(
+        query, candidates, api_key, embedding_model, collection_name, mmr, lambda_mult
+    )
+    return reciprocal_rank_fusion([dense, sparse], k)
+
+
+def retrieve_chunks(
+    query: str,
+    k: int = 3,
+    api_key: str = None,
+    embedding_model: str = "text-embedding-3-small",
+    collection_name: str = DEFAULT_COLLECTION,
+    mode: str = "dense",
+    mmr: bool = False,
+    lambda_mult: float = 0.5,
+    reranker: str = "none",
+) -> List[Document]:
+    """
+    Retrieve, optionally rerank, then merge overlapping and near-duplicate
+    chunks so neighbouring splits do not repeat text in the prompt
+    """
+    candidates = k if reranker == "none" else max(k, RERANK_CANDIDATES)
+    documents = retrieve_documents(
+        query,
+        k=candidates,
+        api_key=api_key,
+        embedding_model=embedding_model,
+        collection_name=collection_name,
+        mode=mode,
+        mmr=mmr,
+        lambda_mult=lambda_mult,
+    )
+    with phase("rerank"):
+        return refine_chunks(query, documents, k, reranker)
 
 
 def retrieve_context(
@@ -6,15 +139,28 @@ def retrieve_context(
     k: int = 3,
     api_key: str = None,
     embedding_model: str = "text-embedding-3-small",
+    collection_name: str = DEFAULT_COLLECTION,
+    mode: str = "dense",
+    mmr: bool = False,
+    lambda_mult: float = 0.5,
+    reranker: str = "none",
 ) -> str:
     """Retrieve context with custom API key and embedding model - API key required"""
     try:
-        if not api_key:
+        if not api_key and mode != "sparse":
             return "Error: API key is required for context retrieval."
 
-        # Use custom vector store with provided API key
-        custom_vector_store = get_vector_store(api_key, embedding_model)
-        results = custom_vector_store.similarity_search(query, k=k)
+        results = retrieve_chunks(
+            query,
+            k=k,
+            api_key=api_key,
+            embedding_model=embedding_model,
+            collection_name=collection_name,
+            mode=mode,
+            mmr=mmr,
+            lambda_mult=lambda_mult,
+            reranker=reranker,
+        )
 
         if not results:
             return "No relevant context found."
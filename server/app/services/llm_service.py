@@ -1,64 +1,144 @@
+import time
+from typing import Iterator
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
-
-
-def generate_response(
-    query: str,
-    context: str = None,
-    custom_prompt: str = None,
-    api_key: str = None,
-    model: str = "gemini-2.5-flash",
-    temperature: float = 0.7,
+from .client_cache import client_cache, fingerprint_api_key, get_http_client
+from .embedding_pipeline import estimate_tokens
+from .tracing import annotate, record_phase
+
+
+def get_llm(api_key: str, model: str, temperature: float):
+    """Get a cached chat model client for the provider implied by the model name"""
+    # Determine which LLM to use based on model
+    if model.startswith("gpt-"):
+        # OpenAI models
+        key = ("llm", "openai", model, fingerprint_api_key(api_key), temperature)
+        return client_cache.get_or_create(
+            key,
+            lambda: ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=api_key,
+                http_client=get_http_client(),
+            ),
+        )
+
+    # Google models (default)
+    key = ("llm", "google", model, fingerprint_api_key(api_key), temperature)
+    return client_cache.get_or_create(
+        key,
+        lambda: ChatGoogleGenerativeAI(
+            model=model, temperature=temperature, google_api_key=api_key
+        ),
+    )
+
+
+def build_prompt(
+    query: str, context: str = None, custom_prompt: str = None, history: str = None
 ) -> str:
-    try:
-        # API key is required - no fallback
-        if not api_key:
-            return "Error: No API key provided. Please add your OpenAI or Google API key in the component."
+    """Build the prompt sent to the LLM from the query, context and custom prompt"""
+    if custom_prompt:
+        header = custom_prompt
+    elif context:
+        header = "Based on the following context, answer the user's question."
+    else:
+        header = "Answer the following question:"
 
-        # Determine which LLM to use based on model
-        if model.startswith("gpt-"):
-            # OpenAI models
-            llm = ChatOpenAI(model=model, temperature=temperature, api_key=api_key)
-        else:
-            # Google models (default)
-            llm = ChatGoogleGenerativeAI(
-                model=model, temperature=temperature, google_api_key=api_key
-            )
+    sections = [header]
+    if context:
+        sections.append(f"Context: {context}")
+    if history:
+        sections.append(f"Conversation so far:\n{history}")
+    sections.append(f"Question: {query}")
+    sections.append("Answer:")
+    return "\n\n".join(sections)
 
-        # Build prompt
-        if custom_prompt:
-            if context:
-                prompt = f"""{custom_prompt}
 
-Context: {context}
+SUMMARY_PROMPT = """Summarize the conversation below in a few sentences. Keep facts, names, \
+numbers and open questions the assistant may need later; drop pleasantries.
 
-Question: {query}
+{transcript}
 
-Answer:"""
-            else:
-                prompt = f"""{custom_prompt}
+Summary:"""
 
-Question: {query}
 
-Answer:"""
-        else:
-            if context:
-                prompt = f"""Based on the following context, answer the user's question.
+def summarize_conversation(transcript: str, api_key: str, model: str) -> str:
+    """Condense older chat turns into a short summary; raises on failure"""
+    llm = get_llm(api_key, model, 0.0)
+    return llm.invoke(SUMMARY_PROMPT.format(transcript=transcript)).content.strip()
 
-Context: {context}
 
-Question: {query}
+def generate_response(
+    query: str,
+    context: str = None,
+    custom_prompt: str = None,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash",
+    temperature: float = 0.7,
+    history: str = None,
+) -> str:
+    """Generate a complete response; raises on a missing key or provider failure"""
+    # API key is required - no fallback
+    if not api_key:
+        raise ValueError(
+            "No API key provided. Please add your OpenAI or Google API key in the component."
+        )
 
-Answer:"""
-            else:
-                prompt = f"""Answer the following question:
+    llm = get_llm(api_key, model, temperature)
 
-Question: {query}
+    prompt = build_prompt(query, context, custom_prompt, history)
 
-Answer:"""
+    started = time.perf_counter()
+    response = llm.invoke(prompt)
+    elapsed = time.perf_counter() - started
+    # Without streaming the first token arrives with the whole response
+    record_phase("llm_first_token", elapsed)
+    record_phase("llm_total", elapsed)
+    _record_usage(prompt, response.content, getattr(response, "usage_metadata", None))
+    return response.content
 
-        response = llm.invoke(prompt)
-        return response.content
 
-    except Exception as e:
-        return f"Error generating response: {str(e)}"
+def stream_response(
+    query: str,
+    context: str = None,
+    custom_prompt: str = None,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash",
+    temperature: float = 0.7,
+    history: str = None,
+) -> Iterator[str]:
+    """Yield response text chunks as the provider streams them; raises on failure"""
+    if not api_key:
+        raise ValueError(
+            "No API key provided. Please add your OpenAI or Google API key in the component."
+        )
+
+    llm = get_llm(api_key, model, temperature)
+    prompt = build_prompt(query, context, custom_prompt, history)
+
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    usage = None
+    try:
+        for chunk in llm.stream(prompt):
+            if getattr(chunk, "usage_metadata", None):
+                usage = chunk.usage_metadata
+            if chunk.content:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                    record_phase("llm_first_token", first_token)
+                parts.append(chunk.content)
+                yield chunk.content
+    finally:
+        record_phase("llm_total", time.perf_counter() - started)
+        _record_usage(prompt, "".join(parts), usage)
+
+
+def _record_usage(prompt: str, completion: str, usage: dict = None):
+    """Attach token counts to the current trace span, estimating when the provider omits them"""
+    usage = usage or {}
+    annotate(
+        prompt_tokens=usage.get("input_tokens") or estimate_tokens(prompt),
+        completion_tokens=usage.get("output_tokens") or estimate_tokens(completion),
+    )
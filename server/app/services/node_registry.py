@@ -0,0 +1,107 @@
+import importlib
+import threading
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Installed packages add node types by exposing a NodeHandler (or a module
+# that calls register_node_type on import) under this entry-point group
+ENTRY_POINT_GROUP = "ai_workflow.node_types"
+# Built-in handlers register themselves next to the code they call
+BUILTIN_MODULES = ("app.services.workflow_execution_service",)
+
+# Called as run(executor, node, inputs) -> (success, outputs)
+NodeRunner = Callable[
+    [Any, Dict[str, Any], Dict[str, Any]], Tuple[bool, Dict[str, Any]]
+]
+
+
+@dataclass(frozen=True)
+class NodeHandler:
+    """How to run one node type, and what it reads from and adds to the flow"""
+
+    node_type: str
+    run: NodeRunner
+    label: str
+    # Keys the node needs from upstream outputs (user_query is always present)
+    inputs: Tuple[str, ...] = ()
+    # Keys the node adds for its downstream nodes; other new keys are dropped
+    # at dispatch
+    outputs: Tuple[str, ...] = ()
+    # Tie-break when several nodes are ready at once; lower runs first
+    rank: int = 100
+
+
+_handlers: Dict[str, NodeHandler] = {}
+_discovered = False
+_discovering = False
+_lock = threading.RLock()
+
+
+def register_node_type(
+    node_type: str,
+    run: NodeRunner,
+    label: Optional[str] = None,
+    inputs: Tuple[str, ...] = (),
+    outputs: Tuple[str, ...] = (),
+    rank: int = 100,
+) -> NodeHandler:
+    """Register (or replace) the handler for a node type"""
+    handler = NodeHandler(
+        node_type=node_type,
+        run=run,
+        label=label or node_type,
+        inputs=tuple(inputs),
+        outputs=tuple(outputs),
+        rank=rank,
+    )
+    with _lock:
+        _handlers[node_type] = handler
+    return handler
+
+
+def node_type(node_type: str, **options) -> Callable[[NodeRunner], NodeRunner]:
+    """Decorator form of register_node_type for plugin modules"""
+
+    def decorator(run: NodeRunner) -> NodeRunner:
+        register_node_type(node_type, run, **options)
+        return run
+
+    return decorator
+
+
+def discover_node_types():
+    """Import built-in handlers and entry-point plugins, once per process"""
+    global _discovered, _discovering
+    if _discovered:
+        return
+    # Re-entrant: a module imported below may look handlers up while loading
+    with _lock:
+        if _discovered or _discovering:
+            return
+        _discovering = True
+        try:
+            for module in BUILTIN_MODULES:
+                importlib.import_module(module)
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                try:
+                    loaded = entry_point.load()
+                except Exception as e:
+                    print(f"Could not load node type plugin '{entry_point.name}': {e}")
+                    continue
+                if isinstance(loaded, NodeHandler):
+                    _handlers[loaded.node_type] = loaded
+        finally:
+            _discovering = False
+            _discovered = True
+
+
+def get_node_handler(node_type: Optional[str]) -> Optional[NodeHandler]:
+    discover_node_types()
+    return _handlers.get(node_type)
+
+
+def registered_node_types() -> Dict[str, NodeHandler]:
+    discover_node_types()
+    with _lock:
+        return dict(_handlers)
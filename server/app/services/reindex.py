@@ -0,0 +1,160 @@
+"""
+Re-embed a vector collection with another embedding model, offline.
+
+    python -m app.services.reindex --collection my_collection \\
+        --from text-embedding-3-small --to text-embedding-3-large
+
+Documents are read from the source index in pages and re-embedded in batches
+into a fresh model-specific index. Queries keep using the current index until
+the copy is complete, then switch over in a single transaction.
+"""
+
+import argparse
+import hashlib
+import sys
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from app.config import INGEST_BATCH_SIZE, OPENAI_API_KEY
+from app.database import create_db_and_tables
+from .client_cache import get_chroma_client
+from .document_service import CHUNK_OVERLAP, CHUNK_SIZE
+from .embedding_pipeline import EmbeddingPipeline, get_rate_limiter
+from .index_registry import activate_index, new_index_version, resolve_index
+from .keyword_index import keyword_index
+from .ingestion_ledger import copy_ingestions, make_chunk_id
+from .vector_store import collection_name_for, get_index_store, record_store_dimension
+
+
+def _target_id(source_id: str, metadata: dict, target_model: str) -> str:
+    # Match the ids ingest_file would produce so later uploads upsert in place
+    content_hash = metadata.get("content_hash")
+    chunk_index = metadata.get("chunk_index")
+    if content_hash and chunk_index is not None:
+        return make_chunk_id(
+            content_hash, target_model, CHUNK_SIZE, CHUNK_OVERLAP, int(chunk_index)
+        )
+    raw = f"{source_id}:{target_model}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _source_collection(collection_name: str, source_model: str) -> Optional[str]:
+    resolved = resolve_index(collection_name, source_model, create=False)
+    if resolved:
+        return resolved[0]
+    # Collections written before indexes were model-specific use the bare name
+    client = get_chroma_client()
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    return collection_name if collection_name in names else None
+
+
+def reindex_collection(
+    collection_name: str,
+    source_model: str,
+    target_model: str,
+    api_key: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+) -> dict:
+    """Copy a logical collection into a new index for target_model and switch"""
+    if not api_key:
+        raise ValueError("API key is required for re-indexing")
+
+    source_name = _source_collection(collection_name, source_model)
+    if source_name is None:
+        raise ValueError(
+            f"No index found for '{collection_name}' with model {source_model}"
+        )
+
+    source = get_chroma_client().get_collection(source_name)
+    target_name = new_index_version(collection_name, target_model)
+    target_store = get_index_store(api_key, target_model, target_name)
+
+    copied = 0
+    pipeline = EmbeddingPipeline(target_store, get_rate_limiter(api_key))
+    try:
+        offset = 0
+        while True:
+            page = source.get(
+                limit=batch_size, offset=offset, include=["documents", "metadatas"]
+            )
+            ids = page["ids"]
+            if not ids:
+                break
+            documents, target_ids = [], []
+            for source_id, text, metadata in zip(
+                ids, page["documents"], page["metadatas"]
+            ):
+                metadata = dict(metadata or {})
+                documents.append(Document(page_content=text or "", metadata=metadata))
+                target_ids.append(_target_id(source_id, metadata, target_model))
+            # The keyword index is model-independent; refreshing it here also
+            # backfills collections ingested before it existed
+            keyword_index.add(collection_name, documents)
+            pipeline.submit(documents, target_ids)
+            copied += len(ids)
+            offset += len(ids)
+            print(f"Queued {copied} chunks from {source_name} for {target_name}")
+    finally:
+        pipeline.close()
+
+    dimension = record_store_dimension(target_store)
+    copy_ingestions(collection_name, source_model, target_model)
+    replaced = activate_index(target_name, dimension)
+
+    # Indexes for the target model that were just replaced are no longer read
+    client = get_chroma_client()
+    for name in replaced:
+        if name != target_name:
+            client.delete_collection(name)
+
+    return {
+        "collection": collection_name,
+        "source": source_name,
+        "target": target_name,
+        "chunks": copied,
+        "dimension": dimension,
+        "replaced": replaced,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--collection", help="Logical collection name")
+    parser.add_argument("--workflow-id", type=int, help="Workflow of the KB node")
+    parser.add_argument("--node-id", help="Knowledge Base node id")
+    parser.add_argument("--from", dest="source_model", required=True)
+    parser.add_argument("--to", dest="target_model", required=True)
+    parser.add_argument("--api-key", default=OPENAI_API_KEY)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.collection:
+        collection_name = args.collection
+    elif args.workflow_id is not None and args.node_id:
+        collection_name = collection_name_for(args.workflow_id, args.node_id)
+    else:
+        parser.error("pass --collection or both --workflow-id and --node-id")
+
+    create_db_and_tables()
+    try:
+        result = reindex_collection(
+            collection_name,
+            args.source_model,
+            args.target_model,
+            args.api_key,
+            batch_size=args.batch_size,
+        )
+    except Exception as e:
+        print(f"Re-index failed: {str(e)}")
+        return 1
+
+    print(
+        f"Re-indexed {result['chunks']} chunks of {result['collection']} into "
+        f"{result['target']} ({result['dimension']} dimensions)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+
+Scope = Tuple[str, float, str, str]
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer"""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+
+def _hash(text: Optional[str]) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """
+    Two-tier LLM response cache. Entries are scoped by model, temperature,
+    prompt template and retrieved context; within a scope a query hits either
+    on its normalized text or on embedding similarity above a threshold.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # scope -> normalized query -> (response, embedding, created_at), so a
+        # semantic lookup only scans its own model/prompt/context bucket
+        self._buckets: Dict[Scope, Dict[str, tuple]] = {}
+        # (scope, normalized query) in least- to most-recently-used order
+        self._order: "OrderedDict[Tuple[Scope, str], None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def scope_key(
+        model: str, temperature: float, prompt: Optional[str], context: Optional[str]
+    ) -> Scope:
+        return (model, float(temperature), _hash(prompt), _hash(context))
+
+    def lookup(
+        self,
+        scope: Scope,
+        query: str,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        threshold: float = 0.95,
+    ) -> Tuple[Optional[str], Optional[str], Optional[List[float]]]:
+        """
+        Return (response, tier, query_embedding). tier is "exact", "semantic"
+        or None on a miss; the embedding is returned so store() can reuse it.
+        """
+        normalized = normalize_query(query)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._buckets.get(scope, {}).get(normalized)
+            if entry and now - entry[2] < self.ttl_seconds:
+                self._order.move_to_end((scope, normalized))
+                return entry[0], "exact", entry[1]
+            candidates = [
+                (key, embedding)
+                for key, (_, embedding, created_at) in self._buckets.get(
+                    scope, {}
+                ).items()
+                if embedding is not None and now - created_at < self.ttl_seconds
+            ]
+
+        if embed is None:
+            return None, None, None
+
+        vector = embed(normalized)
+        # Similarity is computed outside the lock on a snapshot of the bucket
+        best_key, best_score = None, threshold
+        for key, embedding in candidates:
+            score = _cosine(vector, embedding)
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is not None:
+            with self._lock:
+                entry = self._buckets.get(scope, {}).get(best_key)
+                if entry:
+                    self._order.move_to_end((scope, best_key))
+                    return entry[0], "semantic", vector
+        return None, None, vector
+
+    def store(
+        self,
+        scope: Scope,
+        query: str,
+        response: str,
+        embedding: Optional[List[float]] = None,
+    ):
+        normalized = normalize_query(query)
+        with self._lock:
+            self._buckets.setdefault(scope, {})[normalized] = (
+                response,
+                embedding,
+                time.monotonic(),
+            )
+            self._order[(scope, normalized)] = None
+            self._order.move_to_end((scope, normalized))
+            while len(self._order) > self.max_entries:
+                (old_scope, old_query), _ = self._order.popitem(last=False)
+                bucket = self._buckets.get(old_scope)
+                if bucket is not None:
+                    bucket.pop(old_query, None)
+                    if not bucket:
+                        del self._buckets[old_scope]
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
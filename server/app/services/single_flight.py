@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from .tracing import metrics
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one: the first caller for a key
+    runs the function, callers arriving while it is in flight wait for and
+    share its result (or exception). Nothing is kept once the call finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when another call produced it"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.record_coalesced(self.name)
+            return call.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on the event loop, so waiters hold no threads"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        call = self._calls.get(key)
+        if call is not None:
+            metrics.record_coalesced(self.name)
+            return await asyncio.shield(call), True
+
+        call = asyncio.ensure_future(factory())
+        self._calls[key] = call
+        call.add_done_callback(lambda _: self._forget(key, call))
+        # Shielded so one disconnecting client does not cancel the shared run
+        return await asyncio.shield(call), False
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+execution_flight = AsyncSingleFlight("execution")
+retrieval_flight = SingleFlight("retrieval")
+llm_flight = SingleFlight("llm")
@@ -0,0 +1,238 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; shared by every latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Span:
+    """Timed unit of work with named sub-phase timings and attributes"""
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes
+        self.phases: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def add_phase(self, name: str, seconds: float):
+        # Repeated phases (e.g. two searches in hybrid mode) accumulate
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "duration_ms": _ms(self.duration),
+            "phases_ms": {name: _ms(value) for name, value in self.phases.items()},
+            **self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Root span of a workflow run plus one span per executed node"""
+
+    def __init__(self, name: str, **attributes):
+        self.root = Span(name, **attributes)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.finish()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def finish(self):
+        self.root.finish()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {**self.root.to_dict(), "spans": spans}
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block into the current span, if any"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        span = _current_span.get()
+        if span is not None:
+            span.add_phase(name, time.perf_counter() - started)
+
+
+def record_phase(name: str, seconds: float):
+    span = _current_span.get()
+    if span is not None:
+        span.add_phase(name, seconds)
+
+
+def annotate(**attributes):
+    """Attach attributes (token counts, cache results) to the current span"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        # labels -> (bucket counts, sum, count)
+        self._series: Dict[LabelSet, list] = {}
+
+    def observe(self, labels: LabelSet, value: float):
+        series = self._series.setdefault(labels, [[0] * len(LATENCY_BUCKETS), 0.0, 0])
+        index = bisect_left(LATENCY_BUCKETS, value)
+        if index < len(LATENCY_BUCKETS):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (buckets, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(
+                    f"{self.name}_bucket{_labels(labels, le=str(bound))} {cumulative}"
+                )
+            lines.append(f"{self.name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelSet, float] = {}
+
+    def inc(self, labels: LabelSet, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(labels)} {value:g}")
+        return lines
+
+
+def _labels(labels: LabelSet, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    return "{" + rendered + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """In-process aggregation of workflow traces, rendered for Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.workflow_duration = Histogram(
+            "workflow_execution_duration_seconds", "Workflow run latency"
+        )
+        self.node_duration = Histogram(
+            "workflow_node_duration_seconds", "Node latency by node type and model"
+        )
+        self.phase_duration = Histogram(
+            "workflow_phase_duration_seconds",
+            "Sub-phase latency (embed_query, vector_search, llm_first_token, ...)",
+        )
+        self.tokens = Counter("llm_tokens_total", "LLM tokens by model and kind")
+        self.cache = Counter(
+            "response_cache_lookups_total", "LLM response cache lookups by result"
+        )
+        self.runs = Counter("workflow_executions_total", "Workflow runs by outcome")
+        self.coalesced = Counter(
+            "coalesced_requests_total",
+            "Calls that shared an identical in-flight computation, by level",
+        )
+
+    def observe_trace(self, trace: Trace, success: bool):
+        with self._lock:
+            self.runs.inc((("success", str(success).lower()),))
+            if trace.root.duration is not None:
+                self.workflow_duration.observe((), trace.root.duration)
+
+            for span in list(trace.spans):
+                model = str(span.attributes.get("model", ""))
+                node_labels = (
+                    ("model", model),
+                    ("node_type", str(span.attributes.get("type", span.name))),
+                )
+                if span.duration is not None:
+                    self.node_duration.observe(node_labels, span.duration)
+                for name, seconds in span.phases.items():
+                    self.phase_duration.observe(
+                        (("model", model), ("phase", name)), seconds
+                    )
+                for kind in ("prompt", "completion"):
+                    tokens = span.attributes.get(f"{kind}_tokens")
+                    if tokens:
+                        self.tokens.inc((("kind", kind), ("model", model)), tokens)
+                if span.attributes.get("response_cache"):
+                    self.cache.inc((("result", span.attributes["response_cache"]),))
+
+    def record_coalesced(self, level: str):
+        with self._lock:
+            self.coalesced.inc((("level", level),))
+
+    def render(self, extra_lines: Optional[List[str]] = None) -> str:
+        with self._lock:
+            lines = []
+            for metric in (
+                self.runs,
+                self.workflow_duration,
+                self.node_duration,
+                self.phase_duration,
+                self.tokens,
+                self.cache,
+                self.coalesced,
+            ):
+                lines.extend(metric.render())
+        lines.extend(extra_lines or [])
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -1,6 +1,14 @@
+import hashlib
+from typing import List, Optional, Tuple
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
-from app.config import CHROMA_PERSIST_DIR
+from .client_cache import (
+    client_cache,
+    fingerprint_api_key,
+    get_chroma_client,
+    get_http_client,
+)
+from .index_registry import forget_indexes, record_dimension, resolve_index
 
 
 def get_embeddings(
@@ -12,19 +20,96 @@ def get_embeddings(
             "OpenAI API key is required for embeddings. Please provide it in the component."
         )
 
-    return OpenAIEmbeddings(model=model, openai_api_key=api_key)
+    key = ("embeddings", "openai", model, fingerprint_api_key(api_key))
+    return client_cache.get_or_create(
+        key,
+        lambda: OpenAIEmbeddings(
+            model=model, openai_api_key=api_key, http_client=get_http_client()
+        ),
+    )
+
+
+DEFAULT_COLLECTION = "my_collection"
+
+
+def collection_name_for(
+    workflow_id: Optional[int] = None, node_id: Optional[str] = None
+) -> str:
+    """
+    Collection holding one Knowledge Base node's documents. Node ids are
+    hashed so the name always satisfies Chroma's naming rules.
+    """
+    if workflow_id is None or not node_id:
+        return DEFAULT_COLLECTION
+    node_hash = hashlib.sha256(node_id.encode("utf-8")).hexdigest()[:12]
+    return f"{workflow_collection_prefix(workflow_id)}kb_{node_hash}"
+
+
+def workflow_collection_prefix(workflow_id: int) -> str:
+    return f"wf{workflow_id}_"
+
+
+def drop_workflow_collections(workflow_id: int) -> List[str]:
+    """Delete every vector collection and index record of a workflow"""
+    prefix = workflow_collection_prefix(workflow_id)
+    client = get_chroma_client()
+    dropped = []
+    for collection in client.list_collections():
+        # Newer chromadb returns names, older returns Collection objects
+        name = getattr(collection, "name", collection)
+        if name.startswith(prefix):
+            client.delete_collection(name)
+            dropped.append(name)
+
+    client_cache.invalidate(lambda key: key[0] == "chroma" and key[-1] in dropped)
+    forget_indexes(prefix)
+    return dropped
 
 
 def get_vector_store(
     api_key: str = None,
     model: str = "text-embedding-3-small",
-    collection_name: str = "my_collection",
+    collection_name: str = DEFAULT_COLLECTION,
 ) -> Chroma:
-    """Get Chroma vector store with custom API key and model"""
+    """
+    Get Chroma vector store with custom API key and model. The collection name
+    is logical: each embedding model gets its own physical index, so switching
+    models never mixes vector spaces.
+    """
+    physical_name, _ = resolve_index(collection_name, model)
+    return get_index_store(api_key, model, physical_name)
+
+
+def get_index_store(api_key: str, model: str, physical_name: str) -> Chroma:
+    """Vector store over one physical collection, bypassing index resolution"""
     embeddings = get_embeddings(api_key, model)
 
-    return Chroma(
-        collection_name=collection_name,
-        embedding_function=embeddings,
-        persist_directory=CHROMA_PERSIST_DIR,
+    key = ("chroma", "openai", model, fingerprint_api_key(api_key), physical_name)
+    return client_cache.get_or_create(
+        key,
+        lambda: Chroma(
+            client=get_chroma_client(),
+            collection_name=physical_name,
+            embedding_function=embeddings,
+            collection_metadata={"embedding_model": model},
+        ),
     )
+
+
+def index_dimension(
+    collection_name: str, model: str
+) -> Tuple[Optional[str], Optional[int]]:
+    """Physical collection and vector dimension for a model, if indexed yet"""
+    resolved = resolve_index(collection_name, model, create=False)
+    return resolved if resolved else (None, None)
+
+
+def record_store_dimension(vector_store: Chroma) -> Optional[int]:
+    """Read one stored vector and remember its dimension on the index"""
+    stored = vector_store.get(limit=1, include=["embeddings"])
+    embeddings = stored.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    dimension = len(embeddings[0])
+    record_dimension(vector_store._collection.name, dimension)
+    return dimension
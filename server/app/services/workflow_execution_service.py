@@ -1,34 +1,65 @@
 # app/services/workflow_execution_service.py
-from typing import Dict, List, Any, Optional
-from sqlmodel import Session
-from datetime import datetime, timezone
+import asyncio
+import hashlib
 import json
+import logging
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import datetime, timezone
 
-from app.database import get_session
-from app.models.workflow import Workflow
-from .knowledge_service import retrieve_context
-from .llm_service import generate_response
-from .document_service import process_docs
+from app.config import (
+    HISTORY_TOKEN_BUDGET,
+    SINGLE_FLIGHT_ENABLED,
+    WORKFLOW_MAX_PARALLEL_NODES,
+)
+
+from .knowledge_service import retrieve_chunks
+from .context_assembly import context_token_budget, pack_context
+from .llm_service import generate_response, stream_response, summarize_conversation
+from .conversation_memory import conversation_memory, retrieval_memory
+from .ingestion_jobs import ensure_files_queued
+from .execution_pool import node_executor, run_blocking
+from .workflow_plan import WorkflowPlan, get_workflow_plan
+from .response_cache import normalize_query, response_cache
+from .client_cache import fingerprint_api_key
+from .single_flight import execution_flight, llm_flight, retrieval_flight
+from .embedding_cache import embed_query_cached
+from .vector_store import collection_name_for
+from .tracing import Trace, annotate, metrics
+from .execution_logger import LOG_LEVELS, ExecutionLogger
+from .node_registry import NodeHandler, register_node_type
 
 
 class WorkflowExecutor:
     """Flexible ReactFlow workflow execution engine"""
 
-    def __init__(self, workflow: Workflow):
-        self.workflow = workflow
-        self.nodes = {node["id"]: node for node in (workflow.nodes or [])}
-        self.edges = workflow.edges or []
+    def __init__(
+        self,
+        plan: WorkflowPlan,
+        event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        conversation_id: Optional[str] = None,
+        log_level: str = "none",
+    ):
+        self.plan = plan
+        self.event_callback = event_callback
+        # Chat turns are remembered per conversation; None runs single-turn
+        self.conversation_id = conversation_id
+        self._summary_llm: Optional[Tuple[str, str]] = None
+        self.nodes = plan.nodes
         self.execution_state = {}
-        self.execution_log = []
-
-        # Build execution graph
-        self.graph = self._build_execution_graph()
+        # Only what this request asked for is kept; "none" keeps nothing
+        self.log = ExecutionLogger(log_level)
+        self.cache_stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+        self.trace: Optional[Trace] = None
 
     def execute(self, user_input: str) -> Dict[str, Any]:
         """Execute the complete ReactFlow workflow with flexible routing"""
+        self.trace = Trace("workflow", workflow_id=self.plan.workflow_id)
         try:
-            self.log(f"🚀 Starting workflow: {self.workflow.name}")
-            self.log(f"📝 User input: {user_input}")
+            self.log.summary("🚀 Starting workflow: %s", self.plan.name)
+            self.log.debug("📝 User input: %s", user_input)
 
             # Initialize execution state
             self.execution_state = {
@@ -39,43 +70,29 @@ class WorkflowExecutor:
                 "knowledge_processed": False,
                 "documents_uploaded": False,
                 "nodes_executed": [],
+                "nodes_skipped": [],
             }
 
-            # Analyze workflow pattern
-            workflow_pattern = self._analyze_workflow_pattern()
-            self.log(f"🔄 Detected pattern: {workflow_pattern}")
-
-            # Get execution order based on ReactFlow connections
-            execution_order = self._get_execution_order()
-            self.log(
-                f"📋 Execution order: {[self._get_node_label(nid) for nid in execution_order]}"
-            )
-
-            # Execute nodes in correct order
-            for node_id in execution_order:
-                if node_id not in self.nodes:
-                    continue
-
-                node = self.nodes[node_id]
-                node_type = node.get("type")
-                node_label = self._get_node_label(node_id)
+            # Pattern and execution order are precompiled in the plan
+            workflow_pattern = self.plan.pattern
+            self.log.summary("🔄 Detected pattern: %s", workflow_pattern)
 
-                self.log(f"⚡ Executing: {node_label} ({node_type})")
+            execution_order = self.plan.execution_order
+            if self.log.enabled_for(logging.DEBUG):
+                self.log.debug(
+                    "📋 Execution order: %s",
+                    [self._get_node_label(nid) for nid in execution_order],
+                )
 
-                # Execute based on node type
-                success = self._execute_node(node_id, node)
-
-                if success:
-                    self.execution_state["nodes_executed"].append(node_id)
-                    self.log(f"✅ {node_label} completed successfully")
-                else:
-                    self.log(f"⚠️ {node_label} failed, continuing with workflow...")
+            self._run_schedule(user_input)
+            self._remember_turn(user_input)
+            trace = self._finish_trace(True)
 
             # Format final result
             return {
                 "success": True,
-                "workflow_id": self.workflow.id,
-                "workflow_name": self.workflow.name,
+                "workflow_id": self.plan.workflow_id,
+                "workflow_name": self.plan.name,
                 "user_query": user_input,
                 "final_response": self.execution_state.get(
                     "final_output", "No response generated"
@@ -86,358 +103,557 @@ class WorkflowExecutor:
                 ),
                 "workflow_pattern": workflow_pattern,
                 "nodes_executed": len(self.execution_state["nodes_executed"]),
-                "execution_log": self.execution_log,
+                "nodes_skipped": len(self.execution_state["nodes_skipped"]),
+                "response_cache": dict(self.cache_stats),
+                "conversation_id": self.conversation_id,
+                "trace": trace,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
+                **self._log_payload(),
             }
 
         except Exception as e:
-            self.log(f"💥 Execution failed: {str(e)}")
+            self.log.error("💥 Execution failed: %s", e)
             return {
                 "success": False,
-                "workflow_id": self.workflow.id,
+                "workflow_id": self.plan.workflow_id,
                 "error": str(e),
-                "execution_log": self.execution_log,
+                "trace": self._finish_trace(False),
                 "timestamp": datetime.now(timezone.utc).isoformat(),
+                **self._log_payload(),
             }
 
-    def _analyze_workflow_pattern(self) -> str:
-        """Analyze the workflow pattern to understand the flow"""
-        node_types = [node.get("type") for node in self.nodes.values()]
-
-        has_user_query = "userQuery" in node_types
-        has_knowledge = "knowledgeBase" in node_types
-        has_llm = "llmEngine" in node_types
-        has_output = "output" in node_types
-
-        # Check if UserQuery connects directly to LLM (skipping KnowledgeBase)
-        user_query_node = None
-        llm_node = None
-        knowledge_node = None
-
-        for node_id, node in self.nodes.items():
-            if node.get("type") == "userQuery":
-                user_query_node = node_id
-            elif node.get("type") == "llmEngine":
-                llm_node = node_id
-            elif node.get("type") == "knowledgeBase":
-                knowledge_node = node_id
-
-        # Check connections
-        direct_to_llm = False
-        through_knowledge = False
-
-        if user_query_node and llm_node:
-            # Check if UserQuery connects directly to LLM
-            for edge in self.edges:
-                if (
-                    edge.get("source") == user_query_node
-                    and edge.get("target") == llm_node
-                ):
-                    direct_to_llm = True
-                elif (
-                    edge.get("source") == user_query_node
-                    and edge.get("target") == knowledge_node
-                ):
-                    through_knowledge = True
-
-        if has_user_query and has_knowledge and has_llm and has_output:
-            if through_knowledge and not direct_to_llm:
-                return "Full RAG Pipeline (UserQuery → KnowledgeBase → LLM → Output)"
-            elif direct_to_llm and through_knowledge:
-                return "Hybrid Pipeline (UserQuery → KnowledgeBase + LLM → Output)"
-            elif direct_to_llm and not through_knowledge:
-                return "Direct LLM Pipeline (UserQuery → LLM → Output)"
-        elif has_user_query and has_llm and has_output and not has_knowledge:
-            return "Simple LLM Pipeline (UserQuery → LLM → Output)"
-        else:
-            return "Custom Pipeline"
-
-    def _build_execution_graph(self) -> Dict[str, List[str]]:
-        """Build adjacency list from ReactFlow edges"""
-        graph = {}
-
-        # Initialize all nodes
-        for node_id in self.nodes:
-            graph[node_id] = []
-
-        # Add edges
-        for edge in self.edges:
-            source = edge.get("source")
-            target = edge.get("target")
-            if source and target and source in graph:
-                graph[source].append(target)
-
-        return graph
-
-    def _get_execution_order(self) -> List[str]:
-        """Get nodes in execution order using topological sort"""
-        # Find UserQuery node as starting point
-        start_node = None
-        for node_id, node in self.nodes.items():
-            if node.get("type") == "userQuery":
-                start_node = node_id
-                break
-
-        if not start_node:
-            # Fallback: execute by type order
-            type_order = ["userQuery", "knowledgeBase", "llmEngine", "output"]
-            order = []
-            for node_type in type_order:
-                for node_id, node in self.nodes.items():
-                    if node.get("type") == node_type:
-                        order.append(node_id)
-            return order
-
-        # DFS traversal from UserQuery
-        visited = set()
-        order = []
-
-        def dfs(node_id):
-            if node_id in visited or node_id not in self.nodes:
-                return
-            visited.add(node_id)
-            order.append(node_id)
-
-            # Visit connected nodes
-            for neighbor in self.graph.get(node_id, []):
-                dfs(neighbor)
-
-        dfs(start_node)
-
-        # Add any unvisited nodes
-        for node_id in self.nodes:
-            if node_id not in visited:
-                order.append(node_id)
-
-        return order
+    def _log_payload(self) -> Dict[str, Any]:
+        """Responses carry the execution log only when the request asked for it"""
+        if self.log.level >= LOG_LEVELS["none"]:
+            return {}
+        return {"execution_log": self.log.entries()}
+
+    def _finish_trace(self, success: bool) -> Dict[str, Any]:
+        """Close the run's root span, feed /metrics and return the span tree"""
+        self.trace.finish()
+        self.trace.root.attributes["success"] = success
+        metrics.observe_trace(self.trace, success)
+        return self.trace.to_dict()
+
+    def _remember_turn(self, user_input: str):
+        """Store this exchange and fold old turns into a summary off the hot path"""
+        response = self.execution_state.get("llm_response")
+        if not self.conversation_id or not response:
+            return
+        try:
+            window = conversation_memory.append(
+                self.plan.workflow_id,
+                self.conversation_id,
+                [("user", user_input), ("assistant", response)],
+            )
+            if self._summary_llm and conversation_memory.needs_compaction(window):
+                api_key, model = self._summary_llm
+                node_executor.submit(
+                    conversation_memory.compact,
+                    self.plan.workflow_id,
+                    self.conversation_id,
+                    lambda text: summarize_conversation(text, api_key, model),
+                )
+        except Exception as e:
+            self.log.warning("⚠️ Could not store conversation turn: %s", e)
+
+    def _run_schedule(self, user_input: str):
+        """
+        Dispatch nodes as soon as all their upstream nodes have finished.
+        Independent branches run concurrently, up to WORKFLOW_MAX_PARALLEL_NODES,
+        and each node receives the merged outputs of its predecessors.
+
+        A node that fails but hands on fallback outputs (no context, an apology
+        from the LLM) keeps the flow going. A node that errors out produces
+        nothing, so nodes fed only by errored or skipped nodes are skipped.
+        """
+        order_index = {
+            node_id: i for i, node_id in enumerate(self.plan.execution_order)
+        }
+        remaining = {
+            node_id: len(self.plan.predecessors.get(node_id, ()))
+            for node_id in self.plan.execution_order
+        }
+        ready = [node_id for node_id, count in remaining.items() if count == 0]
+        outputs: Dict[str, Dict[str, Any]] = {}
+        running: Dict[Future, str] = {}
+
+        def release_children(node_id: str):
+            for child in set(self.plan.graph.get(node_id, ())):
+                if child not in remaining:
+                    continue
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+
+        while ready or running:
+            ready.sort(key=order_index.get)
+            while ready and len(running) < WORKFLOW_MAX_PARALLEL_NODES:
+                node_id = ready.pop(0)
+                node = self.nodes[node_id]
+                node_type = node.get("type")
+                node_label = self._get_node_label(node_id)
+                predecessors = self.plan.predecessors.get(node_id, ())
+                if predecessors and not any(p in outputs for p in predecessors):
+                    self.log.warning(
+                        "⏭️ Skipping %s: no upstream node produced outputs", node_label
+                    )
+                    self.execution_state["nodes_skipped"].append(node_id)
+                    self._emit(
+                        "node_completed",
+                        {
+                            "node_id": node_id,
+                            "label": node_label,
+                            "success": False,
+                            "skipped": True,
+                        },
+                    )
+                    release_children(node_id)
+                    continue
+
+                inputs = self._gather_inputs(node_id, outputs, user_input)
+
+                self.log.debug("⚡ Executing: %s (%s)", node_label, node_type)
+                self._emit(
+                    "node_started",
+                    {"node_id": node_id, "label": node_label, "type": node_type},
+                )
+                future = node_executor.submit(self._execute_node, node_id, node, inputs)
+                running[future] = node_id
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node_id = running.pop(future)
+                node_label = self._get_node_label(node_id)
+                success, node_outputs = future.result()
+                if node_outputs is not None:
+                    outputs[node_id] = node_outputs
+                    self._record_outputs(node_outputs)
+
+                self._emit(
+                    "node_completed",
+                    {"node_id": node_id, "label": node_label, "success": success},
+                )
+                if success:
+                    self.execution_state["nodes_executed"].append(node_id)
+                    self.log.summary("✅ %s completed successfully", node_label)
+                elif node_outputs is None:
+                    self.log.warning(
+                        "⚠️ %s errored; skipping nodes that depend only on it",
+                        node_label,
+                    )
+                else:
+                    self.log.warning(
+                        "⚠️ %s failed, continuing with workflow...", node_label
+                    )
+                release_children(node_id)
+
+    def _gather_inputs(
+        self, node_id: str, outputs: Dict[str, Dict[str, Any]], user_input: str
+    ) -> Dict[str, Any]:
+        """Merge upstream outputs along incoming edges; roots get the user query"""
+        inputs: Dict[str, Any] = {"user_query": user_input}
+        for predecessor in self.plan.predecessors.get(node_id, ()):
+            for key, value in outputs.get(predecessor, {}).items():
+                # A pass-through None from one branch must not hide another's value
+                if value is not None or key not in inputs:
+                    inputs[key] = value
+        return inputs
+
+    def _record_outputs(self, node_outputs: Dict[str, Any]):
+        """Fold node outputs into the run summary used for the final result"""
+        for key in ("user_query", "context", "llm_response", "final_output"):
+            if node_outputs.get(key) is not None:
+                self.execution_state[key] = node_outputs[key]
+        for key in ("knowledge_processed", "documents_uploaded"):
+            if node_outputs.get(key):
+                self.execution_state[key] = True
 
     def _get_node_label(self, node_id: str) -> str:
         """Get a readable label for a node"""
-        if node_id not in self.nodes:
-            return node_id
-
-        node = self.nodes[node_id]
-        label = node.get("data", {}).get("label")
-        if label:
-            return label
-
-        node_type = node.get("type", "unknown")
-        type_labels = {
-            "userQuery": "User Query",
-            "knowledgeBase": "Knowledge Base",
-            "llmEngine": "LLM Engine",
-            "output": "Output",
-        }
-        return type_labels.get(node_type, node_type)
-
-    def _execute_node(self, node_id: str, node: Dict) -> bool:
-        """Execute a single node based on its type"""
+        return self.plan.labels.get(node_id, node_id)
+
+    def _execute_node(
+        self, node_id: str, node: Dict, inputs: Dict[str, Any]
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Execute a single node based on its type, returning (success, outputs);
+        outputs is None when the node raised
+        """
         node_type = node.get("type")
+        # Each node runs in its own span; services annotate it via contextvars
+        with self.trace.span(
+            self._get_node_label(node_id), node_id=node_id, type=node_type
+        ) as span:
+            success, outputs = self._dispatch_node(node_id, node, inputs)
+            span.attributes["success"] = success
+        return success, outputs
+
+    def _dispatch_node(
+        self, node_id: str, node: Dict, inputs: Dict[str, Any]
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        # Handlers were resolved from the node registry when the plan compiled
+        handler = self.plan.handlers.get(node_id)
+        if handler is None:
+            self.log.warning("⚠️ Unknown node type: %s", node.get("type"))
+            return False, dict(inputs)
 
         try:
-            if node_type == "userQuery":
-                return self._execute_user_query_node(node)
-            elif node_type == "knowledgeBase":
-                return self._execute_knowledge_base_node(node)
-            elif node_type == "llmEngine":
-                return self._execute_llm_engine_node(node)
-            elif node_type == "output":
-                return self._execute_output_node(node)
-            else:
-                self.log(f"⚠️ Unknown node type: {node_type}")
-                return False
+            success, outputs = handler.run(self, node, inputs)
+            return success, self._declared_outputs(handler, inputs, outputs)
 
         except Exception as e:
-            self.log(f"❌ Node {node_id} error: {str(e)}")
-            return False
-
-    def _execute_user_query_node(self, node: Dict) -> bool:
+            # No outputs: the scheduler skips nodes that depend only on this one
+            self.log.error("❌ Node %s error: %s", node_id, e)
+            return False, None
+
+    def _declared_outputs(
+        self, handler: NodeHandler, inputs: Dict[str, Any], outputs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Pass on upstream keys and the handler's declared outputs, nothing else"""
+        undeclared = sorted(
+            key for key in outputs if key not in inputs and key not in handler.outputs
+        )
+        if not undeclared:
+            return outputs
+        self.log.warning(
+            "⚠️ %s node returned undeclared outputs %s; dropping them",
+            handler.node_type,
+            ", ".join(undeclared),
+        )
+        return {key: value for key, value in outputs.items() if key not in undeclared}
+
+    def _execute_user_query_node(
+        self, node: Dict, inputs: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
         """Execute User Query component"""
-        self.log("📝 Processing user query...")
+        self.log.debug("📝 Processing user query...")
 
         # Get any additional configuration from the node
-        config = node.get("data", {}).get("config", {})
+        config = self.plan.configs.get(node.get("id"), {})
 
-        # User query is already stored in execution_state
-        user_query = self.execution_state["user_query"]
+        user_query = inputs["user_query"]
 
         # Apply any query transformations from node config
         if config.get("preprocess", False):
             user_query = user_query.strip().lower()
-            self.execution_state["user_query"] = user_query
-            self.log(f"📝 Query preprocessed: {user_query}")
+            self.log.debug("📝 Query preprocessed: %s", user_query)
 
-        self.log("✅ User query processed successfully")
-        return True
+        self.log.debug("✅ User query processed successfully")
+        return True, {**inputs, "user_query": user_query}
 
-    def _execute_knowledge_base_node(self, node: Dict) -> bool:
+    def _execute_knowledge_base_node(
+        self, node: Dict, inputs: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
         """Execute Knowledge Base component - handle PDF uploads and context retrieval"""
-        self.log("📚 Processing knowledge base...")
+        self.log.debug("📚 Processing knowledge base...")
+        outputs = dict(inputs)
 
         try:
-            config = node.get("data", {}).get("config", {})
+            config = self.plan.configs.get(node.get("id"), {})
 
             # Get API key and embedding model from user input
             api_key = config.get("api-key", "").strip()
             embedding_model = config.get("embedding-model", "text-embedding-3-small")
-
-            self.log(f"🔍 Debug KB - Config keys: {list(config.keys())}")
-            self.log(
-                f"🔍 Debug KB - Raw API key from config: '{config.get('api-key')}'"
-            )
-            self.log(f"🔍 Debug KB - Stripped API key: '{api_key}'")
+            retrieval_mode = config.get("retrieval-mode", "dense")
+            top_k = int(config.get("top-k", 3))
+            annotate(model=embedding_model, retrieval_mode=retrieval_mode)
 
             if not api_key:
-                self.log(
+                self.log.error(
                     "❌ No API key provided for knowledge base. This is required for user-driven API key approach."
                 )
                 api_key = None
             else:
-                self.log(
-                    f"🔑 Using provided API key for embeddings with model: {embedding_model}"
+                self.log.debug(
+                    "🔑 Using provided API key for embeddings with model: %s",
+                    embedding_model,
                 )
 
             # Check if documents are uploaded for this node
             has_files = config.get("hasFiles", False)
             uploaded_files = config.get("uploadedFiles", [])
 
-            if has_files and uploaded_files:
-                self.log(f"📄 Processing {len(uploaded_files)} uploaded documents...")
-
-                # Process each uploaded file using document_service
-                for file_info in uploaded_files:
-                    file_path = file_info.get("path")
-                    file_name = file_info.get("name", "unknown")
-
-                    if file_path:
-                        try:
-                            # Process PDF and add to vector store with API key
-                            success = process_docs(file_path, api_key, embedding_model)
-                            if success:
-                                self.log(f"📄 Successfully processed {file_name}")
-                            else:
-                                self.log(f"⚠️ Failed to process {file_name}")
-                        except Exception as e:
-                            self.log(f"❌ Failed to process {file_name}: {str(e)}")
-
-                self.execution_state["documents_uploaded"] = True
-                self.log(f"💾 Documents processed and stored in vector database")
+            if has_files and uploaded_files and api_key:
+                # Ingestion runs on background workers; only indexed chunks are searched
+                counts = ensure_files_queued(
+                    uploaded_files,
+                    api_key,
+                    embedding_model,
+                    workflow_id=self.plan.workflow_id,
+                    node_id=node.get("id"),
+                )
+                self.log.summary(
+                    "📄 Documents: %d indexed, %d still indexing, %d missing, %d failed",
+                    counts["indexed"],
+                    counts["pending"],
+                    counts["missing"],
+                    counts["failed"],
+                )
+                outputs["documents_uploaded"] = counts["indexed"] > 0
+                outputs["documents_pending"] = counts["pending"]
+                outputs["documents_failed"] = counts["failed"]
 
             # Retrieve relevant context based on user query
-            user_query = self.execution_state["user_query"]
-            self.log(f"🔍 Searching for relevant context for: {user_query}")
-
-            context = retrieve_context(
-                user_query, api_key=api_key, embedding_model=embedding_model
-            )
+            user_query = inputs["user_query"]
+            self.log.debug("🔍 Searching for relevant context for: %s", user_query)
+
+            # Each Knowledge Base node searches only its own collection
+            memory_key = (self.plan.workflow_id, self.conversation_id, node.get("id"))
+            chunks = None
+            if self.conversation_id:
+                chunks = retrieval_memory.get(memory_key, user_query)
+                if chunks is not None:
+                    annotate(retrieval_reused=True)
+                    self.log.debug(
+                        "♻️ Reusing context retrieved earlier in this conversation"
+                    )
 
-            if context and context != "No relevant context found.":
-                self.execution_state["context"] = context
-                self.execution_state["knowledge_processed"] = True
-                # Store API key for LLM to use if needed
-                self.execution_state["kb_api_key"] = api_key
-                self.execution_state["embedding_model"] = embedding_model
-                context_preview = (
-                    context[:200] + "..." if len(context) > 200 else context
-                )
-                self.log(f"✅ Context retrieved: {context_preview}")
+            if chunks is None:
+                try:
+                    retrieval_kwargs = dict(
+                        k=top_k,
+                        api_key=api_key,
+                        embedding_model=embedding_model,
+                        collection_name=collection_name_for(
+                            self.plan.workflow_id, node.get("id")
+                        ),
+                        mode=retrieval_mode,
+                        mmr=_as_bool(config.get("mmr", False)),
+                        lambda_mult=float(config.get("mmr-lambda", 0.5)),
+                        reranker=config.get("reranker", "none"),
+                    )
+                    documents = self._single_flight(
+                        retrieval_flight,
+                        (
+                            user_query,
+                            fingerprint_api_key(api_key) if api_key else None,
+                            *sorted(
+                                (k, v)
+                                for k, v in retrieval_kwargs.items()
+                                if k != "api_key"
+                            ),
+                        ),
+                        lambda: retrieve_chunks(user_query, **retrieval_kwargs),
+                    )
+                    chunks = [document.page_content for document in documents]
+                except Exception as e:
+                    self.log.warning("⚠️ Context retrieval failed: %s", e)
+                    chunks = []
+
+                if self.conversation_id:
+                    # Follow-ups often rely on what the previous answer used;
+                    # carried chunks rank last so the packer drops them first
+                    previous = retrieval_memory.previous(memory_key)
+                    if chunks and not outputs.get("documents_pending"):
+                        retrieval_memory.put(memory_key, user_query, chunks)
+                    chunks = chunks + [c for c in previous if c not in chunks][:top_k]
+
+            annotate(chunks=len(chunks))
+            if chunks:
+                context = "\n".join(chunks)
+                outputs["context"] = context
+                # Ranked chunks let the LLM node pack context to its own budget
+                outputs["context_chunks"] = chunks
+                outputs["knowledge_processed"] = True
+                # Pass API key downstream for the LLM to use if needed
+                outputs["kb_api_key"] = api_key
+                outputs["embedding_model"] = embedding_model
+                self.log.debug("✅ Context retrieved: %.200s", context)
             else:
-                self.log("⚠️ No relevant context found")
-                self.execution_state["context"] = None
+                self.log.summary("⚠️ No relevant context found")
+                outputs["context"] = None
 
-            return True
+            return True, outputs
 
         except Exception as e:
-            self.log(f"❌ Knowledge base error: {str(e)}")
-            return False
+            self.log.error("❌ Knowledge base error: %s", e)
+            return False, outputs
 
-    def _execute_llm_engine_node(self, node: Dict) -> bool:
+    def _execute_llm_engine_node(
+        self, node: Dict, inputs: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
         """Execute LLM Engine component - generate response using query + context (if available)"""
-        self.log("🤖 Generating LLM response...")
+        self.log.debug("🤖 Generating LLM response...")
+        outputs = dict(inputs)
 
         try:
-            config = node.get("data", {}).get("config", {})
+            config = self.plan.configs.get(node.get("id"), {})
 
             # Get inputs
-            user_query = self.execution_state["user_query"]
-            context = self.execution_state.get(
-                "context"
-            )  # May be None if no KnowledgeBase
+            user_query = inputs["user_query"]
+            context = inputs.get("context")  # May be None if no KnowledgeBase
 
             # Get LLM configuration from user input
             model = config.get("model", "gpt-4o-mini")
             temperature = float(config.get("temperature", 0.7))
             custom_prompt = config.get("prompt")
             api_key = config.get("api-key", "").strip()
-
-            self.log(f"🔍 Debug - Config keys: {list(config.keys())}")
-            self.log(f"🔍 Debug - Raw API key from config: '{config.get('api-key')}'")
-            self.log(f"🔍 Debug - Stripped API key: '{api_key}'")
+            annotate(model=model)
 
             # If no API key provided in LLM node, try to use from knowledge base
             if not api_key:
-                api_key = self.execution_state.get("kb_api_key")
+                api_key = inputs.get("kb_api_key")
                 if not api_key:
-                    self.log(
+                    self.log.error(
                         "❌ No API key provided for LLM. This is required for user-driven API key approach."
                     )
                     api_key = None
                 else:
-                    self.log("🔑 Using API key from Knowledge Base component")
+                    self.log.debug("🔑 Using API key from Knowledge Base component")
             else:
-                self.log("🔑 Using API key from LLM Engine component")
+                self.log.debug("🔑 Using API key from LLM Engine component")
+
+            self.log.debug("🤖 Using model: %s, temperature: %s", model, temperature)
+
+            if inputs.get("context_chunks"):
+                # Fill this model's context budget with the best-ranked chunks
+                budget = context_token_budget(
+                    model, int(config.get("context-token-budget") or 0)
+                )
+                context = pack_context(inputs["context_chunks"], budget)
 
-            self.log(f"🤖 Using model: {model}, temperature: {temperature}")
+            history = None
+            if self.conversation_id:
+                history = conversation_memory.history_text(
+                    self.plan.workflow_id, self.conversation_id, HISTORY_TOKEN_BUDGET
+                )
+                if api_key:
+                    self._summary_llm = (api_key, model)
 
             if context:
-                self.log(f"📚 Using context: {len(context)} characters")
+                self.log.debug("📚 Using context: %d characters", len(context))
             else:
-                self.log("📝 No context available - direct query to LLM")
-
-            # Generate response with API key
-            response = generate_response(
+                self.log.debug("📝 No context available - direct query to LLM")
+
+            cache_enabled = _as_bool(config.get("cache-responses", False))
+            cache_scope = None
+            cache_embedding = None
+            if cache_enabled:
+                # Earlier turns change the answer, so they are part of the scope
+                cache_scope = response_cache.scope_key(
+                    model,
+                    temperature,
+                    custom_prompt,
+                    f"{context or ''}\n{history}" if history else context,
+                )
+                cached, tier, cache_embedding = response_cache.lookup(
+                    cache_scope,
+                    user_query,
+                    embed=self._cache_embedder(config, model, api_key, inputs),
+                    threshold=float(config.get("cache-similarity-threshold", 0.95)),
+                )
+                self._count_cache(tier)
+                annotate(response_cache=tier or "miss")
+                if cached is not None:
+                    self.log.summary("♻️ Response served from cache (%s match)", tier)
+                    self._emit("token", {"node_id": node.get("id"), "token": cached})
+                    outputs["llm_response"] = cached
+                    return True, outputs
+
+            llm_kwargs = dict(
                 query=user_query,
                 context=context,  # Pass None if no context available
                 custom_prompt=custom_prompt,
                 api_key=api_key,
                 model=model,
                 temperature=temperature,
+                history=history,
             )
 
-            if response and not response.startswith("Error:"):
-                self.execution_state["llm_response"] = response
-                response_preview = (
-                    response[:200] + "..." if len(response) > 200 else response
+            # Generate response with API key, streaming tokens when a listener is attached
+            if self.event_callback:
+                chunks = []
+                for token in stream_response(**llm_kwargs):
+                    chunks.append(token)
+                    self._emit("token", {"node_id": node.get("id"), "token": token})
+                response = "".join(chunks)
+            elif SINGLE_FLIGHT_ENABLED and _as_bool(
+                config.get("coalesce-requests", True)
+            ):
+                # Identical concurrent prompts share one provider call
+                response = self._single_flight(
+                    llm_flight,
+                    (
+                        fingerprint_api_key(api_key) if api_key else None,
+                        response_cache.scope_key(
+                            model,
+                            temperature,
+                            custom_prompt,
+                            f"{context or ''}\n{history}" if history else context,
+                        ),
+                        normalize_query(user_query),
+                    ),
+                    lambda: generate_response(**llm_kwargs),
                 )
-                self.log(f"✅ LLM response: {response_preview}")
-                return True
             else:
-                self.log(f"❌ LLM error: {response}")
-                self.execution_state["llm_response"] = (
-                    response
-                    or "I'm sorry, I couldn't generate a response to your query."
+                response = generate_response(**llm_kwargs)
+
+            # Provider failures raise and are handled below, so any text
+            # here is a real answer that is safe to cache and share
+            if response:
+                if cache_enabled:
+                    response_cache.store(
+                        cache_scope, user_query, response, cache_embedding
+                    )
+                outputs["llm_response"] = response
+                self.log.debug("✅ LLM response: %.200s", response)
+                return True, outputs
+            else:
+                self.log.error("❌ LLM returned an empty response")
+                outputs["llm_response"] = (
+                    "I'm sorry, I couldn't generate a response to your query."
                 )
-                return False
+                return False, outputs
 
         except Exception as e:
-            self.log(f"❌ LLM engine error: {str(e)}")
+            self.log.error("❌ LLM engine error: %s", e)
             # Set fallback response
-            self.execution_state["llm_response"] = (
-                f"Sorry, I encountered an error: {str(e)}"
-            )
-            return False
+            outputs["llm_response"] = f"Sorry, I encountered an error: {str(e)}"
+            return False, outputs
+
+    def _cache_embedder(
+        self, config: Dict, model: str, api_key: Optional[str], inputs: Dict[str, Any]
+    ) -> Optional[Callable[[str], List[float]]]:
+        """Embedding function for the semantic cache tier, if an OpenAI key is available"""
+        embedding_key = (
+            api_key if model.startswith("gpt-") else inputs.get("kb_api_key")
+        )
+        if not embedding_key:
+            return None
+        embedding_model = config.get("cache-embedding-model", "text-embedding-3-small")
+        return lambda text: embed_query_cached(text, embedding_key, embedding_model)
+
+    def _single_flight(self, flight, key, fn: Callable[[], Any]) -> Any:
+        if not SINGLE_FLIGHT_ENABLED:
+            return fn()
+        result, shared = flight.do(key, fn)
+        if shared:
+            annotate(coalesced=True)
+            self.log.debug("🔗 Shared an identical in-flight %s call", flight.name)
+        return result
 
-    def _execute_output_node(self, node: Dict) -> bool:
+    def _count_cache(self, tier: Optional[str]):
+        key = {"exact": "exact_hits", "semantic": "semantic_hits"}.get(tier, "misses")
+        with self._stats_lock:
+            self.cache_stats[key] += 1
+
+    def _execute_output_node(
+        self, node: Dict, inputs: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
         """Execute Output component - format and display final response"""
-        self.log("📤 Formatting output...")
+        self.log.debug("📤 Formatting output...")
+        outputs = dict(inputs)
 
         try:
-            config = node.get("data", {}).get("config", {})
+            config = self.plan.configs.get(node.get("id"), {})
 
             # Get the LLM response
-            llm_response = self.execution_state.get("llm_response")
-            user_query = self.execution_state.get("user_query")
-            context_used = self.execution_state.get("context") is not None
+            llm_response = inputs.get("llm_response")
+            user_query = inputs.get("user_query")
+            context_used = inputs.get("context") is not None
 
             # Format final output
             if llm_response:
@@ -450,62 +666,98 @@ class WorkflowExecutor:
             if config.get("includeMetadata", False):
                 metadata = {
                     "context_used": context_used,
-                    "knowledge_processed": self.execution_state.get(
-                        "knowledge_processed", False
-                    ),
-                    "documents_uploaded": self.execution_state.get(
-                        "documents_uploaded", False
-                    ),
+                    "knowledge_processed": inputs.get("knowledge_processed", False),
+                    "documents_uploaded": inputs.get("documents_uploaded", False),
                 }
                 final_output = {"response": final_output, "metadata": metadata}
 
-            self.execution_state["final_output"] = final_output
-            self.log("✅ Output formatted successfully")
-            return True
+            outputs["final_output"] = final_output
+            self.log.debug("✅ Output formatted successfully")
+            return True, outputs
 
         except Exception as e:
-            self.log(f"❌ Output formatting error: {str(e)}")
-            self.execution_state["final_output"] = f"Output error: {str(e)}"
-            return False
+            self.log.error("❌ Output formatting error: %s", e)
+            outputs["final_output"] = f"Output error: {str(e)}"
+            return False, outputs
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        """Forward a progress event to the streaming listener, if any"""
+        if self.event_callback:
+            self.event_callback(event, data)
+
 
-    def log(self, message: str):
-        """Add message to execution log with timestamp"""
-        timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}"
-        self.execution_log.append(log_entry)
-        print(log_entry)  # Also print to console for debugging
+def _as_bool(value: Any) -> bool:
+    """Node config values arrive from the UI as bools or strings"""
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "on")
+    return bool(value)
 
 
 # Public API functions
-def execute_workflow(workflow_id: int, user_input: str) -> Dict[str, Any]:
+def execute_workflow(
+    workflow_id: int,
+    user_input: str,
+    event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    conversation_id: Optional[str] = None,
+    log_level: str = "none",
+) -> Dict[str, Any]:
     """
     Execute a ReactFlow workflow with user input
     This is the main function called by the API
     """
-    session = None
+    # Hot workflows are served from the plan cache without touching the DB
     try:
-        session = get_session()
-        workflow = session.get(Workflow, workflow_id)
+        plan = get_workflow_plan(workflow_id)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Execution failed: {str(e)}",
+            "workflow_id": workflow_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
 
-        if not workflow:
-            return {
-                "success": False,
-                "error": f"Workflow {workflow_id} not found",
-                "workflow_id": workflow_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
+    if not plan:
+        return {
+            "success": False,
+            "error": f"Workflow {workflow_id} not found",
+            "workflow_id": workflow_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
 
+    return execute_plan(
+        plan,
+        user_input,
+        event_callback=event_callback,
+        conversation_id=conversation_id,
+        log_level=log_level,
+    )
+
+
+def execute_plan(
+    plan: WorkflowPlan,
+    user_input: str,
+    event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    conversation_id: Optional[str] = None,
+    log_level: str = "none",
+) -> Dict[str, Any]:
+    """Execute an already compiled plan, e.g. once per item of a batch"""
+    try:
         # Check if workflow has nodes
-        if not workflow.nodes:
+        if not plan.nodes:
             return {
                 "success": False,
                 "error": "Workflow has no nodes to execute",
-                "workflow_id": workflow_id,
+                "workflow_id": plan.workflow_id,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
 
         # Execute the workflow
-        executor = WorkflowExecutor(workflow)
+        executor = WorkflowExecutor(
+            plan,
+            event_callback=event_callback,
+            conversation_id=conversation_id,
+            log_level=log_level,
+        )
         result = executor.execute(user_input)
 
         return result
@@ -514,9 +766,147 @@ def execute_workflow(workflow_id: int, user_input: str) -> Dict[str, Any]:
         return {
             "success": False,
             "error": f"Execution failed: {str(e)}",
-            "workflow_id": workflow_id,
+            "workflow_id": plan.workflow_id,
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
-    finally:
-        if session:
-            session.close()
+
+
+async def execute_workflow_async(
+    workflow_id: int,
+    user_input: str,
+    event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    conversation_id: Optional[str] = None,
+    log_level: str = "none",
+) -> Dict[str, Any]:
+    """
+    Non-blocking variant of execute_workflow for the async API handlers.
+    Identical concurrent single-turn runs share one execution.
+    """
+    if SINGLE_FLIGHT_ENABLED and event_callback is None and conversation_id is None:
+        try:
+            plan = await run_blocking(get_workflow_plan, workflow_id)
+        except Exception:
+            # execute_workflow reports lookup failures in its usual shape
+            plan = None
+        key = _execution_flight_key(plan, user_input, log_level) if plan else None
+        if key is not None:
+            result, shared = await execution_flight.do(
+                key,
+                lambda: run_blocking(
+                    execute_plan, plan, user_input, log_level=log_level
+                ),
+            )
+            return {**result, "coalesced": True} if shared else result
+
+    return await run_blocking(
+        execute_workflow,
+        workflow_id,
+        user_input,
+        event_callback=event_callback,
+        conversation_id=conversation_id,
+        log_level=log_level,
+    )
+
+
+def _execution_flight_key(
+    plan: WorkflowPlan, user_input: str, log_level: str
+) -> Optional[Tuple]:
+    """
+    (workflow version, normalized input, node config hash), or None when an
+    LLM node has opted out of sharing its responses
+    """
+    if any(
+        not _as_bool(plan.configs.get(node_id, {}).get("coalesce-requests", True))
+        for node_id, node in plan.nodes.items()
+        if node.get("type") == "llmEngine"
+    ):
+        return None
+    config_hash = hashlib.sha256(
+        json.dumps(dict(plan.configs), sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return (
+        plan.workflow_id,
+        plan.updated_at,
+        normalize_query(user_input),
+        config_hash,
+        log_level,
+    )
+
+
+async def stream_workflow_events(
+    workflow_id: int,
+    user_input: str,
+    conversation_id: Optional[str] = None,
+    log_level: str = "none",
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Execute a workflow and yield (event, data) pairs as they happen:
+    node_started / node_completed / token, then a final result event
+    carrying the same payload execute_workflow returns
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_event(event: str, data: Dict[str, Any]):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    task = asyncio.ensure_future(
+        execute_workflow_async(
+            workflow_id,
+            user_input,
+            event_callback=on_event,
+            conversation_id=conversation_id,
+            log_level=log_level,
+        )
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(("result", None)))
+
+    while True:
+        event, data = await queue.get()
+        if event == "result":
+            break
+        yield event, data
+
+    yield "result", task.result()
+
+
+# Built-in node types; plugins register more through the node registry
+register_node_type(
+    "userQuery",
+    WorkflowExecutor._execute_user_query_node,
+    label="User Query",
+    outputs=("user_query",),
+    rank=0,
+)
+register_node_type(
+    "knowledgeBase",
+    WorkflowExecutor._execute_knowledge_base_node,
+    label="Knowledge Base",
+    inputs=("user_query",),
+    outputs=(
+        "context",
+        "context_chunks",
+        "knowledge_processed",
+        "documents_uploaded",
+        "documents_pending",
+        "documents_failed",
+        "kb_api_key",
+        "embedding_model",
+    ),
+    rank=1,
+)
+register_node_type(
+    "llmEngine",
+    WorkflowExecutor._execute_llm_engine_node,
+    label="LLM Engine",
+    inputs=("user_query",),
+    outputs=("llm_response",),
+    rank=2,
+)
+register_node_type(
+    "output",
+    WorkflowExecutor._execute_output_node,
+    label="Output",
+    outputs=("final_output",),
+    rank=3,
+)
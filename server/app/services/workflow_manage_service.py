@@ -1,9 +1,169 @@
+import base64
+import json
+from sqlalchemy import and_, func, or_, update
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, Tuple
 from datetime import datetime, timezone
 
-from app.models.workflow import Workflow
-from app.database import get_session
+from app.models.workflow import Workflow, WorkflowSummary, WorkflowSummaryPage
+from app.database import async_engine, get_async_db, get_db, get_session
+from app.services.execution_pool import run_blocking
+from app.services.workflow_plan import invalidate_workflow_plan
+from app.services.vector_store import (
+    drop_workflow_collections,
+    workflow_collection_prefix,
+)
+from app.services.ingestion_ledger import forget_collections
+from app.services.keyword_index import keyword_index
+from app.services.conversation_memory import retrieval_memory
+
+
+class WorkflowVersionConflict(Exception):
+    """The canvas changed since the version a patch was based on"""
+
+    def __init__(self, current_version: Optional[str]):
+        super().__init__("Workflow was modified by another save")
+        self.current_version = current_version
+
+
+def workflow_version(updated_at: datetime) -> str:
+    """Optimistic-concurrency token for a canvas; its last update time"""
+    return _as_utc(updated_at).isoformat()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps come back naive from the database but are stored as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def check_version(workflow: Workflow, base_version: str):
+    try:
+        base = datetime.fromisoformat(base_version.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise ValueError("base_version must be an ISO timestamp")
+    if _as_utc(base) != _as_utc(workflow.updated_at):
+        raise WorkflowVersionConflict(workflow_version(workflow.updated_at))
+
+
+def _patch_items(
+    items: List[Dict[str, Any]], changes: Optional[Dict[str, Any]], kind: str
+) -> List[Dict[str, Any]]:
+    if not changes:
+        return items
+    upserts = changes.get("upsert") or []
+    removals = set(changes.get("remove") or [])
+    for item in upserts:
+        if not isinstance(item, dict) or not item.get("id"):
+            raise ValueError(f"Every {kind} in upsert needs an id")
+
+    by_id = {item["id"]: item for item in upserts}
+    patched = []
+    for item in items:
+        item_id = item.get("id")
+        if item_id in removals:
+            continue
+        # Updated items keep their position in the list
+        patched.append(by_id.pop(item_id, item))
+    patched.extend(item for item in upserts if item["id"] in by_id)
+    return patched
+
+
+def apply_canvas_patch(
+    nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], patch: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Apply {"nodes": {"upsert": [...], "remove": [ids]}, "edges": {...}}.
+    Upserted items replace the item with the same id or are appended.
+    """
+    return (
+        _patch_items(list(nodes or []), patch.get("nodes"), "node"),
+        _patch_items(list(edges or []), patch.get("edges"), "edge"),
+    )
+
+
+def patch_statement(workflow: Workflow, nodes: list, edges: list, now: datetime):
+    # Compare-and-set on updated_at so concurrent patches cannot interleave
+    return (
+        update(Workflow)
+        .where(Workflow.id == workflow.id, Workflow.updated_at == workflow.updated_at)
+        .values(nodes=nodes, edges=edges, updated_at=now)
+    )
+
+
+def patch_result(workflow_id: int, nodes: list, edges: list, now: datetime) -> dict:
+    return {
+        "id": workflow_id,
+        "version": workflow_version(now),
+        "node_count": len(nodes),
+        "edge_count": len(edges),
+    }
+
+
+def encode_cursor(updated_at: datetime, workflow_id: int) -> str:
+    raw = json.dumps([updated_at.isoformat(), workflow_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        updated_at, workflow_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(updated_at), int(workflow_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def summary_statement(limit: int, cursor: Optional[str] = None):
+    """
+    Active workflows, newest first, selecting only listing columns. Keyset
+    pagination on (updated_at, id) keeps every page an index range scan.
+    """
+    statement = select(
+        Workflow.id,
+        Workflow.name,
+        Workflow.description,
+        Workflow.is_active,
+        Workflow.created_at,
+        Workflow.updated_at,
+        func.coalesce(func.json_array_length(Workflow.nodes), 0),
+        func.coalesce(func.json_array_length(Workflow.edges), 0),
+    ).where(Workflow.is_active == True)
+
+    if cursor:
+        updated_at, workflow_id = decode_cursor(cursor)
+        statement = statement.where(
+            or_(
+                Workflow.updated_at < updated_at,
+                and_(Workflow.updated_at == updated_at, Workflow.id < workflow_id),
+            )
+        )
+
+    # One extra row tells whether another page exists
+    return statement.order_by(Workflow.updated_at.desc(), Workflow.id.desc()).limit(
+        limit + 1
+    )
+
+
+def summary_page(rows: list, limit: int) -> WorkflowSummaryPage:
+    items = [
+        WorkflowSummary(
+            id=row[0],
+            name=row[1],
+            description=row[2],
+            is_active=row[3],
+            created_at=row[4],
+            updated_at=row[5],
+            node_count=row[6],
+            edge_count=row[7],
+        )
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+    return WorkflowSummaryPage(items=items, next_cursor=next_cursor)
 
 
 class WorkflowManageService:
@@ -36,6 +196,12 @@ class WorkflowManageService:
         )
         return self.session.exec(statement).all()
 
+    def get_workflow_summaries(
+        self, limit: int = 50, cursor: Optional[str] = None
+    ) -> WorkflowSummaryPage:
+        rows = self.session.exec(summary_statement(limit, cursor)).all()
+        return summary_page(rows, limit)
+
     def update_workflow(
         self,
         workflow_id: int,
@@ -62,6 +228,7 @@ class WorkflowManageService:
 
         self.session.add(workflow)
         self.session.commit()
+        invalidate_workflow_plan(workflow_id)
         self.session.refresh(workflow)
         return workflow
 
@@ -78,9 +245,246 @@ class WorkflowManageService:
 
         self.session.add(workflow)
         self.session.commit()
+        invalidate_workflow_plan(workflow_id)
         self.session.refresh(workflow)
         return workflow
 
+    def patch_canvas(
+        self, workflow_id: int, base_version: str, patch: Dict[str, Any]
+    ) -> Optional[dict]:
+        """Apply node and edge diffs if the canvas is still at base_version"""
+        workflow = self.get_workflow_by_id(workflow_id)
+        if not workflow or not workflow.is_active:
+            return None
+
+        check_version(workflow, base_version)
+        nodes, edges = apply_canvas_patch(workflow.nodes, workflow.edges, patch)
+        now = datetime.now(timezone.utc)
+
+        result = self.session.exec(patch_statement(workflow, nodes, edges, now))
+        if result.rowcount == 0:
+            self.session.rollback()
+            raise WorkflowVersionConflict(None)
+        self.session.commit()
+        invalidate_workflow_plan(workflow_id)
+        return patch_result(workflow_id, nodes, edges, now)
+
+    def delete_workflow(self, workflow_id: int) -> bool:
+        workflow = self.get_workflow_by_id(workflow_id)
+        if not workflow or not workflow.is_active:
+            return False
+
+        workflow.is_active = False
+        workflow.updated_at = datetime.now(timezone.utc)
+
+        self.session.add(workflow)
+        self.session.commit()
+        invalidate_workflow_plan(workflow_id)
+        release_workflow_resources(workflow_id)
+        return True
+
+
+def release_workflow_resources(workflow_id: int):
+    """Vector collections and indexes live only as long as their workflow"""
+    drop_workflow_collections(workflow_id)
+    forget_collections(workflow_collection_prefix(workflow_id))
+    keyword_index.forget(workflow_collection_prefix(workflow_id))
+    retrieval_memory.forget_workflow(workflow_id)
+
 
 def get_workflow_manage_service(session: Session) -> WorkflowManageService:
     return WorkflowManageService(session)
+
+
+class WorkflowService(Protocol):
+    """Awaitable workflow CRUD, served by either implementation below"""
+
+    async def create_workflow(
+        self, name: str, description: Optional[str] = None
+    ) -> Workflow: ...
+
+    async def get_workflow_by_id(self, workflow_id: int) -> Optional[Workflow]: ...
+
+    async def get_all_workflows(self) -> List[Workflow]: ...
+
+    async def get_workflow_summaries(
+        self, limit: int = 50, cursor: Optional[str] = None
+    ) -> WorkflowSummaryPage: ...
+
+    async def update_workflow(
+        self,
+        workflow_id: int,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        nodes: Optional[list] = None,
+        edges: Optional[list] = None,
+    ) -> Optional[Workflow]: ...
+
+    async def save_workflow_data(
+        self, workflow_id: int, nodes: list, edges: list
+    ) -> Optional[Workflow]: ...
+
+    async def patch_canvas(
+        self, workflow_id: int, base_version: str, patch: Dict[str, Any]
+    ) -> Optional[dict]: ...
+
+    async def delete_workflow(self, workflow_id: int) -> bool: ...
+
+
+class AsyncWorkflowManageService:
+    """WorkflowManageService on an AsyncSession, used when the asyncpg engine is on"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def create_workflow(
+        self, name: str, description: Optional[str] = None
+    ) -> Workflow:
+        workflow = Workflow(
+            name=name,
+            description=description,
+            nodes=[],
+            edges=[],
+            is_active=True,
+        )
+
+        self.session.add(workflow)
+        await self.session.commit()
+        await self.session.refresh(workflow)
+        return workflow
+
+    async def get_workflow_by_id(self, workflow_id: int) -> Optional[Workflow]:
+        statement = select(Workflow).where(Workflow.id == workflow_id)
+        return (await self.session.exec(statement)).first()
+
+    async def get_all_workflows(self) -> List[Workflow]:
+        statement = (
+            select(Workflow)
+            .where(Workflow.is_active == True)
+            .order_by(Workflow.updated_at.desc())
+        )
+        return (await self.session.exec(statement)).all()
+
+    async def get_workflow_summaries(
+        self, limit: int = 50, cursor: Optional[str] = None
+    ) -> WorkflowSummaryPage:
+        rows = (await self.session.exec(summary_statement(limit, cursor))).all()
+        return summary_page(rows, limit)
+
+    async def update_workflow(
+        self,
+        workflow_id: int,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        nodes: Optional[list] = None,
+        edges: Optional[list] = None,
+    ) -> Optional[Workflow]:
+        workflow = await self.get_workflow_by_id(workflow_id)
+        if not workflow:
+            return None
+
+        if name is not None:
+            workflow.name = name
+        if description is not None:
+            workflow.description = description
+        if nodes is not None:
+            workflow.nodes = nodes
+        if edges is not None:
+            workflow.edges = edges
+
+        workflow.updated_at = datetime.now(timezone.utc)
+
+        self.session.add(workflow)
+        await self.session.commit()
+        invalidate_workflow_plan(workflow_id)
+        await self.session.refresh(workflow)
+        return workflow
+
+    async def save_workflow_data(
+        self, workflow_id: int, nodes: list, edges: list
+    ) -> Optional[Workflow]:
+        return await self.update_workflow(workflow_id, nodes=nodes, edges=edges)
+
+    async def patch_canvas(
+        self, workflow_id: int, base_version: str, patch: Dict[str, Any]
+    ) -> Optional[dict]:
+        workflow = await self.get_workflow_by_id(workflow_id)
+        if not workflow or not workflow.is_active:
+            return None
+
+        check_version(workflow, base_version)
+        nodes, edges = apply_canvas_patch(workflow.nodes, workflow.edges, patch)
+        now = datetime.now(timezone.utc)
+
+        result = await self.session.exec(patch_statement(workflow, nodes, edges, now))
+        if result.rowcount == 0:
+            await self.session.rollback()
+            raise WorkflowVersionConflict(None)
+        await self.session.commit()
+        invalidate_workflow_plan(workflow_id)
+        return patch_result(workflow_id, nodes, edges, now)
+
+    async def delete_workflow(self, workflow_id: int) -> bool:
+        workflow = await self.get_workflow_by_id(workflow_id)
+        if not workflow or not workflow.is_active:
+            return False
+
+        workflow.is_active = False
+        workflow.updated_at = datetime.now(timezone.utc)
+
+        self.session.add(workflow)
+        await self.session.commit()
+        invalidate_workflow_plan(workflow_id)
+        # Chroma and SQLite cleanup is blocking
+        await run_blocking(release_workflow_resources, workflow_id)
+        return True
+
+
+class ThreadedWorkflowManageService:
+    """Awaitable facade over the sync service; queries run on the worker pool"""
+
+    def __init__(self, service: WorkflowManageService):
+        self.service = service
+
+    async def create_workflow(self, *args, **kwargs) -> Workflow:
+        return await run_blocking(self.service.create_workflow, *args, **kwargs)
+
+    async def get_workflow_by_id(self, *args, **kwargs) -> Optional[Workflow]:
+        return await run_blocking(self.service.get_workflow_by_id, *args, **kwargs)
+
+    async def get_all_workflows(self, *args, **kwargs) -> List[Workflow]:
+        return await run_blocking(self.service.get_all_workflows, *args, **kwargs)
+
+    async def get_workflow_summaries(self, *args, **kwargs) -> WorkflowSummaryPage:
+        return await run_blocking(self.service.get_workflow_summaries, *args, **kwargs)
+
+    async def update_workflow(self, *args, **kwargs) -> Optional[Workflow]:
+        return await run_blocking(self.service.update_workflow, *args, **kwargs)
+
+    async def save_workflow_data(self, *args, **kwargs) -> Optional[Workflow]:
+        return await run_blocking(self.service.save_workflow_data, *args, **kwargs)
+
+    async def patch_canvas(self, *args, **kwargs) -> Optional[dict]:
+        return await run_blocking(self.service.patch_canvas, *args, **kwargs)
+
+    async def delete_workflow(self, *args, **kwargs) -> bool:
+        return await run_blocking(self.service.delete_workflow, *args, **kwargs)
+
+
+async def get_workflow_service() -> AsyncIterator[WorkflowService]:
+    """
+    Request-scoped workflow service dependency. Uses the asyncpg engine when
+    enabled; otherwise a pooled sync session driven from worker threads, so
+    the event loop never blocks on the database.
+    """
+    if async_engine is not None:
+        async for session in get_async_db():
+            yield AsyncWorkflowManageService(session)
+        return
+
+    sessions = get_db()
+    session = await run_blocking(next, sessions)
+    try:
+        yield ThreadedWorkflowManageService(WorkflowManageService(session))
+    finally:
+        await run_blocking(sessions.close)
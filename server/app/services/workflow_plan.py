@@ -0,0 +1,277 @@
+# app/services/workflow_plan.py
+import copy
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.config import PLAN_CACHE_TTL_SECONDS
+from app.database import get_session
+from app.models.workflow import Workflow
+from .node_registry import NodeHandler, get_node_handler
+
+
+@dataclass(frozen=True)
+class WorkflowPlan:
+    """Immutable, precompiled execution plan for one version of a workflow"""
+
+    workflow_id: int
+    name: str
+    updated_at: Optional[datetime]
+    nodes: Mapping[str, Dict[str, Any]]
+    edges: Tuple[Dict[str, Any], ...]
+    configs: Mapping[str, Dict[str, Any]]
+    labels: Mapping[str, str]
+    graph: Mapping[str, Tuple[str, ...]]
+    predecessors: Mapping[str, Tuple[str, ...]]
+    pattern: str
+    execution_order: Tuple[str, ...]
+    # node id -> handler, resolved once so dispatch is a table lookup;
+    # nodes of unregistered types are absent
+    handlers: Mapping[str, NodeHandler]
+
+
+def compile_plan(workflow: Workflow) -> WorkflowPlan:
+    """Parse a Workflow row once into everything the executor needs"""
+    # Deep copy so the plan does not alias mutable ORM state
+    nodes = {node["id"]: copy.deepcopy(node) for node in (workflow.nodes or [])}
+    edges = [copy.deepcopy(edge) for edge in (workflow.edges or [])]
+
+    configs = {
+        node_id: node.get("data", {}).get("config", {}) or {}
+        for node_id, node in nodes.items()
+    }
+    labels = {node_id: node_label(node) for node_id, node in nodes.items()}
+    graph = build_execution_graph(nodes, edges)
+    predecessors = build_predecessors(nodes, graph)
+    handlers = {}
+    for node_id, node in nodes.items():
+        handler = get_node_handler(node.get("type"))
+        if handler:
+            handlers[node_id] = handler
+
+    return WorkflowPlan(
+        workflow_id=workflow.id,
+        name=workflow.name,
+        updated_at=workflow.updated_at,
+        nodes=MappingProxyType(nodes),
+        edges=tuple(edges),
+        configs=MappingProxyType(configs),
+        labels=MappingProxyType(labels),
+        graph=MappingProxyType({k: tuple(v) for k, v in graph.items()}),
+        predecessors=MappingProxyType({k: tuple(v) for k, v in predecessors.items()}),
+        pattern=analyze_workflow_pattern(nodes, edges),
+        execution_order=tuple(get_execution_order(nodes, graph)),
+        handlers=MappingProxyType(handlers),
+    )
+
+
+def node_label(node: Dict[str, Any]) -> str:
+    """Get a readable label for a node"""
+    label = node.get("data", {}).get("label")
+    if label:
+        return label
+
+    node_type = node.get("type", "unknown")
+    handler = get_node_handler(node_type)
+    return handler.label if handler else node_type
+
+
+def analyze_workflow_pattern(
+    nodes: Dict[str, Dict[str, Any]], edges: List[Dict[str, Any]]
+) -> str:
+    """Analyze the workflow pattern to understand the flow"""
+    node_types = [node.get("type") for node in nodes.values()]
+
+    has_user_query = "userQuery" in node_types
+    has_knowledge = "knowledgeBase" in node_types
+    has_llm = "llmEngine" in node_types
+    has_output = "output" in node_types
+
+    # Check if UserQuery connects directly to LLM (skipping KnowledgeBase)
+    user_query_node = None
+    llm_node = None
+    knowledge_node = None
+
+    for node_id, node in nodes.items():
+        if node.get("type") == "userQuery":
+            user_query_node = node_id
+        elif node.get("type") == "llmEngine":
+            llm_node = node_id
+        elif node.get("type") == "knowledgeBase":
+            knowledge_node = node_id
+
+    # Check connections
+    direct_to_llm = False
+    through_knowledge = False
+
+    if user_query_node and llm_node:
+        # Check if UserQuery connects directly to LLM
+        for edge in edges:
+            if edge.get("source") == user_query_node and edge.get("target") == llm_node:
+                direct_to_llm = True
+            elif (
+                edge.get("source") == user_query_node
+                and edge.get("target") == knowledge_node
+            ):
+                through_knowledge = True
+
+    if has_user_query and has_knowledge and has_llm and has_output:
+        if through_knowledge and not direct_to_llm:
+            return "Full RAG Pipeline (UserQuery → KnowledgeBase → LLM → Output)"
+        elif direct_to_llm and through_knowledge:
+            return "Hybrid Pipeline (UserQuery → KnowledgeBase + LLM → Output)"
+        elif direct_to_llm and not through_knowledge:
+            return "Direct LLM Pipeline (UserQuery → LLM → Output)"
+    elif has_user_query and has_llm and has_output and not has_knowledge:
+        return "Simple LLM Pipeline (UserQuery → LLM → Output)"
+    else:
+        return "Custom Pipeline"
+
+
+def build_execution_graph(
+    nodes: Dict[str, Dict[str, Any]], edges: List[Dict[str, Any]]
+) -> Dict[str, List[str]]:
+    """Build adjacency list from ReactFlow edges"""
+    graph = {}
+
+    # Initialize all nodes
+    for node_id in nodes:
+        graph[node_id] = []
+
+    # Add edges
+    for edge in edges:
+        source = edge.get("source")
+        target = edge.get("target")
+        if source and target and source in graph:
+            graph[source].append(target)
+
+    return graph
+
+
+class WorkflowCycleError(ValueError):
+    """Raised when the workflow graph contains a cycle and cannot be scheduled"""
+
+
+def build_predecessors(
+    nodes: Dict[str, Dict[str, Any]], graph: Dict[str, List[str]]
+) -> Dict[str, List[str]]:
+    """Invert the adjacency list, ignoring edges to unknown nodes"""
+    predecessors = {node_id: [] for node_id in nodes}
+    for source, targets in graph.items():
+        for target in targets:
+            if target in predecessors and source not in predecessors[target]:
+                predecessors[target].append(source)
+    return predecessors
+
+
+def get_execution_order(
+    nodes: Dict[str, Dict[str, Any]], graph: Dict[str, List[str]]
+) -> List[str]:
+    """Get nodes in dependency order using Kahn's topological sort"""
+    predecessors = build_predecessors(nodes, graph)
+    indegree = {node_id: len(preds) for node_id, preds in predecessors.items()}
+
+    # Break ties by each node type's registered rank, then by canvas order
+    position = {node_id: index for index, node_id in enumerate(nodes)}
+    type_ranks = {}
+    for node in nodes.values():
+        node_type = node.get("type")
+        if node_type not in type_ranks:
+            handler = get_node_handler(node_type)
+            type_ranks[node_type] = handler.rank if handler else NodeHandler.rank
+
+    def rank(node_id: str) -> Tuple[int, int]:
+        return (type_ranks[nodes[node_id].get("type")], position[node_id])
+
+    ready = [(rank(node_id), node_id) for node_id, deg in indegree.items() if deg == 0]
+    heapq.heapify(ready)
+    order = []
+
+    while ready:
+        _, node_id = heapq.heappop(ready)
+        order.append(node_id)
+        for neighbor in set(graph.get(node_id, [])):
+            if neighbor not in indegree:
+                continue
+            indegree[neighbor] -= 1
+            if indegree[neighbor] == 0:
+                heapq.heappush(ready, (rank(neighbor), neighbor))
+
+    if len(order) != len(nodes):
+        cyclic = [
+            node_label(nodes[node_id]) for node_id in nodes if node_id not in order
+        ]
+        raise WorkflowCycleError(f"Workflow contains a cycle through nodes: {cyclic}")
+
+    return order
+
+
+class PlanCache:
+    """In-process cache of compiled plans, invalidated when a workflow is saved"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._plans: Dict[int, Tuple[WorkflowPlan, float]] = {}
+        # Bumped on invalidation so a load that raced with a save is discarded
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, workflow_id: int) -> Optional[WorkflowPlan]:
+        with self._lock:
+            entry = self._plans.get(workflow_id)
+            if not entry:
+                return None
+            plan, cached_at = entry
+            # TTL bounds staleness when another process updated the workflow
+            if time.monotonic() - cached_at > self.ttl_seconds:
+                del self._plans[workflow_id]
+                return None
+            return plan
+
+    def generation(self, workflow_id: int) -> int:
+        with self._lock:
+            return self._generations.get(workflow_id, 0)
+
+    def put(self, plan: WorkflowPlan, generation: int):
+        with self._lock:
+            if self._generations.get(plan.workflow_id, 0) != generation:
+                return
+            self._plans[plan.workflow_id] = (plan, time.monotonic())
+
+    def invalidate(self, workflow_id: int):
+        with self._lock:
+            self._plans.pop(workflow_id, None)
+            self._generations[workflow_id] = self._generations.get(workflow_id, 0) + 1
+
+
+plan_cache = PlanCache(PLAN_CACHE_TTL_SECONDS)
+
+
+def get_workflow_plan(workflow_id: int) -> Optional[WorkflowPlan]:
+    """Return the cached plan for a workflow, loading and compiling it on a miss"""
+    plan = plan_cache.get(workflow_id)
+    if plan:
+        return plan
+
+    generation = plan_cache.generation(workflow_id)
+    session = None
+    try:
+        session = get_session()
+        workflow = session.get(Workflow, workflow_id)
+        if not workflow or not workflow.is_active:
+            return None
+        plan = compile_plan(workflow)
+    finally:
+        if session:
+            session.close()
+
+    plan_cache.put(plan, generation)
+    return plan
+
+
+def invalidate_workflow_plan(workflow_id: int):
+    plan_cache.invalidate(workflow_id)
@@ -0,0 +1,283 @@
+# app/services/workflow_validation.py
+from typing import Any, Dict, List, Optional
+
+from app.database import get_session
+from app.models.workflow import Workflow
+from .client_cache import get_http_client
+from .context_assembly import RERANKERS
+from .knowledge_service import RETRIEVAL_MODES
+from .node_registry import get_node_handler
+from .workflow_plan import (
+    WorkflowCycleError,
+    node_label,
+    analyze_workflow_pattern,
+    build_execution_graph,
+    build_predecessors,
+    get_execution_order,
+)
+
+OPENAI_MODEL_URL = "https://api.openai.com/v1/models/{model}"
+GOOGLE_MODEL_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}"
+
+
+def validate_workflow_structure(
+    nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Statically check a workflow without calling any LLM or embedding API:
+    node types, dangling edges, cycles, reachability and required config
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    if not nodes:
+        return {
+            "valid": False,
+            "errors": ["Workflow has no nodes to execute"],
+            "warnings": [],
+            "pattern": "Unknown",
+        }
+
+    node_map: Dict[str, Dict[str, Any]] = {}
+    for node in nodes:
+        node_id = node.get("id")
+        if not node_id:
+            errors.append("Node without an id")
+            continue
+        if node_id in node_map:
+            errors.append(f"Duplicate node id: {node_id}")
+        node_map[node_id] = node
+
+    for node_id, node in node_map.items():
+        if get_node_handler(node.get("type")) is None:
+            errors.append(f"{node_label(node)}: unknown node type '{node.get('type')}'")
+
+    # Dangling edges point at nodes that no longer exist on the canvas
+    for edge in edges:
+        source, target = edge.get("source"), edge.get("target")
+        if source not in node_map or target not in node_map:
+            errors.append(
+                f"Edge {edge.get('id', f'{source}->{target}')} references a missing node"
+            )
+
+    types = [node.get("type") for node in node_map.values()]
+    if "userQuery" not in types:
+        errors.append("Workflow needs a User Query component")
+    if "output" not in types:
+        errors.append("Workflow needs an Output component")
+    if "llmEngine" not in types:
+        warnings.append("No LLM Engine component; output will echo the query")
+
+    graph = build_execution_graph(node_map, edges)
+    try:
+        get_execution_order(node_map, graph)
+    except WorkflowCycleError as e:
+        errors.append(str(e))
+
+    # Everything except the entry point should be reachable from a User Query
+    reachable = set()
+    stack = [nid for nid, node in node_map.items() if node.get("type") == "userQuery"]
+    while stack:
+        node_id = stack.pop()
+        if node_id in reachable:
+            continue
+        reachable.add(node_id)
+        stack.extend(graph.get(node_id, []))
+
+    for node_id, node in node_map.items():
+        if node_id in reachable:
+            continue
+        message = f"{node_label(node)} is not connected to a User Query"
+        if node.get("type") == "output":
+            errors.append(message)
+        else:
+            warnings.append(message)
+
+    errors.extend(_check_node_inputs(node_map, graph))
+    errors.extend(_check_node_configs(node_map, graph))
+
+    return {
+        "valid": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "pattern": analyze_workflow_pattern(node_map, edges),
+    }
+
+
+def _check_node_inputs(
+    node_map: Dict[str, Dict[str, Any]], graph: Dict[str, List[str]]
+) -> List[str]:
+    """Every key a node type declares as input must come from some upstream node"""
+    errors = []
+    predecessors = build_predecessors(node_map, graph)
+    for node_id, node in node_map.items():
+        handler = get_node_handler(node.get("type"))
+        # Every node receives the user query, whatever its position
+        needed = set(handler.inputs) - {"user_query"} if handler else set()
+        if not needed:
+            continue
+
+        provided = set()
+        seen = set()
+        stack = list(predecessors.get(node_id, []))
+        while stack:
+            upstream_id = stack.pop()
+            if upstream_id in seen:
+                continue
+            seen.add(upstream_id)
+            upstream = get_node_handler(node_map[upstream_id].get("type"))
+            if upstream:
+                provided.update(upstream.outputs)
+            stack.extend(predecessors.get(upstream_id, []))
+
+        for key in sorted(needed - provided):
+            errors.append(f"{node_label(node)} needs '{key}' from an upstream node")
+    return errors
+
+
+def _config(node: Dict[str, Any]) -> Dict[str, Any]:
+    return node.get("data", {}).get("config", {}) or {}
+
+
+def _check_node_configs(
+    node_map: Dict[str, Dict[str, Any]], graph: Dict[str, List[str]]
+) -> List[str]:
+    errors = []
+    # LLM nodes may borrow the API key of a Knowledge Base that feeds them
+    kb_key_targets = set()
+    for node_id, node in node_map.items():
+        if (
+            node.get("type") == "knowledgeBase"
+            and (_config(node).get("api-key") or "").strip()
+        ):
+            kb_key_targets.update(graph.get(node_id, []))
+
+    for node_id, node in node_map.items():
+        config = _config(node)
+        label = node_label(node)
+        api_key = (config.get("api-key") or "").strip()
+
+        if node.get("type") == "knowledgeBase":
+            if not api_key:
+                errors.append(f"{label}: API key is required for embeddings")
+            mode = config.get("retrieval-mode", "dense")
+            if mode not in RETRIEVAL_MODES:
+                errors.append(
+                    f"{label}: retrieval mode must be one of {', '.join(RETRIEVAL_MODES)}"
+                )
+            if config.get("reranker", "none") not in RERANKERS:
+                errors.append(
+                    f"{label}: reranker must be one of {', '.join(RERANKERS)}"
+                )
+            try:
+                if int(config.get("top-k", 3)) < 1:
+                    errors.append(f"{label}: top-k must be at least 1")
+            except (TypeError, ValueError):
+                errors.append(f"{label}: top-k must be a whole number")
+        elif node.get("type") == "llmEngine":
+            if not (config.get("model") or "").strip():
+                errors.append(f"{label}: model is required")
+            if not api_key and node_id not in kb_key_targets:
+                errors.append(f"{label}: API key is required")
+            try:
+                float(config.get("temperature", 0.7))
+            except (TypeError, ValueError):
+                errors.append(f"{label}: temperature must be a number")
+
+    return errors
+
+
+def probe_credentials(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Cheap credential check: fetch model metadata from each provider with the
+    configured key. Costs no tokens, unlike a test completion.
+    """
+    results = []
+    http = get_http_client()
+
+    for node in nodes:
+        config = _config(node)
+        api_key = (config.get("api-key") or "").strip()
+        if not api_key:
+            continue
+
+        if node.get("type") == "knowledgeBase":
+            model = config.get("embedding-model", "text-embedding-3-small")
+            request = (
+                OPENAI_MODEL_URL.format(model=model),
+                {"Authorization": f"Bearer {api_key}"},
+                None,
+            )
+        elif node.get("type") == "llmEngine":
+            model = config.get("model", "gpt-4o-mini")
+            if model.startswith("gpt-"):
+                request = (
+                    OPENAI_MODEL_URL.format(model=model),
+                    {"Authorization": f"Bearer {api_key}"},
+                    None,
+                )
+            else:
+                request = (GOOGLE_MODEL_URL.format(model=model), {}, {"key": api_key})
+        else:
+            continue
+
+        url, headers, params = request
+        error: Optional[str] = None
+        try:
+            response = http.get(url, headers=headers, params=params, timeout=10.0)
+            if response.status_code in (401, 403):
+                error = "API key was rejected"
+            elif response.status_code == 404:
+                error = f"Model '{model}' is not available for this key"
+            elif response.status_code >= 400:
+                error = f"Provider returned HTTP {response.status_code}"
+        except Exception as e:
+            error = f"Could not reach provider: {str(e)}"
+
+        results.append(
+            {
+                "node_id": node.get("id"),
+                "label": node_label(node),
+                "model": model,
+                "ok": error is None,
+                "error": error,
+            }
+        )
+
+    return results
+
+
+def validate_workflow(
+    workflow_id: int, check_credentials: bool = False
+) -> Dict[str, Any]:
+    """Validate a stored workflow; optionally probe the configured API keys"""
+    session = None
+    try:
+        session = get_session()
+        workflow = session.get(Workflow, workflow_id)
+        if not workflow:
+            return {
+                "valid": False,
+                "errors": [f"Workflow {workflow_id} not found"],
+                "warnings": [],
+                "pattern": "Unknown",
+                "nodes_count": 0,
+            }
+        nodes = list(workflow.nodes or [])
+        edges = list(workflow.edges or [])
+    finally:
+        if session:
+            session.close()
+
+    result = validate_workflow_structure(nodes, edges)
+    result["nodes_count"] = len(nodes)
+
+    if check_credentials:
+        credentials = probe_credentials(nodes)
+        result["credentials"] = credentials
+        for probe in credentials:
+            if not probe["ok"]:
+                result["errors"].append(f"{probe['label']}: {probe['error']}")
+        result["valid"] = not result["errors"]
+
+    return result
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Importing app.database builds the Postgres engine from these; tests never
+# connect, so placeholders are enough when no .env is present
+for name, value in {
+    "user": "postgres",
+    "password": "postgres",
+    "host": "localhost",
+    "port": "5432",
+    "dbname": "postgres",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
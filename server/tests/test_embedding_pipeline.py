@@ -0,0 +1,150 @@
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services import embedding_pipeline
+from app.services.embedding_pipeline import EmbeddingPipeline, TokenRateLimiter
+
+
+class FakeClock:
+    """monotonic() and sleep() for the module under test; sleeping advances time"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_pipeline, "time", clock)
+    return clock
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after else {}
+        self.response = MagicMock(status_code=status_code, headers=headers)
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def test_full_bucket_grants_without_waiting(clock):
+    limiter = TokenRateLimiter(6000)
+
+    for _ in range(10):
+        limiter.acquire(600)
+
+    assert clock.sleeps == []
+
+
+def test_empty_bucket_waits_for_the_refill(clock):
+    limiter = TokenRateLimiter(6000)
+    limiter.acquire(6000)
+
+    limiter.acquire(600)
+
+    # 600 tokens at 6000 per minute take six seconds to refill
+    assert sum(clock.sleeps) == pytest.approx(6.0)
+
+
+def test_requests_larger_than_the_budget_are_capped_to_it(clock):
+    limiter = TokenRateLimiter(6000)
+    limiter.acquire(6000)
+
+    limiter.acquire(50_000)
+
+    assert sum(clock.sleeps) == pytest.approx(60.0)
+
+
+def test_rate_halves_on_penalty_with_a_floor_and_recovers_on_success(clock):
+    limiter = TokenRateLimiter(1000)
+
+    limiter.penalize()
+    assert limiter.rate == 500
+    assert limiter.tokens <= 500
+    for _ in range(10):
+        limiter.penalize()
+    assert limiter.rate == 100
+
+    for _ in range(100):
+        limiter.reward()
+    assert limiter.rate == 1000
+
+
+@pytest.mark.parametrize(
+    "error, retryable",
+    [
+        (ProviderError(429), True),
+        (ProviderError(500), True),
+        (ProviderError(503), True),
+        (APIConnectionError(), True),
+        (TimeoutError(), True),
+        (ProviderError(400), False),
+        (ProviderError(401), False),
+        (KeyError("page_content"), False),
+    ],
+)
+def test_only_transient_errors_are_retried(error, retryable):
+    assert embedding_pipeline._is_retryable(error) is retryable
+
+
+def make_pipeline(vector_store, **options):
+    return EmbeddingPipeline(
+        vector_store, TokenRateLimiter(10**9), max_in_flight=1, **options
+    )
+
+
+def make_store(*errors):
+    store = MagicMock()
+    store.get.return_value = {"ids": []}
+    store.add_documents.side_effect = [*errors, None]
+    return store
+
+
+def test_rate_limited_batches_back_off_and_retry(clock):
+    store = make_store(ProviderError(429, retry_after=2), ProviderError(503))
+    pipeline = make_pipeline(store, max_retries=3)
+
+    stored, skipped = pipeline._store_batch([Document(page_content="x")], ["id-1"])
+
+    assert (stored, skipped) == (1, 0)
+    assert store.add_documents.call_count == 3
+    assert len(clock.sleeps) == 2
+    assert pipeline.limiter.rate < pipeline.limiter.max_rate
+
+
+def test_permanent_errors_fail_without_sleeping(clock):
+    store = make_store(ProviderError(401))
+    pipeline = make_pipeline(store, max_retries=5)
+
+    with pytest.raises(ProviderError):
+        pipeline._store_batch([Document(page_content="x")], ["id-1"])
+
+    assert store.add_documents.call_count == 1
+    assert clock.sleeps == []
+
+
+def test_already_stored_chunks_are_skipped(clock):
+    store = make_store()
+    store.get.return_value = {"ids": ["id-1"]}
+    pipeline = make_pipeline(store)
+    documents = [Document(page_content="x"), Document(page_content="y")]
+
+    stored, skipped = pipeline._store_batch(documents, ["id-1", "id-2"])
+
+    assert (stored, skipped) == (1, 1)
+    store.add_documents.assert_called_once()
+    assert store.add_documents.call_args.kwargs["ids"] == ["id-2"]
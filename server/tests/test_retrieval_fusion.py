@@ -0,0 +1,122 @@
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services import knowledge_service
+from app.services.keyword_index import KeywordIndex, tokenize
+from app.services.knowledge_service import reciprocal_rank_fusion
+
+
+def chunk(content_hash, index, text=None):
+    return Document(
+        page_content=text or f"{content_hash} chunk {index}",
+        metadata={"content_hash": content_hash, "chunk_index": index},
+    )
+
+
+def keys(documents):
+    return [
+        (doc.metadata["content_hash"], doc.metadata["chunk_index"]) for doc in documents
+    ]
+
+
+def test_chunks_found_by_both_retrievers_rank_first():
+    dense = [chunk("a", 0), chunk("b", 0), chunk("c", 0)]
+    sparse = [chunk("d", 0), chunk("c", 0), chunk("e", 0)]
+
+    fused = reciprocal_rank_fusion([dense, sparse], k=5)
+
+    assert keys(fused)[0] == ("c", 0)
+    assert len(fused) == len(set(keys(fused))) == 5
+
+
+def test_fusion_scores_follow_reciprocal_ranks():
+    # b: 1/61 + 1/63 beats a: 1/61 alone and c: 1/62 alone
+    fused = reciprocal_rank_fusion(
+        [[chunk("a", 0), chunk("c", 0), chunk("b", 0)], [chunk("b", 0)]], k=3
+    )
+
+    assert keys(fused) == [("b", 0), ("a", 0), ("c", 0)]
+
+
+def test_same_chunk_from_either_retriever_is_merged_by_chunk_identity():
+    dense_copy = chunk("a", 1, "text as the vector store returned it")
+    sparse_copy = chunk("a", 1, "text as the keyword index returned it")
+
+    fused = reciprocal_rank_fusion([[dense_copy], [sparse_copy]], k=3)
+
+    assert fused == [dense_copy]
+
+
+def test_fusion_keeps_only_the_top_k():
+    ranking = [chunk("a", i) for i in range(10)]
+
+    fused = reciprocal_rank_fusion([ranking, []], k=3)
+
+    assert keys(fused) == [("a", 0), ("a", 1), ("a", 2)]
+
+
+def test_chunks_without_metadata_are_keyed_by_text():
+    one = Document(page_content="same text")
+    other = Document(page_content="same text")
+
+    assert len(reciprocal_rank_fusion([[one], [other]], k=3)) == 1
+
+
+@pytest.fixture
+def index(tmp_path):
+    return KeywordIndex(str(tmp_path / "keywords.sqlite3"))
+
+
+def test_keyword_index_opens_its_file_on_first_use(tmp_path, index):
+    assert not os.path.exists(index.path)
+
+    index.search("collection", "anything")
+
+    assert os.path.exists(index.path)
+
+
+def test_bm25_prefers_chunks_with_the_query_terms(index):
+    index.add(
+        "kb",
+        [
+            chunk("a", 0, "invoice AB-1234 was paid in March"),
+            chunk("b", 0, "the weather in March was mild"),
+            chunk("c", 0, "nothing relevant here"),
+        ],
+    )
+
+    results = index.search("kb", "invoice ab-1234", k=3)
+
+    assert keys([doc for doc, _ in results]) == [("a", 0)]
+    assert "ab-1234" in tokenize("Invoice AB-1234")
+
+
+def test_collections_are_searched_separately(index):
+    index.add("kb-1", [chunk("a", 0, "alpha")])
+    index.add("kb-2", [chunk("b", 0, "alpha")])
+
+    assert keys([doc for doc, _ in index.search("kb-2", "alpha")]) == [("b", 0)]
+
+
+def test_forget_content_drops_one_file(index):
+    index.add("kb", [chunk("a", 0, "alpha"), chunk("a", 1, "beta")])
+    index.add("kb", [chunk("ab", 0, "alpha")])
+
+    index.forget_content("kb", "a")
+
+    assert not index.has_content("kb", "a")
+    assert index.has_content("kb", "ab")
+    assert keys([doc for doc, _ in index.search("kb", "alpha beta")]) == [("ab", 0)]
+
+
+def test_sparse_mode_never_needs_an_api_key(index, monkeypatch):
+    monkeypatch.setattr(knowledge_service, "keyword_index", index)
+    index.add("kb", [chunk("a", 0, "alpha")])
+
+    documents = knowledge_service.retrieve_documents(
+        "alpha", k=3, api_key=None, collection_name="kb", mode="sparse"
+    )
+
+    assert keys(documents) == [("a", 0)]
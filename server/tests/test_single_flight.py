@@ -0,0 +1,161 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services import single_flight
+from app.services.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class CoalescedCounter:
+    """Stands in for the metrics registry to tell when followers have joined"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record_coalesced(self, name):
+        with self._lock:
+            self.count += 1
+
+    def wait_for(self, count):
+        while self.count < count:
+            pass
+
+
+@pytest.fixture
+def coalesced(monkeypatch):
+    counter = CoalescedCounter()
+    monkeypatch.setattr(single_flight, "metrics", counter)
+    return counter
+
+
+def test_concurrent_calls_share_one_execution(coalesced):
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls, results = [], []
+    lock = threading.Lock()
+
+    def work():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "answer"
+
+    def caller():
+        result = flight.do("key", work)
+        with lock:
+            results.append(result)
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    while not calls:
+        pass
+    followers = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    coalesced.wait_for(4)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+
+
+def test_waiters_receive_the_leaders_exception(coalesced):
+    flight = SingleFlight("test")
+    release = threading.Event()
+    started = threading.Event()
+    errors = []
+
+    def work():
+        started.set()
+        release.wait(timeout=5)
+        raise ValueError("boom")
+
+    def caller():
+        try:
+            flight.do("key", work)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(timeout=5)
+    follower = threading.Thread(target=caller)
+    follower.start()
+    coalesced.wait_for(1)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert errors == ["boom", "boom"]
+
+
+def test_nothing_is_kept_once_a_call_finishes():
+    flight = SingleFlight("test")
+    calls = []
+
+    def work():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", work) == (1, False)
+    assert flight.do("key", work) == (2, False)
+    assert flight._calls == {}
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight("test")
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    def caller(key):
+        results.append(flight.do(key, lambda: barrier.wait() is not None))
+
+    threads = [threading.Thread(target=caller, args=(key,)) for key in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert [shared for _, shared in results] == [False, False]
+
+
+def test_async_calls_share_one_execution(coalesced):
+    flight = AsyncSingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+    assert coalesced.count == 4
+    assert flight._calls == {}
+
+
+def test_cancelling_one_async_caller_does_not_cancel_the_shared_run():
+    flight = AsyncSingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == ("answer", True)
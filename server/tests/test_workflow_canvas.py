@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.workflow import Workflow
+from app.services.workflow_manage_service import (
+    WorkflowManageService,
+    WorkflowVersionConflict,
+    apply_canvas_patch,
+    patch_statement,
+    workflow_version,
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine, tables=[Workflow.__table__])
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def service(session):
+    return WorkflowManageService(session)
+
+
+def node(node_id, **data):
+    return {"id": node_id, "type": "llmEngine", "data": data}
+
+
+def make_canvas(service, nodes, edges=()):
+    workflow = service.create_workflow("canvas")
+    return service.save_workflow_data(workflow.id, list(nodes), list(edges))
+
+
+def test_patch_removes_replaces_in_place_and_appends():
+    nodes = [node("a"), node("b"), node("c")]
+    edges = [{"id": "e1", "source": "a", "target": "b"}]
+
+    patched_nodes, patched_edges = apply_canvas_patch(
+        nodes,
+        edges,
+        {
+            "nodes": {"upsert": [node("b", label="B"), node("d")], "remove": ["a"]},
+            "edges": {"remove": ["e1"]},
+        },
+    )
+
+    assert patched_nodes == [node("b", label="B"), node("c"), node("d")]
+    assert patched_edges == []
+    # The inputs are left untouched
+    assert [n["id"] for n in nodes] == ["a", "b", "c"]
+
+
+def test_patch_without_changes_keeps_the_canvas():
+    nodes, edges = [node("a")], [{"id": "e1", "source": "a", "target": "a"}]
+
+    assert apply_canvas_patch(nodes, edges, {}) == (nodes, edges)
+
+
+def test_upserts_need_an_id():
+    with pytest.raises(ValueError):
+        apply_canvas_patch([], [], {"nodes": {"upsert": [{"type": "output"}]}})
+
+
+def test_patch_at_the_current_version_is_saved(service):
+    workflow = make_canvas(service, [node("a"), node("b")])
+
+    result = service.patch_canvas(
+        workflow.id,
+        workflow_version(workflow.updated_at),
+        {"nodes": {"upsert": [node("c")], "remove": ["a"]}},
+    )
+
+    service.session.expire_all()
+    saved = service.get_workflow_by_id(workflow.id)
+    assert [n["id"] for n in saved.nodes] == ["b", "c"]
+    assert result["node_count"] == 2
+    assert result["version"] == workflow_version(saved.updated_at)
+
+
+def test_patch_on_a_stale_version_is_a_conflict(service):
+    workflow = make_canvas(service, [node("a")])
+    stale = workflow_version(workflow.updated_at)
+    service.patch_canvas(workflow.id, stale, {"nodes": {"upsert": [node("b")]}})
+
+    with pytest.raises(WorkflowVersionConflict) as conflict:
+        service.patch_canvas(workflow.id, stale, {"nodes": {"remove": ["a", "b"]}})
+
+    service.session.expire_all()
+    saved = service.get_workflow_by_id(workflow.id)
+    assert [n["id"] for n in saved.nodes] == ["a", "b"]
+    assert conflict.value.current_version == workflow_version(saved.updated_at)
+
+
+def test_compare_and_set_misses_when_another_save_landed_first(service, session):
+    workflow = make_canvas(service, [node("a")])
+    seen_at = workflow.updated_at
+    service.save_workflow_data(workflow.id, [node("other")], [])
+
+    stale = Workflow(id=workflow.id, updated_at=seen_at)
+    result = session.exec(patch_statement(stale, [], [], datetime.now(timezone.utc)))
+
+    assert result.rowcount == 0
+    session.rollback()
+    session.expire_all()
+    assert [n["id"] for n in service.get_workflow_by_id(workflow.id).nodes] == ["other"]
+
+
+def test_summary_pages_have_no_duplicates_or_gaps(service, session):
+    base = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    # Several rows share a timestamp so the id tie-break is exercised
+    stamps = [base, base, base, base - timedelta(seconds=1), base - timedelta(1)]
+    expected = []
+    for index, stamp in enumerate(stamps * 2):
+        workflow = service.create_workflow(f"w{index}")
+        workflow.updated_at = stamp
+        session.add(workflow)
+        expected.append((stamp, workflow.id))
+    inactive = service.create_workflow("deleted")
+    inactive.is_active = False
+    session.add(inactive)
+    session.commit()
+    expected.sort(reverse=True)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = service.get_workflow_summaries(limit=3, cursor=cursor)
+        assert len(page.items) <= 3
+        seen.extend(item.id for item in page.items)
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [workflow_id for _, workflow_id in expected]
+    assert pages == 4
+
+
+def test_bad_cursors_are_rejected(service):
+    with pytest.raises(ValueError):
+        service.get_workflow_summaries(limit=3, cursor="not-a-cursor")
@@ -0,0 +1,197 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import node_registry
+from app.services import workflow_execution_service as execution
+from app.services.node_registry import NodeHandler
+from app.services.workflow_execution_service import WorkflowExecutor
+from app.services.workflow_plan import WorkflowCycleError, compile_plan
+
+
+class Recorder:
+    """Node handlers that log when they start and finish, and what they saw"""
+
+    def __init__(self):
+        self.events = []
+        self.inputs = {}
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def handler(self, node_type, run=None, outputs=()):
+        def wrapped(executor, node, inputs):
+            node_id = node["id"]
+            with self._lock:
+                self.events.append(("start", node_id))
+                self.inputs[node_id] = dict(inputs)
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                if run:
+                    return run(node_id, inputs)
+                return True, {**inputs, f"{node_id}_out": node_id}
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.events.append(("end", node_id))
+
+        return NodeHandler(
+            node_type=node_type,
+            run=wrapped,
+            label=node_type,
+            outputs=outputs,
+        )
+
+    def started(self, node_id):
+        return ("start", node_id) in self.events
+
+    def position(self, event, node_id):
+        return self.events.index((event, node_id))
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = Recorder()
+    node_registry.discover_node_types()
+
+    def register(node_type, run=None, outputs=()):
+        monkeypatch.setitem(
+            node_registry._handlers,
+            node_type,
+            recorder.handler(node_type, run, outputs),
+        )
+
+    recorder.register = register
+    return recorder
+
+
+def make_workflow(nodes, edges):
+    return SimpleNamespace(
+        id=1,
+        name="test",
+        updated_at=None,
+        nodes=[{"id": node_id, "type": node_type} for node_id, node_type in nodes],
+        edges=[{"source": source, "target": target} for source, target in edges],
+    )
+
+
+def run(workflow):
+    return WorkflowExecutor(compile_plan(workflow)).execute("question")
+
+
+def test_nodes_wait_for_every_predecessor_and_merge_their_outputs(recorder):
+    recorder.register("step", outputs=("a_out", "b_out", "c_out", "d_out"))
+    workflow = make_workflow(
+        [("a", "step"), ("b", "step"), ("c", "step"), ("d", "step")],
+        [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")],
+    )
+
+    result = run(workflow)
+
+    assert result["success"]
+    assert result["nodes_executed"] == 4
+    for parent in ("b", "c"):
+        assert recorder.position("end", "a") < recorder.position("start", parent)
+        assert recorder.position("end", parent) < recorder.position("start", "d")
+    fan_in = recorder.inputs["d"]
+    assert fan_in["user_query"] == "question"
+    assert (fan_in["a_out"], fan_in["b_out"], fan_in["c_out"]) == ("a", "b", "c")
+
+
+def test_independent_branches_run_concurrently(recorder):
+    # Each branch waits for the other, so this only passes if both run at once
+    barrier = threading.Barrier(2, timeout=5)
+
+    def branch(node_id, inputs):
+        barrier.wait()
+        return True, inputs
+
+    recorder.register("root")
+    recorder.register("branch", branch)
+    workflow = make_workflow(
+        [("a", "root"), ("b", "branch"), ("c", "branch")],
+        [("a", "b"), ("a", "c")],
+    )
+
+    result = run(workflow)
+
+    assert result["nodes_executed"] == 3
+    assert recorder.max_running == 2
+
+
+def test_parallel_nodes_are_capped_per_run(recorder, monkeypatch):
+    monkeypatch.setattr(execution, "WORKFLOW_MAX_PARALLEL_NODES", 1)
+
+    def slow(node_id, inputs):
+        time.sleep(0.02)
+        return True, inputs
+
+    recorder.register("slow", slow)
+    workflow = make_workflow([(node_id, "slow") for node_id in "abcd"], [])
+
+    result = run(workflow)
+
+    assert result["nodes_executed"] == 4
+    assert recorder.max_running == 1
+
+
+def test_errored_node_skips_nodes_that_depend_only_on_it(recorder):
+    def crash(node_id, inputs):
+        raise RuntimeError("boom")
+
+    recorder.register("step", outputs=("a_out", "c_out", "d_out", "e_out", "f_out"))
+    recorder.register("crash", crash)
+    # a -> b (errors) -> d -> f, while a -> c -> e also feeds f
+    workflow = make_workflow(
+        [
+            ("a", "step"),
+            ("b", "crash"),
+            ("c", "step"),
+            ("d", "step"),
+            ("e", "step"),
+            ("f", "step"),
+        ],
+        [("a", "b"), ("b", "d"), ("a", "c"), ("c", "e"), ("d", "f"), ("e", "f")],
+    )
+
+    result = run(workflow)
+
+    assert not recorder.started("d")
+    assert result["nodes_skipped"] == 1
+    # f still has one healthy branch, and sees only that branch's outputs
+    assert recorder.started("f")
+    assert recorder.inputs["f"]["e_out"] == "e"
+    assert "d_out" not in recorder.inputs["f"]
+    assert result["nodes_executed"] == 4
+
+
+def test_failed_node_with_fallback_outputs_keeps_the_flow_going(recorder):
+    def fail_softly(node_id, inputs):
+        return False, {**inputs, "llm_response": "Sorry"}
+
+    recorder.register("step", outputs=("a_out", "c_out"))
+    recorder.register("soft", fail_softly, outputs=("llm_response",))
+    workflow = make_workflow(
+        [("a", "step"), ("b", "soft"), ("c", "step")],
+        [("a", "b"), ("b", "c")],
+    )
+
+    result = run(workflow)
+
+    assert recorder.inputs["c"]["llm_response"] == "Sorry"
+    assert result["nodes_skipped"] == 0
+    assert result["nodes_executed"] == 2
+
+
+def test_cycles_are_rejected_when_the_plan_compiles(recorder):
+    recorder.register("step")
+    workflow = make_workflow(
+        [("a", "step"), ("b", "step"), ("c", "step")],
+        [("a", "b"), ("b", "c"), ("c", "b")],
+    )
+
+    with pytest.raises(WorkflowCycleError):
+        compile_plan(workflow)